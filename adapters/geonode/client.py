@@ -1,18 +1,20 @@
 import json
 import logging
 import os
-from datetime import datetime
-from typing import List
+from typing import Iterator, List
 
 import pytz
 import requests
 from django.conf import settings
-from django.utils.dateparse import parse_datetime
 from pyDataverse.models import Datafile
 
+from adapters.geonode import csw, mapping
+from core import decoders
 from core.clients import HarvestingClient
 from core.exceptions import HttpException
+from core.mapping import compile_mapping
 from core.models import Resource, ResourceMapping
+from core.timestamps import parse_iso
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +28,42 @@ class GeonodeClient(HarvestingClient):
     Harvesting Client for harvesting Resources from Geonode
     """
 
+    default_source = 'geonode'
+
     offset = settings.GEONODE_OFFSET
 
+    # Paging of listings, 'offset' (limit/offset) or 'keyset' (filter past last seen date ordered by date and uuid)
+    pagination = settings.GEONODE_PAGINATION
+
+    # Fields of listing objects used by filters and mapping functions
+    LISTING_FIELDS = (
+        'uuid', 'date', 'title', 'owner_name', 'abstract', 'keywords', 'detail_url', 'spatial_representation_type',
+        'temporal_extent_start', 'temporal_extent_end', 'bbox_x0', 'bbox_x1', 'bbox_y0', 'bbox_y1',
+    )
+
+    # Fields of slim listing used by reconciliation in two phase fetch, full records are fetched by id afterwards
+    RECONCILIATION_FIELDS = ('id', 'uuid', 'date')
+
+    # Fetching of listings, 'full' (whole objects), 'projected' (only LISTING_FIELDS requested from API) or
+    # 'two_phase' (only RECONCILIATION_FIELDS requested, full records fetched for resources to add or update)
+    fetch_mode = settings.GEONODE_FETCH_MODE
+
+    # Metadata endpoint, 'rest' (Geonode API) or 'csw' (records of pycsw catalogue with dc:type of category)
+    transport = settings.GEONODE_TRANSPORT
+    csw_page_size = settings.GEONODE_CSW_PAGE_SIZE
+    CSW_TYPES = {
+        ResourceMapping.LAYER: 'dataset',
+        ResourceMapping.MAP: 'map',
+        ResourceMapping.DOCUMENT: 'document',
+    }
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.csw_url = settings.GEONODE_CSW_URL or self.service_url + 'catalogue/csw'
+        base_spec = mapping.base_spec(self.service_url)
+        # Layers and maps share the same fields
+        self.__map_geographic_resource = compile_mapping({**base_spec, **mapping.BOUNDING_BOX_SPEC}, 'map_layer')
+        self.__map_document = compile_mapping(base_spec, 'map_document')
 
     def harvest(self, force_update: bool = False) -> (List[Resource], List[Resource], list):
         """
@@ -39,16 +73,23 @@ class GeonodeClient(HarvestingClient):
         :type force_update: bool
         :return: list of add/update/remove lists with Resources of harvested data from Geonode
         """
-        layers = self.get_resources('api/layers/', self.__map_layer_to_resource, ResourceMapping.LAYER, force_update)
-        maps = self.get_resources('api/maps/', self.__map_map_to_resource, ResourceMapping.MAP, force_update)
-        documents = self.get_resources('api/documents/', self.__map_document_to_resource, ResourceMapping.DOCUMENT,
-                                       force_update)
+        return self.merge_stages(self.harvest_stages(force_update))
 
-        add_data = layers[0] + maps[0] + documents[0]
-        update_data = layers[1] + maps[1] + documents[1]
-        remove_data = layers[2] + maps[2] + documents[2]
+    def harvest_stages(self, force_update: bool = False) -> Iterator[tuple]:
+        """
+        Harvests layers, maps and documents from Geonode one after another yielding add/update/remove lists of every
+        fetched page
 
-        return add_data, update_data, remove_data
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: iterator of add/update/remove lists with Resources of harvested data from Geonode
+        """
+        yield from self.get_resource_stages('api/layers/', self.__map_layer_to_resource, ResourceMapping.LAYER,
+                                            force_update)
+        yield from self.get_resource_stages('api/maps/', self.__map_map_to_resource, ResourceMapping.MAP,
+                                            force_update)
+        yield from self.get_resource_stages('api/documents/', self.__map_document_to_resource,
+                                            ResourceMapping.DOCUMENT, force_update)
 
     def get_resources(self, resource_path: str, resource_map_function, resource_mapping_category,
                       force_update: bool = False) -> (List[Resource],
@@ -66,103 +107,192 @@ class GeonodeClient(HarvestingClient):
         :type force_update: bool
         :return: list of add/update/remove fetched data as Resources lists
         """
-        params: dict = {
-            'offset': 0,
-            'order_by': 'date'
-        }
+        return self.merge_stages(self.get_resource_stages(resource_path, resource_map_function,
+                                                          resource_mapping_category, force_update))
 
-        try:
-            results: dict = self.__get_request(resource_path, params)
-        except HttpException as exception:
-            http_exception_handler(exception)
-            return [], [], []
+    def get_resource_stages(self, resource_path: str, resource_map_function, resource_mapping_category,
+                            force_update: bool = False) -> Iterator[tuple]:
+        """
+        Fetch data from Geonode API endpoint page by page and yield Resources to add and update of every page as soon
+        as they are fetched and mapped, Resources to remove are yielded last when the whole listing is known. Objects
+        listed again on later page (e.g. updated during crawl) are skipped. Listing is incomplete after error, so
+        nothing is removed then
+
+        :param resource_path: url relative path to API endpoint
+        :type resource_path: str
+        :param resource_map_function: function mapping data type retrieved from endpoint to Resource object
+        :param resource_mapping_category: category of mapping showed in ResourceMapping category field
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: iterator of add/update/remove fetched data as Resources lists
+        """
+        fields: tuple = self.RECONCILIATION_FIELDS if self.fetch_mode == 'two_phase' else self.LISTING_FIELDS
 
-        resources: list = results['objects']
+        if self.transport == 'csw':
+            pages: Iterator[list] = self.__get_csw_records(resource_mapping_category)
+        elif self.pagination == 'keyset':
+            pages: Iterator[list] = self.__get_keyset_pages(resource_path, fields)
+        else:
+            pages: Iterator[list] = self.__get_offset_pages(resource_path, fields)
 
-        while results['meta']['next'] is not None:
-            results: dict = self.__get_next_page(resource_path, results['meta']['limit'], results['meta']['offset'])
-            resources += results['objects']
+        listed_uids: set = set()
 
-        add_resources: list = self.__filter_new_resources(resources, resource_map_function, resource_mapping_category)
-        update_resources: list = self.__filter_update_resources(resources, resource_map_function, force_update)
-        delete_resources: list = self.__filter_remove_resources(resources, resource_mapping_category)
+        try:
+            for page in pages:
+                resources: list = [resource for resource in self.filter_shard(page, lambda resource: resource['uuid'])
+                                   if resource['uuid'] not in listed_uids]
+                listed_uids.update(resource['uuid'] for resource in resources)
+
+                add_resources: list = self.__filter_new_resources(resources)
+                update_resources: list = self.__filter_update_resources(resources, force_update)
+
+                if self.plan_only:
+                    yield add_resources, update_resources, []
+                    continue
+
+                if self.transport == 'csw':
+                    add_resources = self.__get_csw_records_by_id(add_resources)
+                    update_resources = self.__get_csw_records_by_id(update_resources)
+                elif self.fetch_mode == 'two_phase':
+                    add_resources = self.__get_detailed_data(resource_path, add_resources)
+                    update_resources = self.__get_detailed_data(resource_path, update_resources)
+
+                yield (self.map_resources(add_resources, resource_map_function, resource_mapping_category),
+                       self.map_resources(update_resources, resource_map_function, resource_mapping_category,
+                                          create_file=False),
+                       [])
+        except (HttpException, csw.CswException) as exception:
+            http_exception_handler(exception)
+            return
 
-        return add_resources, update_resources, delete_resources
+        yield [], [], self.__filter_remove_resources(listed_uids, resource_mapping_category)
 
-    @staticmethod
-    def __filter_new_resources(resources: list, resource_map_function, category) -> List[Resource]:
+    def __filter_new_resources(self, resources: list) -> list:
         """
         Filter only new Resources in list of raw data from source
 
         :param resources: fetched data from source with resources raw data
         :type resources: list
-        :param resource_map_function: mapping function for resource
-        :param category: category of resource for mapping
-        :return: list of mapped resources
+        :return: list of new resources raw data
         """
         add_resources: list = []
 
         for resource in resources:
             uid: str = resource['uuid']
-            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(uid=uid).first()
+            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(source=self.source, uid=uid).first()
 
             if resource_mapping is None or resource_mapping.pid is None:
-                if resource_mapping is None:
-                    last_update = parse_datetime(resource['date']).replace(tzinfo=pytz.UTC)
-                    ResourceMapping(uid=uid, pid=None, last_update=last_update, category=category).save()
-
                 add_resources.append(resource)
 
-        return [resource_map_function(resource) for resource in add_resources]
+        return add_resources
 
-    @staticmethod
-    def __filter_update_resources(resources: list, resource_map_function, force_update: bool = False) -> List[Resource]:
+    def __filter_update_resources(self, resources: list, force_update: bool = False) -> list:
         """
         Filter only Resources to update in raw data from source
 
         :param resources: fetched data from source with resources raw data
         :type resources: list
-        :param resource_map_function: mapping function for resource
         :param force_update: force updating every resource with resource mapping
         :type force_update: bool
-        :return: list of mapped resources
+        :return: list of resources to update raw data
         """
         update_resources: list = []
 
         for resource in resources:
             uid: str = resource['uuid']
-            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(uid=uid).first()
+            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(source=self.source, uid=uid).first()
+
+            if resource_mapping is None or resource_mapping.pid is None:
+                continue
 
-            resource['pid'] = resource_mapping.pid if resource_mapping.pid else None
-            date = parse_datetime(resource['date'])
+            resource['pid'] = resource_mapping.pid
+            # Parsed date is kept with record for mapping, cache of parsed timestamps may have evicted it by then
+            resource['last_update'] = parse_iso(resource['date'])
 
-            if resource_mapping is not None and resource_mapping.pid is not None and (
-                    resource_mapping.last_update.replace(tzinfo=None) < date or force_update):
+            if resource_mapping.last_update.replace(tzinfo=pytz.UTC) < resource['last_update'] or force_update:
                 update_resources.append(resource)
 
-        return [resource_map_function(resource, create_file=False) for resource in update_resources]
+        return update_resources
 
-    @staticmethod
-    def __filter_remove_resources(resources: list, category) -> list:
+    def __filter_remove_resources(self, resources_uid: set, category) -> list:
         """
         Filter Resources deleted in source
 
-        :param resources: fetched data from source with resources raw data
-        :type resources: list
+        :param resources_uid: UIDs of every resource listed in source
+        :type resources_uid: set
         :param category: category of resource for mapping
         :return: list of resources to delete
         """
-        resources_uid: List[str] = [resource['uuid'] for resource in resources]
-
         delete_resources = ResourceMapping.objects.filter(
+            source=self.source,
             category=category
         ).exclude(
             uid__in=resources_uid
         )
 
-        return list(delete_resources)
+        return self.filter_shard(delete_resources, lambda resource_mapping: resource_mapping.uid)
 
-    def __get_next_page(self, path: str, limit: int, offset: int):
+    def __get_offset_pages(self, path: str, fields: tuple) -> Iterator[list]:
+        """
+        Fetch every page of listing using limit/offset paging
+
+        :param path: relative url path
+        :type path: str
+        :param fields: fields of listing objects to keep
+        :type fields: tuple
+        :return: iterator of projected objects of every page
+        """
+        params: dict = {
+            'offset': 0,
+            'order_by': 'date',
+            **self.__projection_params(fields)
+        }
+
+        results: dict = self.__get_request(path, params)
+        yield decoders.project(results['objects'], fields)
+
+        while results['meta']['next'] is not None:
+            results: dict = self.__get_next_page(path, results['meta']['limit'], results['meta']['offset'],
+                                                 self.__projection_params(fields))
+            yield decoders.project(results['objects'], fields)
+
+    def __get_keyset_pages(self, path: str, fields: tuple) -> Iterator[list]:
+        """
+        Fetch every page of listing ordered by date and uuid, every next page is filtered past (date, uuid) of last
+        seen object, first rest of its date and then later dates, so its cost does not grow with depth and objects
+        changed during crawl never shift unseen objects out of the listing. Objects updated during crawl get later
+        date and can appear again at the end
+
+        :param path: relative url path
+        :type path: str
+        :param fields: fields of listing objects to keep
+        :type fields: tuple
+        :return: iterator of projected objects of every page
+        """
+        limit = int(self.offset)
+        filters: dict = {}
+
+        while True:
+            results: dict = self.__get_request(path, {
+                'limit': limit,
+                'order_by': ['date', 'uuid'],
+                **filters,
+                **self.__projection_params(fields)
+            })
+            objects: list = decoders.project(results['objects'], fields)
+
+            if objects:
+                yield objects
+
+            # Page is full when it has as many objects as limit applied by API, which may be lower than requested
+            if objects and len(objects) >= int(results.get('meta', {}).get('limit') or limit):
+                filters = {'date': objects[-1]['date'], 'uuid__gt': objects[-1]['uuid']}
+            elif 'uuid__gt' in filters:
+                filters = {'date__gt': filters['date']}
+            else:
+                return
+
+    def __get_next_page(self, path: str, limit: int, offset: int, params: dict = None):
         """
         Sends get_request for next page
 
@@ -172,15 +302,147 @@ class GeonodeClient(HarvestingClient):
         :type limit: int
         :param offset: request list offset
         :type offset: int
+        :param params: additional GET request parameters
+        :type params: dict
         :return: __get_request function with params for next page
         """
         params: dict = {
             'limit': limit,
-            'offset': offset + limit
+            'offset': offset + limit,
+            'order_by': 'date',
+            **(params or {})
         }
 
         return self.__get_request(path, params)
 
+    def __projection_params(self, fields: tuple) -> dict:
+        """
+        Return GET parameters asking Geonode API only for given fields (dynamic fields filtering of Geonode REST API),
+        Geonode versions without field filtering ignore them and objects are projected after decoding
+
+        :param fields: requested fields
+        :type fields: tuple
+        :return: GET request parameters
+        """
+        if self.fetch_mode == 'full':
+            return {}
+
+        return {'exclude[]': '*', 'include[]': list(fields)}
+
+    def __get_detailed_data(self, path: str, resources: list) -> list:
+        """
+        Fetch full records of resources found in slim listing, reconciliation data (e.g. pid) is kept
+
+        :param path: relative url path of listing
+        :type path: str
+        :param resources: slim listing objects
+        :type resources: list
+        :return: list of full records projected to fields used by mapping functions
+        """
+        detailed_resources: list = []
+
+        for resource in resources:
+            detail: dict = self.__get_request(f'{path}{resource["id"]}/', {})
+            detailed_resource: dict = decoders.project([detail], self.LISTING_FIELDS)[0]
+
+            for key in ('pid', 'last_update'):
+                if key in resource:
+                    detailed_resource[key] = resource[key]
+
+            detailed_resources.append(detailed_resource)
+
+        return detailed_resources
+
+    def __get_csw_records(self, category: int) -> Iterator[list]:
+        """
+        Fetch summary records of category from CSW catalogue in pages, only uuid and date are kept for reconciliation
+
+        :param category: category of resources
+        :type category: int
+        :return: iterator of listing objects with uuid and date of every page
+        """
+        params: dict = {
+            'service': 'CSW',
+            'version': '2.0.2',
+            'request': 'GetRecords',
+            'typenames': 'csw:Record',
+            'elementsetname': 'summary',
+            'resulttype': 'results',
+            'outputschema': csw.NAMESPACES['csw'],
+            'constraintlanguage': 'CQL_TEXT',
+            'constraint_language_version': '1.1.0',
+            'constraint': f"dc:type = '{self.CSW_TYPES[category]}'",
+            'maxrecords': self.csw_page_size,
+            'startposition': 1,
+        }
+        while True:
+            search_results: dict = {}
+            yield [{'uuid': record['uuid'], 'date': record['date']}
+                   for record in self.__get_csw_request(params, search_results)]
+
+            next_record = int(search_results.get('nextRecord', 0))
+            if next_record == 0 or next_record > int(search_results.get('numberOfRecordsMatched', 0)):
+                return
+
+            params['startposition'] = next_record
+
+    def __get_csw_records_by_id(self, resources: list) -> list:
+        """
+        Fetch full records of resources from CSW catalogue in batches, reconciliation data (e.g. pid) is kept and
+        resources removed in the meantime are skipped. Dublin Core records are completed with spatial representation
+        type of ISO 19139 records of the same batch
+
+        :param resources: listing objects with uuid
+        :type resources: list
+        :return: list of listing objects with fields used by mapping functions
+        """
+        detailed_resources: list = []
+
+        for start in range(0, len(resources), self.csw_page_size):
+            batch: list = resources[start:start + self.csw_page_size]
+            params: dict = {
+                'service': 'CSW',
+                'version': '2.0.2',
+                'request': 'GetRecordById',
+                'elementsetname': 'full',
+                'outputschema': csw.NAMESPACES['csw'],
+                'id': ','.join(resource['uuid'] for resource in batch),
+            }
+            records: dict = {record['uuid']: record for record in self.__get_csw_request(params)}
+            iso_records: dict = {record['uuid']: record for record in self.__get_csw_request(
+                {**params, 'outputschema': csw.NAMESPACES['gmd']})}
+
+            for resource in batch:
+                if resource['uuid'] not in records:
+                    continue
+
+                record: dict = records[resource['uuid']]
+                record.update(iso_records.get(resource['uuid'], {}))
+                for key in ('pid', 'last_update'):
+                    if key in resource:
+                        record[key] = resource[key]
+                detailed_resources.append(record)
+
+        return detailed_resources
+
+    def __get_csw_request(self, params: dict, search_results: dict = None) -> list:
+        """
+        Send CSW request with client session and parse streamed XML response incrementally, responses are too large
+        to be kept in HTTP cache
+
+        :param params: GET request parameters
+        :type params: dict
+        :param search_results: dict filled with attributes of csw:SearchResults
+        :type search_results: dict
+        :return: list of listing objects of records in response
+        """
+        with self.session.get(self.csw_url, params=params, stream=True, timeout=60) as response:
+            if response.status_code != requests.codes.ok:
+                raise HttpException(f'GET {self.csw_url} with params {params} returned: {response.status_code}')
+
+            response.raw.decode_content = True
+            return list(csw.iter_records(response.raw, search_results))
+
     def __get_request(self, path: str, params: dict, headers: dict = None) -> dict:
         """
         Constructs GET request form given arguments, and loads json response as dict
@@ -193,14 +455,14 @@ class GeonodeClient(HarvestingClient):
         :type headers: dict
         :return: response json as dict
         """
-        response = requests.get(self.service_url + path, params=params, headers=headers, timeout=10)
+        response = self.http_get(self.service_url + path, params=params, headers=headers, timeout=10)
 
         if response.status_code != requests.codes.ok:
             msg = f'GET {self.service_url + path} with params {params}' \
                   f' returned: {response.status_code} {response.content}'
             raise HttpException(msg)
 
-        return json.loads(response.content.decode('utf-8'))
+        return self.json_loads(response.content)
 
     def __map_layer_to_resource(self, layer: dict, create_file: bool = True) -> Resource:
         """
@@ -221,13 +483,9 @@ class GeonodeClient(HarvestingClient):
 
             res: Resource = Resource(os.environ.get('LAYERS_PARENT_DATAVERSE'), uid=uuid, pid=pid)
 
-        mapping: dict = self.__base_mapping(layer)
-        mapping.update(self.__bounding_box_mapping(layer))
-
-        for key, val in mapping.items():
-            setattr(res.dataset, key, val)
+        vars(res.dataset).update(self.__map_geographic_resource(layer))
 
-        res.last_update = parse_datetime(layer['date']).replace(tzinfo=pytz.UTC)
+        res.last_update = layer.get('last_update') or parse_iso(layer['date'])
 
         return res
 
@@ -279,13 +537,9 @@ class GeonodeClient(HarvestingClient):
 
             res: Resource = Resource(os.environ.get('MAPS_PARENT_DATAVERSE'), uid=uuid, pid=pid)
 
-        mapping: dict = self.__base_mapping(geomap)
-        mapping.update(self.__bounding_box_mapping(geomap))
+        vars(res.dataset).update(self.__map_geographic_resource(geomap))
 
-        for key, val in mapping.items():
-            setattr(res.dataset, key, val)
-
-        res.last_update = parse_datetime(geomap['date']).replace(tzinfo=pytz.UTC)
+        res.last_update = geomap.get('last_update') or parse_iso(geomap['date'])
 
         return res
 
@@ -308,73 +562,8 @@ class GeonodeClient(HarvestingClient):
 
             res: Resource = Resource(os.environ.get('DOCUMENTS_PARENT_DATAVERSE'), uid=uuid, pid=pid)
 
-        mapping: dict = self.__base_mapping(document)
-
-        for key, val in mapping.items():
-            setattr(res.dataset, key, val)
+        vars(res.dataset).update(self.__map_document(document))
 
-        res.last_update = parse_datetime(document['date']).replace(tzinfo=pytz.UTC)
+        res.last_update = document.get('last_update') or parse_iso(document['date'])
 
         return res
-
-    def __create_alternative_url(self, obj: str) -> str:
-        """
-        Create alternative url for Resource and return in full form
-
-        :param obj: detail url data of resource
-        :type obj: str
-        :return: alternative url of resource
-        """
-        service_url: str = self.service_url if self.service_url[-1] == '/' else self.service_url[:-1]
-        detail_url: str = obj[1:] if obj[0] == '/' else obj
-
-        return service_url + detail_url
-
-    @staticmethod
-    def __keywords_mapping(obj: list) -> list:
-        """
-        Maps keywords on compatible list of objects for dataverse Resource
-
-        :param obj: list of keywords from geonode api
-        :return: mapped keywords
-        """
-        return [{'keywordValue': value, 'keywordVocabulary': '', 'keywordVocabularyURI': ''} for value in obj]
-
-    def __base_mapping(self, obj: dict) -> dict:
-        """
-        Map raw data to compatible format for dataverse Resource
-
-        :param obj: resource raw data to map
-        :type obj: dict
-        :return: mapped resource
-        """
-        return {
-            'title': obj['title'],
-            'author': [{'authorName': obj['owner_name'],
-                        'authorAffiliation': ' '}],
-            'alternativeURL': self.__create_alternative_url(obj['detail_url']),
-            'dsDescription': [{'dsDescriptionValue': obj['abstract']}],
-            'datasetContact': [{'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
-                                'datasetContactName': obj['owner_name']}],
-            'dataSources': ['Geonode'],
-            'subject': ['Earth and Environmental Sciences'],
-            'keywords': self.__keywords_mapping(obj['keywords']),
-            'timePeriodCovered': [
-                {'timePeriodCoveredStart': getattr(obj, 'temporal_extent_start', datetime.now().strftime('%Y-%m-%d')),
-                 'timePeriodCoveredEnd': getattr(obj, 'temporal_extent_end', datetime.now()).strftime('%Y-%m-%d')}],
-            'kindOfData': [str(obj['spatial_representation_type'])],
-        }
-
-    @staticmethod
-    def __bounding_box_mapping(obj: dict) -> dict:
-        """
-        Map geographic data to dataverse compatible format
-
-        :param obj: box mapping raw data
-        :type obj: dict
-        :return: mapped geographicBoundingBox
-        """
-        return {
-            'geographicBoundingBox': [{'westLongitude': obj['bbox_x0'], 'eastLongitude': obj['bbox_x1'],
-                                       'northLongitude': obj['bbox_y0'], 'southLongitude': obj['bbox_y1']}]
-        }
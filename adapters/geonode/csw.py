@@ -0,0 +1,192 @@
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, time
+from decimal import Decimal
+from typing import IO, Iterator
+from urllib.parse import urlparse
+
+import pytz
+from django.utils.dateparse import parse_date, parse_datetime
+
+NAMESPACES = {
+    'csw': 'http://www.opengis.net/cat/csw/2.0.2',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'dct': 'http://purl.org/dc/terms/',
+    'ows': 'http://www.opengis.net/ows',
+    'gmd': 'http://www.isotc211.org/2005/gmd',
+    'gco': 'http://www.isotc211.org/2005/gco',
+}
+
+RECORD_TAGS = {f'{{{NAMESPACES["csw"]}}}{name}' for name in ('Record', 'SummaryRecord', 'BriefRecord')}
+ISO_RECORD_TAG = f'{{{NAMESPACES["gmd"]}}}MD_Metadata'
+SEARCH_RESULTS_TAG = f'{{{NAMESPACES["csw"]}}}SearchResults'
+EXCEPTION_TAG = f'{{{NAMESPACES["ows"]}}}ExceptionReport'
+
+
+class CswException(Exception):
+    """
+    Exception report returned by CSW endpoint
+    """
+
+
+def iter_records(stream: IO[bytes], search_results: dict = None) -> Iterator[dict]:
+    """
+    Parse CSW response incrementally and yield every record as Geonode listing object, ISO 19139 records are yielded
+    only with fields Dublin Core records lack. Parsed records are cleared so memory does not grow with size of response
+
+    :param stream: raw response stream
+    :param search_results: dict filled with attributes of csw:SearchResults (e.g. nextRecord)
+    :type search_results: dict
+    :return: iterator of listing objects
+    """
+    parser = ElementTree.iterparse(stream, events=('start', 'end'))
+    _, root = next(parser)
+    # Records are children of csw:SearchResults in GetRecords and of root in GetRecordById response
+    container = root
+
+    if root.tag == EXCEPTION_TAG:
+        for _ in parser:
+            pass
+        raise CswException(' '.join(text.strip() for text in root.itertext() if text.strip()))
+
+    for event, element in parser:
+        if event == 'start' and element.tag == SEARCH_RESULTS_TAG:
+            container = element
+            if search_results is not None:
+                search_results.update(element.attrib)
+        elif event == 'end' and element.tag in RECORD_TAGS:
+            yield record_to_listing(element)
+            container.remove(element)
+        elif event == 'end' and element.tag == ISO_RECORD_TAG:
+            yield iso_record_to_listing(element)
+            container.remove(element)
+
+
+def record_to_listing(record: ElementTree.Element) -> dict:
+    """
+    Convert Dublin Core record to object with fields of Geonode API listing used by mapping functions
+
+    :param record: csw:Record, csw:SummaryRecord or csw:BriefRecord element
+    :return: listing object
+    """
+    uuid = _text(record, 'dc:identifier').strip()
+
+    # Record without valid date can be neither filtered nor skipped, skipped record would look deleted in source
+    try:
+        date = normalize_date(_text(record, 'dct:modified', 'dc:date'))
+    except CswException as exception:
+        raise CswException(f'Record {uuid}: {exception}') from exception
+
+    listing: dict = {
+        'uuid': uuid,
+        'date': date,
+        'title': _text(record, 'dc:title'),
+        'abstract': _text(record, 'dct:abstract', 'dc:description'),
+        'owner_name': _text(record, 'dc:creator', 'dc:publisher'),
+        'keywords': [subject.text for subject in record.findall('dc:subject', NAMESPACES) if subject.text],
+        'detail_url': detail_url(record, uuid),
+        # Dublin Core has no spatial representation type, it is read from ISO record, missing one is None like in API
+        'spatial_representation_type': None,
+    }
+
+    # Resources without extent have whole world bounding box in Geonode
+    x0, x1, y0, y1 = '-180', '180', '-90', '90'
+    bounding_box = record.find('ows:BoundingBox', NAMESPACES)
+    if bounding_box is not None:
+        # EPSG:4326 corners are in latitude/longitude axis order
+        y0, x0 = bounding_box.findtext('ows:LowerCorner', '0 0', NAMESPACES).split()[:2]
+        y1, x1 = bounding_box.findtext('ows:UpperCorner', '0 0', NAMESPACES).split()[:2]
+
+    listing.update({'bbox_x0': normalize_coordinate(x0), 'bbox_x1': normalize_coordinate(x1),
+                    'bbox_y0': normalize_coordinate(y0), 'bbox_y1': normalize_coordinate(y1)})
+
+    return listing
+
+
+def iso_record_to_listing(record: ElementTree.Element) -> dict:
+    """
+    Read fields missing in Dublin Core record from ISO 19139 record
+
+    :param record: gmd:MD_Metadata element
+    :return: listing object with uuid and spatial_representation_type
+    """
+    code = record.find('gmd:identificationInfo/*/gmd:spatialRepresentationType/gmd:MD_SpatialRepresentationTypeCode',
+                       NAMESPACES)
+    spatial_representation_type = None
+
+    if code is not None:
+        spatial_representation_type = (code.get('codeListValue') or code.text or '').strip() or None
+
+    return {
+        'uuid': record.findtext('gmd:fileIdentifier/gco:CharacterString', '', NAMESPACES).strip(),
+        'spatial_representation_type': spatial_representation_type,
+    }
+
+
+def _text(record: ElementTree.Element, *paths: str) -> str:
+    """
+    Return text of first non-empty element from given paths
+
+    :param record: CSW record element
+    :param paths: element paths with namespace prefixes
+    :return: element text or empty string
+    """
+    for path in paths:
+        text = record.findtext(path, '', NAMESPACES)
+        if text:
+            return text
+
+    return ''
+
+
+def detail_url(record: ElementTree.Element, uuid: str) -> str:
+    """
+    Return path of Geonode page of record, CSW record url when record has no link to its page
+
+    :param record: CSW record element
+    :param uuid: identifier of record
+    :type uuid: str
+    :return: relative url
+    """
+    for reference in record.findall('dct:references', NAMESPACES):
+        if 'WWW:LINK' in reference.get('scheme', '') and reference.text:
+            url = urlparse(reference.text.strip())
+            return url.path + (f'?{url.query}' if url.query else '')
+
+    return f'/catalogue/csw?service=CSW&version=2.0.2&request=GetRecordById&id={uuid}'
+
+
+def normalize_coordinate(value: str) -> str:
+    """
+    Format coordinate like decimal with 15 decimal places in Geonode API listing
+
+    :param value: coordinate
+    :type value: str
+    :return: formatted coordinate
+    """
+    return f'{Decimal(value):.15f}'
+
+
+def normalize_date(value: str) -> str:
+    """
+    Convert CSW date to naive UTC ISO date used by Geonode API listing, empty or invalid date raises CswException
+
+    :param value: ISO date or datetime, optionally with time zone
+    :type value: str
+    :return: naive ISO datetime
+    """
+    value = value.strip()
+
+    try:
+        date = parse_datetime(value)
+        if date is None and (day := parse_date(value)) is not None:
+            date = datetime.combine(day, time())
+    except ValueError:
+        date = None
+
+    if date is None:
+        raise CswException(f'Invalid record date {value!r}')
+
+    if date.tzinfo is not None:
+        date = date.astimezone(pytz.UTC).replace(tzinfo=None)
+
+    return date.isoformat()
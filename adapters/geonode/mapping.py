@@ -0,0 +1,47 @@
+from typing import Callable
+
+from core.mapping import Each, Today, Value
+
+
+def alternative_url(service_url: str) -> Callable[[str], str]:
+    """
+    Return function creating full alternative url of resource from its detail url
+
+    :param service_url: Geonode url
+    :type service_url: str
+    :return: function creating alternative url
+    """
+    service_url = service_url if service_url[-1] == '/' else service_url[:-1]
+
+    return lambda detail_url: service_url + (detail_url[1:] if detail_url[0] == '/' else detail_url)
+
+
+def base_spec(service_url: str) -> dict:
+    """
+    Return mapping spec of fields shared by layers, maps and documents
+
+    :param service_url: Geonode url
+    :type service_url: str
+    :return: mapping spec
+    """
+    return {
+        'title': Value('title'),
+        'author': [{'authorName': Value('owner_name'),
+                    'authorAffiliation': ' '}],
+        'alternativeURL': Value('detail_url', transform=alternative_url(service_url)),
+        'dsDescription': [{'dsDescriptionValue': Value('abstract')}],
+        'datasetContact': [{'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
+                            'datasetContactName': Value('owner_name')}],
+        'dataSources': ['Geonode'],
+        'subject': ['Earth and Environmental Sciences'],
+        'keywords': Each('keywords', item={'keywordValue': Value(), 'keywordVocabulary': '',
+                                           'keywordVocabularyURI': ''}),
+        'timePeriodCovered': [{'timePeriodCoveredStart': Today(), 'timePeriodCoveredEnd': Today()}],
+        'kindOfData': [Value('spatial_representation_type', transform=str)],
+    }
+
+
+BOUNDING_BOX_SPEC = {
+    'geographicBoundingBox': [{'westLongitude': Value('bbox_x0'), 'eastLongitude': Value('bbox_x1'),
+                               'northLongitude': Value('bbox_y0'), 'southLongitude': Value('bbox_y1')}],
+}
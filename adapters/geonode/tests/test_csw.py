@@ -0,0 +1,178 @@
+import io
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+from django.test import TestCase
+from django.utils import timezone
+from mock import patch
+
+from adapters.geonode import csw
+from adapters.geonode.client import GeonodeClient
+from core.models import ResourceMapping
+
+RECORD = '''
+<csw:{element} xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" xmlns:dc="http://purl.org/dc/elements/1.1/"
+    xmlns:dct="http://purl.org/dc/terms/" xmlns:ows="http://www.opengis.net/ows">
+  <dc:identifier>{uuid}</dc:identifier>
+  <dc:title>Layer {uuid}</dc:title>
+  <dc:type>dataset</dc:type>
+  <dc:subject>forest</dc:subject>
+  <dc:subject>birds</dc:subject>
+  <dct:modified>2020-06-16T12:52:26+02:00</dct:modified>
+  <dct:abstract>Abstract</dct:abstract>
+  <dc:creator>olga</dc:creator>
+  <dct:references scheme="WWW:LINK-1.0-http--link">https://geonode.test/layers/geonode:{uuid}</dct:references>
+  <ows:BoundingBox crs="urn:x-ogc:def:crs:EPSG:6.11:4326" dimensions="2">
+    <ows:LowerCorner>52.5 23.6</ows:LowerCorner>
+    <ows:UpperCorner>52.9 24.0</ows:UpperCorner>
+  </ows:BoundingBox>
+</csw:{element}>'''
+
+
+ISO_RECORD = '''
+<gmd:MD_Metadata xmlns:gmd="http://www.isotc211.org/2005/gmd" xmlns:gco="http://www.isotc211.org/2005/gco">
+  <gmd:fileIdentifier><gco:CharacterString>{uuid}</gco:CharacterString></gmd:fileIdentifier>
+  <gmd:identificationInfo>
+    <gmd:MD_DataIdentification>
+      <gmd:spatialRepresentationType>
+        <gmd:MD_SpatialRepresentationTypeCode codeList="http://www.isotc211.org/2005/resources/codeList.xml"
+            codeListValue="vector">vector</gmd:MD_SpatialRepresentationTypeCode>
+      </gmd:spatialRepresentationType>
+    </gmd:MD_DataIdentification>
+  </gmd:identificationInfo>
+</gmd:MD_Metadata>'''
+
+
+def get_records_response(uuids: list, next_record: int, matched: int) -> bytes:
+    records = ''.join(RECORD.format(element='SummaryRecord', uuid=uuid) for uuid in uuids)
+    return (f'<?xml version="1.0" encoding="UTF-8"?><csw:GetRecordsResponse '
+            f'xmlns:csw="http://www.opengis.net/cat/csw/2.0.2"><csw:SearchResults numberOfRecordsMatched="{matched}" '
+            f'numberOfRecordsReturned="{len(uuids)}" nextRecord="{next_record}" elementSet="summary">{records}'
+            f'</csw:SearchResults></csw:GetRecordsResponse>').encode('utf-8')
+
+
+def get_record_by_id_response(uuids: list, iso: bool = False) -> bytes:
+    records = ''.join(ISO_RECORD.format(uuid=uuid) if iso else RECORD.format(element='Record', uuid=uuid)
+                      for uuid in uuids)
+    return (f'<?xml version="1.0" encoding="UTF-8"?><csw:GetRecordByIdResponse '
+            f'xmlns:csw="http://www.opengis.net/cat/csw/2.0.2">{records}</csw:GetRecordByIdResponse>').encode('utf-8')
+
+
+class StreamResponseMock:
+    def __init__(self, content: bytes, status_code=200):
+        self.status_code = status_code
+        self.raw = io.BytesIO(content)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class CswTests(TestCase):
+    def test_csw_iter_records(self):
+        search_results: dict = {}
+        records = list(csw.iter_records(io.BytesIO(get_records_response(['uuid1', 'uuid2'], 3, 10)), search_results))
+
+        assert search_results['nextRecord'] == '3'
+        assert [record['uuid'] for record in records] == ['uuid1', 'uuid2']
+        assert records[0]['date'] == '2020-06-16T10:52:26'
+        assert records[0]['keywords'] == ['forest', 'birds']
+        assert records[0]['detail_url'] == '/layers/geonode:uuid1'
+        assert (records[0]['bbox_x0'], records[0]['bbox_y0']) == ('23.600000000000000', '52.500000000000000')
+        assert records[0]['owner_name'] == 'olga'
+
+        record = csw.record_to_listing(ElementTree.fromstring(
+            RECORD.format(element='Record', uuid='uuid3').replace('ows:BoundingBox', 'ows:Other')))
+        assert (record['bbox_x0'], record['bbox_x1']) == ('-180.000000000000000', '180.000000000000000')
+
+        records = list(csw.iter_records(io.BytesIO(get_record_by_id_response(['uuid1'], iso=True))))
+        assert records == [{'uuid': 'uuid1', 'spatial_representation_type': 'vector'}]
+
+    def test_csw_exception_report(self):
+        report = (b'<ows:ExceptionReport xmlns:ows="http://www.opengis.net/ows"><ows:Exception exceptionCode="x">'
+                  b'<ows:ExceptionText>Invalid constraint</ows:ExceptionText></ows:Exception></ows:ExceptionReport>')
+
+        with pytest.raises(csw.CswException, match='Invalid constraint'):
+            list(csw.iter_records(io.BytesIO(report)))
+
+    def test_csw_invalid_date(self):
+        assert csw.normalize_date('2020-06-16') == '2020-06-16T00:00:00'
+
+        for date in ('', 'yesterday', '2020-13-01'):
+            record = RECORD.format(element='Record', uuid='uuid1').replace('2020-06-16T12:52:26+02:00', date)
+
+            with pytest.raises(csw.CswException, match='uuid1'):
+                csw.record_to_listing(ElementTree.fromstring(record))
+
+    @patch('requests.Session.get')
+    def test_geonode_client_get_resources_csw_invalid_date(self, mock_requests_get):
+        ResourceMapping(source='geonode', uid='uuid_listed', pid='PID_LISTED', category=ResourceMapping.LAYER,
+                        last_update=timezone.now()).save()
+        invalid_page = get_records_response(['uuid3'], 0, 3).replace(b'2020-06-16T12:52:26+02:00', b'')
+        mock_requests_get.side_effect = lambda url, params, **kwargs: StreamResponseMock(
+            get_records_response(['uuid1', 'uuid2'], 3, 3) if params['startposition'] == 1 else invalid_page)
+        client = GeonodeClient('https://geonode.test')
+        client.transport = 'csw'
+        client.csw_page_size = 2
+        client.plan_only = True
+
+        add_data, update_data, remove_data = client.get_resources(
+            'api/layers/', client._GeonodeClient__map_layer_to_resource, ResourceMapping.LAYER)
+
+        # Pages before invalid record are harvested, broken listing removes nothing
+        assert [resource['uuid'] for resource in add_data] == ['uuid1', 'uuid2']
+        assert remove_data == []
+
+    @patch('requests.Session.get')
+    def test_geonode_client_get_resources_csw(self, mock_requests_get):
+        ResourceMapping(source='geonode', uid='uuid2', pid='PID_CSW2', category=ResourceMapping.LAYER,
+                        last_update=timezone.now() - timezone.timedelta(weeks=1000)).save()
+        ResourceMapping(source='geonode', uid='uuid_removed', pid='PID_REMOVED', category=ResourceMapping.LAYER,
+                        last_update=timezone.now()).save()
+
+        def get(url, params, **kwargs):
+            if params['request'] == 'GetRecordById':
+                return StreamResponseMock(get_record_by_id_response(
+                    params['id'].split(','), iso=params['outputschema'] == csw.NAMESPACES['gmd']))
+            if params['startposition'] == 1:
+                return StreamResponseMock(get_records_response(['uuid1', 'uuid2'], 3, 3))
+            return StreamResponseMock(get_records_response(['uuid3'], 0, 3))
+
+        mock_requests_get.side_effect = get
+        client = GeonodeClient('https://geonode.test')
+        client.transport = 'csw'
+        client.csw_page_size = 2
+
+        add_data, update_data, remove_data = client.get_resources(
+            'api/layers/', client._GeonodeClient__map_layer_to_resource, ResourceMapping.LAYER)
+
+        assert sorted(resource.uid for resource in add_data) == ['uuid1', 'uuid3']
+        assert [resource.pid for resource in update_data] == ['PID_CSW2']
+        assert [resource.pid for resource in remove_data] == ['PID_REMOVED']
+        assert add_data[0].dataset.title.startswith('Layer')
+        assert add_data[0].dataset.kindOfData == ['vector']
+        assert mock_requests_get.call_args_list[0][0][0] == 'https://geonode.test/catalogue/csw'
+        assert mock_requests_get.call_args_list[0][1]['params']['constraint'] == "dc:type = 'dataset'"
+
+    @patch('requests.Session.get')
+    def test_geonode_client_csw_rest_parity(self, mock_requests_get):
+        mock_requests_get.side_effect = lambda url, params, **kwargs: StreamResponseMock(get_record_by_id_response(
+            params['id'].split(','), iso=params['outputschema'] == csw.NAMESPACES['gmd']))
+        client = GeonodeClient('https://geonode.test')
+        # The same layer as listed by Geonode API
+        rest_listing = {
+            'uuid': 'uuid1', 'date': '2020-06-16T10:52:26', 'title': 'Layer uuid1', 'owner_name': 'olga',
+            'abstract': 'Abstract', 'keywords': ['forest', 'birds'], 'detail_url': '/layers/geonode:uuid1',
+            'spatial_representation_type': 'vector', 'temporal_extent_start': None, 'temporal_extent_end': None,
+            'bbox_x0': '23.600000000000000', 'bbox_x1': '24.000000000000000', 'bbox_y0': '52.500000000000000',
+            'bbox_y1': '52.900000000000000',
+        }
+
+        csw_listing = client._GeonodeClient__get_csw_records_by_id([{'uuid': 'uuid1', 'date': rest_listing['date']}])
+        rest_resource = client._GeonodeClient__map_layer_to_resource(rest_listing)
+        csw_resource = client._GeonodeClient__map_layer_to_resource(csw_listing[0])
+
+        assert vars(csw_resource.dataset) == vars(rest_resource.dataset)
+        assert csw_resource.last_update == rest_resource.last_update
@@ -1,6 +1,8 @@
 import json
+from datetime import datetime
 
 import pytest
+import pytz
 from django.test import TestCase
 from django.utils import timezone
 from mock import patch, Mock
@@ -8,6 +10,7 @@ from mock import patch, Mock
 from adapters.geonode.client import GeonodeClient
 from core.exceptions import HttpException
 from core.models import ResourceMapping
+from core.timestamps import parse_iso
 
 
 class ResponseMock:
@@ -70,13 +73,13 @@ class GeonodeTests(TestCase):
             ]
         }
 
-        cls.resource_mapping_add = ResourceMapping(uid=cls.resource_mapping_added_uid,
+        cls.resource_mapping_add = ResourceMapping(source='geonode', uid=cls.resource_mapping_added_uid,
                                                    last_update=timezone.now() - timezone.timedelta(weeks=30),
                                                    category=ResourceMapping.DASHBOARD).save()
-        cls.resource_mapping_update = ResourceMapping(uid=cls.resource_mapping_update_uid, pid='PID_UPDATE',
+        cls.resource_mapping_update = ResourceMapping(source='geonode', uid=cls.resource_mapping_update_uid, pid='PID_UPDATE',
                                                       last_update=timezone.now() - timezone.timedelta(weeks=30),
                                                       category=ResourceMapping.DASHBOARD).save()
-        cls.resource_mapping_remove = ResourceMapping(uid=cls.resource_mapping_remove_uid,
+        cls.resource_mapping_remove = ResourceMapping(source='geonode', uid=cls.resource_mapping_remove_uid,
                                                       pid='PID_DELETE', last_update=timezone.now(),
                                                       category=ResourceMapping.DASHBOARD).save()
 
@@ -91,19 +94,19 @@ class GeonodeTests(TestCase):
         assert hasattr(self.geonode_client, "_GeonodeClient__map_layer_to_resource")
         assert hasattr(self.geonode_client, "_GeonodeClient__map_map_to_resource")
         assert hasattr(self.geonode_client, "_GeonodeClient__map_document_to_resource")
-        assert hasattr(self.geonode_client, "_GeonodeClient__create_alternative_url")
-        assert hasattr(self.geonode_client, "_GeonodeClient__base_mapping")
-        assert hasattr(self.geonode_client, "_GeonodeClient__bounding_box_mapping")
+        assert hasattr(self.geonode_client, "_GeonodeClient__map_geographic_resource")
+        assert hasattr(self.geonode_client, "_GeonodeClient__map_document")
 
-    @patch('adapters.geonode.client.GeonodeClient.get_resources')
-    def test_geonode_client_harvest(self, mock_get_resources):
-        mock_get_resources.return_value = (['add_data'], ['update_data'], ['remove_data'])
+    @patch('adapters.geonode.client.GeonodeClient.get_resource_stages')
+    def test_geonode_client_harvest(self, mock_get_resource_stages):
+        mock_get_resource_stages.side_effect = lambda *args: iter([(['add_data'], ['update_data'], []),
+                                                                   ([], [], ['remove_data'])])
 
         add_data, update_data, remove_data = self.geonode_client.harvest()
 
-        assert add_data[0] == 'add_data'
-        assert update_data[0] == 'update_data'
-        assert remove_data[0] == 'remove_data'
+        assert add_data == ['add_data'] * 3
+        assert update_data == ['update_data'] * 3
+        assert remove_data == ['remove_data'] * 3
 
     @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_next_page')
     @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
@@ -135,7 +138,7 @@ class GeonodeTests(TestCase):
 
         assert self.geonode_client._GeonodeClient__get_next_page('/docs1', 10, 10) == 'Mocked'
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_geonode_client_get_request(self, mock_requests_get):
         resp = ResponseMock(
             content=bytes(json.dumps(self.get_request_data), 'utf-8')
@@ -149,3 +152,172 @@ class GeonodeTests(TestCase):
 
         with pytest.raises(HttpException):
             self.geonode_client._GeonodeClient__get_request('/docs', {})
+
+    @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
+    def test_geonode_client_get_resources_plan_only(self, mock_get_request):
+        mock_get_request.return_value = self.get_request_data
+        self.geonode_client.plan_only = True
+
+        add_data, update_data, remove_data = self.geonode_client.get_resources(
+            'api/documents/', self.geonode_client._GeonodeClient__map_document_to_resource, ResourceMapping.DOCUMENT)
+        self.geonode_client.plan_only = False
+
+        assert [resource['uuid'] for resource in add_data] == [self.resource_mapping_add_uid,
+                                                                self.resource_mapping_added_uid]
+        assert not ResourceMapping.objects.filter(uid=self.resource_mapping_add_uid).exists()
+
+    @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
+    def test_geonode_client_get_resources_source(self, mock_get_request):
+        mock_get_request.return_value = {**self.get_request_data, 'objects': []}
+        ResourceMapping(source='geonode-north', uid=self.resource_mapping_remove_uid, pid='PID_NORTH',
+                        last_update=timezone.now(), category=ResourceMapping.DOCUMENT).save()
+        ResourceMapping(source='geonode', uid='south-uid', pid='PID_SOUTH',
+                        last_update=timezone.now(), category=ResourceMapping.DOCUMENT).save()
+
+        north_client = GeonodeClient('https://north.url', source='geonode-north')
+        add_data, update_data, remove_data = north_client.get_resources(
+            'api/documents/', north_client._GeonodeClient__map_document_to_resource, ResourceMapping.DOCUMENT)
+
+        assert [resource.pid for resource in remove_data] == ['PID_NORTH']
+
+    @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
+    def test_geonode_client_get_resources_shard(self, mock_get_request):
+        mock_get_request.return_value = {**self.get_request_data, 'objects': [
+            {**self.get_request_data_item, 'uuid': f'uid-{i}'} for i in range(20)
+        ]}
+        for i in range(20, 30):
+            ResourceMapping(source='geonode', uid=f'uid-{i}', pid=f'PID_{i}', last_update=timezone.now(),
+                            category=ResourceMapping.DOCUMENT).save()
+        client = GeonodeClient('https://test.url')
+        client.plan_only = True
+        added, removed = [], []
+
+        for index in range(3):
+            client.shard = (index, 3)
+            add_data, update_data, remove_data = client.get_resources(
+                'api/documents/', client._GeonodeClient__map_document_to_resource, ResourceMapping.DOCUMENT)
+            added.append({resource['uuid'] for resource in add_data})
+            removed.append({resource.uid for resource in remove_data})
+
+        assert set.union(*added) == {f'uid-{i}' for i in range(20)}
+        assert set.union(*removed) == {f'uid-{i}' for i in range(20, 30)}
+        assert sum(map(len, added)) == 20
+        assert sum(map(len, removed)) == 10
+
+    @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
+    def test_geonode_client_get_resource_stages(self, mock_get_request):
+        objects = self.get_request_data['objects']
+        pages = [
+            {'meta': {'limit': 1, 'offset': 0, 'next': 'next'}, 'objects': objects[:1]},
+            {'meta': {'limit': 2, 'offset': 1, 'next': None}, 'objects': objects[1:] + objects[:1]},
+        ]
+        mock_get_request.side_effect = pages
+        ResourceMapping(source='geonode', uid='removed-uid', pid='PID_REMOVED', last_update=timezone.now(),
+                        category=ResourceMapping.DOCUMENT).save()
+        client = GeonodeClient('https://test.url')
+
+        stages = client.get_resource_stages('api/documents/', client._GeonodeClient__map_document_to_resource,
+                                            ResourceMapping.DOCUMENT, True)
+
+        # First page is mapped before second page is requested, removal waits for the whole listing
+        add_data, update_data, remove_data = next(stages)
+        assert mock_get_request.call_count == 1
+        assert [resource.uid for resource in add_data] == [self.resource_mapping_add_uid]
+        assert (update_data, remove_data) == ([], [])
+
+        # Object listed again on later page is skipped
+        add_data, update_data, remove_data = next(stages)
+        assert [resource.uid for resource in add_data] == [self.resource_mapping_added_uid]
+        assert [resource.pid for resource in update_data] == ['PID_UPDATE']
+        assert remove_data == []
+
+        add_data, update_data, remove_data = next(stages)
+        assert (add_data, update_data) == ([], [])
+        assert [resource.pid for resource in remove_data] == ['PID_REMOVED']
+
+        # Listing broken by error removes nothing
+        mock_get_request.side_effect = [pages[0], HttpException()]
+        stages = list(client.get_resource_stages('api/documents/', client._GeonodeClient__map_document_to_resource,
+                                                 ResourceMapping.DOCUMENT))
+
+        assert len(stages) == 1
+        assert stages[0][2] == []
+
+    @patch('adapters.geonode.client.parse_iso', side_effect=parse_iso)
+    @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
+    def test_geonode_client_get_resources_parsed_date(self, mock_get_request, mock_parse_iso):
+        mock_get_request.return_value = {**self.get_request_data, 'meta': {'next': None}}
+        client = GeonodeClient('https://test.url')
+
+        add_data, update_data, _ = client.get_resources(
+            'api/documents/', client._GeonodeClient__map_document_to_resource, ResourceMapping.DOCUMENT, True)
+
+        # Date parsed by update filter is reused by mapping, only added resources parse their date in mapping
+        assert mock_parse_iso.call_count == len(add_data) + len(update_data)
+        assert update_data[0].last_update == datetime(2020, 6, 19, 9, 30, 6, 188641, tzinfo=pytz.UTC)
+
+    @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
+    def test_geonode_client_get_keyset_pages(self, mock_get_request):
+        # Several objects share the same date, so pages must continue inside the same date
+        objects = [{**self.get_request_data_item, 'uuid': f'uid-{i:02}', 'date': f'2020-06-{10 + i // 7:02}T10:00:00'}
+                   for i in range(23)]
+
+        def get_request(path, params):
+            matching = sorted((obj for obj in objects
+                               if obj['date'] == params.get('date', obj['date'])
+                               and obj['uuid'] > params.get('uuid__gt', '')
+                               and obj['date'] > params.get('date__gt', '')),
+                              key=lambda obj: (obj['date'], obj['uuid']))
+            # API applies lower limit than requested
+            return {'meta': {'limit': 4}, 'objects': [dict(obj) for obj in matching[:min(params['limit'], 4)]]}
+
+        mock_get_request.side_effect = get_request
+        self.geonode_client.offset = 5
+        pages = self.geonode_client._GeonodeClient__get_keyset_pages('api/layers/', GeonodeClient.LISTING_FIELDS)
+
+        # Objects of the first page are updated, one of them shares date with unseen objects
+        first_page = next(pages)
+        for obj in objects[:4]:
+            obj['date'] = '2020-06-30T10:00:00'
+        resources = first_page + [resource for page in pages for resource in page]
+
+        assert {resource['uuid'] for resource in resources} == {obj['uuid'] for obj in objects}
+        assert len(resources) == len(objects) + 4
+        assert mock_get_request.call_args_list[0][0][1]['order_by'] == ['date', 'uuid']
+        assert mock_get_request.call_args_list[1][0][1]['uuid__gt'] == 'uid-03'
+        assert all('offset' not in call[0][1] for call in mock_get_request.call_args_list)
+
+    @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
+    def test_geonode_client_get_resources_two_phase(self, mock_get_request):
+        listing = {**self.get_request_data, 'objects': [
+            {'id': index, 'uuid': obj['uuid'], 'date': obj['date']}
+            for index, obj in enumerate(self.get_request_data['objects'])
+        ]}
+        details = {f'api/documents/{index}/': obj for index, obj in enumerate(self.get_request_data['objects'])}
+        mock_get_request.side_effect = lambda path, params: details[path] if path in details else listing
+        client = GeonodeClient('https://test.url')
+        client.fetch_mode = 'two_phase'
+
+        add_data, update_data, remove_data = client.get_resources(
+            'api/documents/', client._GeonodeClient__map_document_to_resource, ResourceMapping.DOCUMENT, True)
+
+        listing_params = mock_get_request.call_args_list[0][0][1]
+        assert listing_params['include[]'] == list(GeonodeClient.RECONCILIATION_FIELDS)
+        assert listing_params['exclude[]'] == '*'
+        assert len(add_data) == 2
+        assert [resource.pid for resource in update_data] == ['PID_UPDATE']
+        assert mock_get_request.call_count == 1 + len(add_data) + len(update_data)
+
+    @patch('adapters.geonode.client.GeonodeClient._GeonodeClient__get_request')
+    def test_geonode_client_get_resources_projected(self, mock_get_request):
+        mock_get_request.return_value = self.get_request_data
+        client = GeonodeClient('https://test.url')
+
+        client.get_resources('api/documents/', client._GeonodeClient__map_document_to_resource,
+                             ResourceMapping.DOCUMENT)
+        assert 'include[]' not in mock_get_request.call_args[0][1]
+
+        client.fetch_mode = 'projected'
+        client.get_resources('api/documents/', client._GeonodeClient__map_document_to_resource,
+                             ResourceMapping.DOCUMENT)
+        assert mock_get_request.call_args[0][1]['include[]'] == list(GeonodeClient.LISTING_FIELDS)
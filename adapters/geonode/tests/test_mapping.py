@@ -0,0 +1,19 @@
+from django.test import TestCase
+
+from adapters.geonode import mapping
+from core.management.benchmarks import geonode_legacy_bounding_box_mapping, geonode_legacy_mapping, geonode_record
+from core.mapping import compile_mapping
+
+
+class GeonodeMappingTests(TestCase):
+    def test_geonode_mapping_equivalence(self):
+        for service_url in ('https://geonode.test/', 'https://geonode.test'):
+            base_spec = mapping.base_spec(service_url)
+            map_layer = compile_mapping({**base_spec, **mapping.BOUNDING_BOX_SPEC})
+            map_document = compile_mapping(base_spec)
+
+            for record in map(geonode_record, range(12)):
+                legacy_mapping = geonode_legacy_mapping(service_url, record)
+
+                assert map_document(record) == legacy_mapping
+                assert map_layer(record) == {**legacy_mapping, **geonode_legacy_bounding_box_mapping(record)}
@@ -1,15 +1,17 @@
 import json
 import logging
 import os
-from typing import List
+from typing import Iterator, List
 
 import requests
 from django.conf import settings
 from django.utils import timezone
 from pyDataverse.models import Datafile
 
+from adapters.grafana import mapping
 from core.clients import HarvestingClient
 from core.exceptions import HttpException
+from core.mapping import compile_mapping
 from core.models import Resource, ResourceMapping
 
 logger = logging.getLogger(__name__)
@@ -24,6 +26,17 @@ class GrafanaClient(HarvestingClient):
     Harvesting Client for harvesting Resources from Grafana
     """
 
+    default_source = 'grafana'
+
+    # Grafana search route returns at most 5000 results per page
+    MAX_PAGE_SIZE = 5000
+
+    page_size = settings.GRAFANA_PAGE_SIZE
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__map_dashboard = compile_mapping(mapping.dashboard_spec(self.service_url), 'map_dashboard')
+
     def harvest(self, force_update: bool = False) -> (List[Resource], list, list):
         """
         Harvests every resource from Grafana and returns is as a list of Resources
@@ -33,8 +46,18 @@ class GrafanaClient(HarvestingClient):
         :return: list of harvested data from Grafana
         """
 
-        return self.get_resources('api/search/', self.__map_dashboard_to_resource, ResourceMapping.DASHBOARD,
-                                  force_update)
+        return self.merge_stages(self.harvest_stages(force_update))
+
+    def harvest_stages(self, force_update: bool = False) -> Iterator[tuple]:
+        """
+        Harvests dashboards from Grafana yielding add/update/remove lists of every fetched search page
+
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: iterator of add/update/remove lists with Resources of harvested data from Grafana
+        """
+        return self.get_resource_stages('api/search/', self.__map_dashboard_to_resource, ResourceMapping.DASHBOARD,
+                                        force_update)
 
     def get_resources(self, resource_path: str, resource_map_function, resource_mapping_category,
                       force_update: bool = False) -> (List[Resource], list, list):
@@ -50,99 +73,140 @@ class GrafanaClient(HarvestingClient):
         :type force_update: bool
         :return: list of fetched data as Resources list
         """
-        params: dict = {
-            'limit': 10,
-        }
+        return self.merge_stages(self.get_resource_stages(resource_path, resource_map_function,
+                                                          resource_mapping_category, force_update))
+
+    def get_resource_stages(self, resource_path: str, resource_map_function, resource_mapping_category,
+                            force_update: bool = False) -> Iterator[tuple]:
+        """
+        Fetch search pages from Grafana API endpoint and yield Resources to add and update of every page as soon as
+        their dashboards are fetched and mapped, Resources to remove are yielded last when every page is known.
+        Nothing is removed after error
+
+        :param resource_path: url relative path to API endpoint
+        :type resource_path: str
+        :param resource_map_function: function mapping data type retrieved from endpoint to Resource object
+        :param resource_mapping_category: category of mapping showed in ResourceMapping category field
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: iterator of add/update/remove fetched data as Resources lists
+        """
+        listed_uids: set = set()
 
         try:
-            results: list = self.__get_request(resource_path, params)
+            for page in self.__get_pages(resource_path, {'type': 'dash-db'}):
+                page = self.filter_shard(page, lambda resource: resource['uid'])
+                listed_uids.update(resource['uid'] for resource in page)
+                resources: list = [{'search': resource} for resource in page]
+
+                add_resources: list = self.__filter_new_resources(resources)
+                update_resources: list = self.__filter_update_resources(resources, force_update)
+
+                if self.plan_only:
+                    yield add_resources, update_resources, []
+                    continue
+
+                # Get detailed data only for dashboards to add or update
+                add_resources = self.__get_detailed_data([resource['search'] for resource in add_resources])
+                updated_resources: list = self.__get_detailed_data(
+                    [resource['search'] for resource in update_resources])
+                for detailed_resource, resource in zip(updated_resources, update_resources):
+                    detailed_resource['pid'] = resource['pid']
+
+                yield (self.map_resources(add_resources, resource_map_function, resource_mapping_category),
+                       self.map_resources(updated_resources, resource_map_function, resource_mapping_category,
+                                          create_file=False),
+                       [])
         except HttpException as exception:
             http_exception_handler(exception)
-            return []
+            return
 
-        resources: list = results
-        page_number: int = 1
-        while len(results) > 0:
-            page_number += 1
-            results: list = self.__get_next_page(resource_path, page_number, params['limit'])
-            resources += results
-
-        # Get detailed resource data
-        resources: list = self.__get_detailed_data(resources)
-        add_resources: List[Resource] = self.__filter_new_resources(resources, resource_map_function,
-                                                                    resource_mapping_category)
-        update_resources = []
-        if force_update:
-            update_resources = self.__filter_update_resources(resources, resource_map_function)
-        delete_resources: list = self.__filter_remove_resources(resources)
-
-        return add_resources, update_resources, delete_resources
-
-    @staticmethod
-    def __filter_new_resources(resources: list, resource_map_function, category) -> List[Resource]:
+        yield [], [], self.__filter_remove_resources(listed_uids)
+
+    def __filter_new_resources(self, resources: list) -> list:
         """
         Filter only new Resources in list of raw data from source
 
         :param resources: fetched data from source with resources raw data
         :type resources: list
-        :param resource_map_function: mapping function for resource
-        :param category: category of resource for mapping
-        :return: list of mapped resources
+        :return: list of new resources raw data
         """
         add_resources: list = []
 
         for resource in resources:
             uid: str = resource['search']['uid']
-            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(uid=uid).first()
+            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(source=self.source, uid=uid).first()
 
             if resource_mapping is None or resource_mapping.pid is None:
-                if resource_mapping is None:
-                    ResourceMapping(uid=uid, pid=None, last_update=timezone.now(), category=category).save()
-
                 add_resources.append(resource)
 
-        return [resource_map_function(resource) for resource in add_resources]
+        return add_resources
 
-    @staticmethod
-    def __filter_update_resources(resources: list, resource_map_function) -> List[Resource]:
+    def __filter_update_resources(self, resources: list, force_update: bool = False) -> list:
         """
-        Filter only Resources to update in raw data from source
+        Filter only Resources to update in raw data from source, dashboard is updated when its version differs from
+        version stored in resource mapping
 
         :param resources: fetched data from source with resources raw data
         :type resources: list
-        :param resource_map_function: mapping function for resource
-        :return: list of mapped resources
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: list of resources to update raw data
         """
         update_resources: list = []
 
         for resource in resources:
             uid: str = resource['search']['uid']
-            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(uid=uid).first()
+            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(source=self.source, uid=uid).first()
 
-            resource['pid'] = resource_mapping.pid if resource_mapping.pid else None
+            if resource_mapping is None or resource_mapping.pid is None:
+                continue
 
-            if resource_mapping is not None and resource_mapping.pid is not None:
+            if force_update or resource_mapping.source_version is None or \
+                    self.__get_version(resource['search']) != resource_mapping.source_version:
+                resource['pid'] = resource_mapping.pid
                 update_resources.append(resource)
 
-        return [resource_map_function(resource, create_file=False) for resource in update_resources]
+        return update_resources
+
+    def __get_version(self, resource: dict) -> int:
+        """
+        Return current version of dashboard from search data or from latest entry of dashboard versions route
+
+        :param resource: dashboard data from Grafana search route
+        :type resource: dict
+        :return: current dashboard version
+        """
+        if 'version' in resource:
+            return resource['version']
+
+        try:
+            versions = self.__get_request(f'api/dashboards/id/{resource["id"]}/versions', {'limit': 1})
+        except HttpException as exception:
+            http_exception_handler(exception)
+            return None
+
+        if isinstance(versions, dict):
+            versions = versions.get('versions', [])
 
-    @staticmethod
-    def __filter_remove_resources(resources: list) -> list:
+        return versions[0]['version'] if versions else None
+
+    def __filter_remove_resources(self, resources_uid: set) -> list:
         """
         Filter Resources deleted in source
 
-        :param resources: fetched data from source with resources raw data
-        :type resources: list
+        :param resources_uid: UIDs of every dashboard listed in source
+        :type resources_uid: set
         :return: list of resources to delete
         """
-        resources_uid: List[str] = [resource['search']['uid'] for resource in resources]
         delete_resources = ResourceMapping.objects.filter(
+            source=self.source,
             category=ResourceMapping.DASHBOARD
         ).exclude(
             uid__in=resources_uid
         )
 
-        return list(delete_resources)
+        return self.filter_shard(delete_resources, lambda resource_mapping: resource_mapping.uid)
 
     def __get_detailed_data(self, resources: list) -> list:
         """
@@ -160,8 +224,8 @@ class GrafanaClient(HarvestingClient):
 
         for resource in resources:
             uid: str = resource['uid']
-            response = requests.get(self.service_url + 'api/dashboards/uid/' + uid, headers=headers, timeout=10)
-            response_json = json.loads(response.text)
+            response = self.http_get(self.service_url + 'api/dashboards/uid/' + uid, headers=headers, timeout=10)
+            response_json = self.json_loads(response.content)
 
             res: dict = {
                 'meta': response_json['meta'],
@@ -173,7 +237,29 @@ class GrafanaClient(HarvestingClient):
 
         return detailed_resources
 
-    def __get_next_page(self, path: str, page: int, limit: int) -> list:
+    def __get_pages(self, path: str, params: dict) -> Iterator[list]:
+        """
+        Fetch every page of search route, paging stops on first page shorter than page size. Params can narrow search
+        e.g. with folderIds for folder scoped harvest
+
+        :param path: relative url path
+        :type path: str
+        :param params: additional GET request parameters
+        :type params: dict
+        :return: iterator of results of every page
+        """
+        limit: int = max(1, min(int(self.page_size), self.MAX_PAGE_SIZE))
+
+        results: list = self.__get_request(path, {**params, 'limit': limit, 'page': 1})
+        yield results
+        page_number: int = 1
+
+        while len(results) >= limit:
+            page_number += 1
+            results: list = self.__get_next_page(path, page_number, limit, params)
+            yield results
+
+    def __get_next_page(self, path: str, page: int, limit: int, params: dict = None) -> list:
         """
         Sends get_request for next page
 
@@ -183,9 +269,12 @@ class GrafanaClient(HarvestingClient):
         :type page: int
         :param limit: request list limit
         :type limit: int
+        :param params: additional GET request parameters
+        :type params: dict
         :return: __get_request function with params for next page
         """
         params: dict = {
+            **(params or {}),
             'limit': limit,
             'page': page
         }
@@ -206,10 +295,10 @@ class GrafanaClient(HarvestingClient):
             'Authorization': f'Bearer {self.api_key}'
         }
 
-        response = requests.get(self.service_url + path, params=params, headers=headers, timeout=10)
+        response = self.http_get(self.service_url + path, params=params, headers=headers, timeout=10)
 
         if response.status_code == requests.codes.ok:
-            return json.loads(response.text)
+            return self.json_loads(response.content)
 
         msg = f'GET {self.service_url + path} with params {params} returned: {response.status_code} {response.text}'
         raise HttpException(msg)
@@ -261,47 +350,9 @@ class GrafanaClient(HarvestingClient):
 
             res: Resource = Resource(os.environ.get('DASHBOARDS_PARENT_DATAVERSE'), pid=pid, uid=uid)
 
-        mapping: dict = self.__base_mapping(dashboard)
-
-        for key, val in mapping.items():
-            setattr(res.dataset, key, val)
+        vars(res.dataset).update(self.__map_dashboard(dashboard))
 
         res.last_update = timezone.now()
+        res.source_version = dashboard['dashboard'].get('version')
 
         return res
-
-    def __create_alternative_url(self, obj: str) -> str:
-        """
-        Create alternative url for Resource and return in full form
-
-        :param obj: detail url data of resource
-        :type obj: str
-        :return: alternative url of resource
-        """
-        service_url: str = self.service_url if self.service_url[-1] == '/' else self.service_url[:-1]
-        detail_url: str = obj[1:] if obj[0] == '/' else obj
-
-        return service_url + 'd/' + detail_url
-
-    def __base_mapping(self, obj: dict) -> dict:
-        """
-        Map raw data to compatible format for dataverse Resource
-
-        :param obj: resource raw data to map
-        :type obj: dict
-        :return: mapped resource
-        """
-        return {
-            'title': obj['search']['title'],
-            'publicationDate': obj['meta']['created'],
-            'author': [{'authorName': obj['meta']['createdBy'],
-                        'authorAffiliation': ' '}],
-            'alternativeURL': self.__create_alternative_url(obj['search']['uid']),
-            'datasetContact': [{'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
-                                'datasetContactName': obj['meta']['createdBy']}],
-            'dataSources': ['Grafana'],
-            'subject': ['Earth and Environmental Sciences'],
-            'dsDescription': [{'dsDescriptionValue': obj['search'].get('title', 'Unknown')}],
-            'depositor': obj['meta']['createdBy'],
-            'dateOfDeposit': obj['meta']['created'],
-        }
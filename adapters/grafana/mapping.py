@@ -0,0 +1,40 @@
+from typing import Callable
+
+from core.mapping import Value
+
+
+def alternative_url(service_url: str) -> Callable[[str], str]:
+    """
+    Return function creating full alternative url of dashboard from its uid
+
+    :param service_url: Grafana url
+    :type service_url: str
+    :return: function creating alternative url
+    """
+    service_url = (service_url if service_url[-1] == '/' else service_url[:-1]) + 'd/'
+
+    return lambda uid: service_url + (uid[1:] if uid[0] == '/' else uid)
+
+
+def dashboard_spec(service_url: str) -> dict:
+    """
+    Return mapping spec of dashboard
+
+    :param service_url: Grafana url
+    :type service_url: str
+    :return: mapping spec
+    """
+    return {
+        'title': Value('search', 'title'),
+        'publicationDate': Value('meta', 'created'),
+        'author': [{'authorName': Value('meta', 'createdBy'),
+                    'authorAffiliation': ' '}],
+        'alternativeURL': Value('search', 'uid', transform=alternative_url(service_url)),
+        'datasetContact': [{'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
+                            'datasetContactName': Value('meta', 'createdBy')}],
+        'dataSources': ['Grafana'],
+        'subject': ['Earth and Environmental Sciences'],
+        'dsDescription': [{'dsDescriptionValue': Value('search', 'title', default='Unknown')}],
+        'depositor': Value('meta', 'createdBy'),
+        'dateOfDeposit': Value('meta', 'created'),
+    }
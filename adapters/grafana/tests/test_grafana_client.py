@@ -14,6 +14,7 @@ class ResponseMock:
     def __init__(self, text=None, status_code=200):
         self.status_code = status_code
         self.text = text
+        self.content = text.encode('utf-8') if text is not None else None
 
 
 class GrafanaTests(TestCase):
@@ -112,16 +113,16 @@ class GrafanaTests(TestCase):
             },
         ]
 
-        cls.resource_mapping_add = ResourceMapping(uid=cls.get_detailed_data_add_uid,
+        cls.resource_mapping_add = ResourceMapping(source='grafana', uid=cls.get_detailed_data_add_uid,
                                                    last_update=timezone.now() - timezone.timedelta(weeks=30),
                                                    category=ResourceMapping.DASHBOARD).save()
-        cls.resource_mapping_added = ResourceMapping(uid=cls.resource_mapping_added_uid, pid='PID_ADDED',
+        cls.resource_mapping_added = ResourceMapping(source='grafana', uid=cls.resource_mapping_added_uid, pid='PID_ADDED',
                                                      last_update=timezone.now() - timezone.timedelta(weeks=30),
-                                                     category=ResourceMapping.DASHBOARD).save()
-        cls.resource_mapping_updated = ResourceMapping(uid=cls.resource_mapping_updated_uid, pid='PID_UPDATED',
+                                                     category=ResourceMapping.DASHBOARD, source_version=1).save()
+        cls.resource_mapping_updated = ResourceMapping(source='grafana', uid=cls.resource_mapping_updated_uid, pid='PID_UPDATED',
                                                        last_update=timezone.now() - timezone.timedelta(weeks=35),
                                                        category=ResourceMapping.DASHBOARD).save()
-        cls.resource_mapping_remove = ResourceMapping(uid=cls.resource_mapping_remove_uid,
+        cls.resource_mapping_remove = ResourceMapping(source='grafana', uid=cls.resource_mapping_remove_uid,
                                                       pid='PID_DELETE', last_update=timezone.now(),
                                                       category=ResourceMapping.DASHBOARD).save()
 
@@ -134,12 +135,11 @@ class GrafanaTests(TestCase):
         assert hasattr(self.grafana_client, "_GrafanaClient__get_next_page")
         assert hasattr(self.grafana_client, "_GrafanaClient__get_request")
         assert hasattr(self.grafana_client, "_GrafanaClient__map_dashboard_to_resource")
-        assert hasattr(self.grafana_client, "_GrafanaClient__create_alternative_url")
-        assert hasattr(self.grafana_client, "_GrafanaClient__base_mapping")
+        assert hasattr(self.grafana_client, "_GrafanaClient__map_dashboard")
 
-    @patch('adapters.grafana.client.GrafanaClient.get_resources')
-    def test_grafana_client_harvest(self, mock_get_resources):
-        mock_get_resources.return_value = (['add_data'], [], ['remove_data'])
+    @patch('adapters.grafana.client.GrafanaClient.get_resource_stages')
+    def test_grafana_client_harvest(self, mock_get_resource_stages):
+        mock_get_resource_stages.return_value = iter([(['add_data'], [], []), ([], [], ['remove_data'])])
 
         add_data, update_data, remove_data = self.grafana_client.harvest()
 
@@ -148,21 +148,59 @@ class GrafanaTests(TestCase):
         assert len(update_data) == 0
         assert remove_data[0] == 'remove_data'
 
+    @patch('adapters.grafana.client.GrafanaClient._GrafanaClient__get_version', return_value=1)
     @patch('adapters.grafana.client.GrafanaClient._GrafanaClient__get_detailed_data')
     @patch('adapters.grafana.client.GrafanaClient._GrafanaClient__get_next_page')
     @patch('adapters.grafana.client.GrafanaClient._GrafanaClient__get_request')
-    def test_grafana_client_get_resources(self, mock_get_request, mock_get_next_page_data, mock_get_detailed_data):
+    def test_grafana_client_get_resources(self, mock_get_request, mock_get_next_page_data, mock_get_detailed_data,
+                                          mock_get_version):
         mock_get_request.return_value = self.get_request_data
         mock_get_next_page_data.return_value = []
-        mock_get_detailed_data.return_value = self.get_detailed_data
+        mock_get_detailed_data.side_effect = lambda resources: [{**self.get_detailed_data_item, 'search': resource}
+                                                                for resource in resources]
 
         add_data, update_data, remove_data = self.grafana_client.harvest()
 
         assert add_data[0].uid == self.get_request_data[0]['uid']
         assert len(add_data) == 2
-        assert len(update_data) == 0
+        assert len(update_data) == 1
+        assert update_data[0].uid == self.resource_mapping_updated_uid
+        assert update_data[0].source_version == 1
         assert remove_data[0].uid == self.resource_mapping_remove_uid
 
+        # Dashboard with unchanged version is updated only when forced
+        add_data, update_data, remove_data = self.grafana_client.harvest(force_update=True)
+
+        assert len(update_data) == 2
+
+    @patch('adapters.grafana.client.GrafanaClient._GrafanaClient__get_next_page')
+    @patch('adapters.grafana.client.GrafanaClient._GrafanaClient__get_request')
+    def test_grafana_client_get_pages(self, mock_get_request, mock_get_next_page):
+        mock_get_request.return_value = self.get_request_data[:2]
+        mock_get_next_page.side_effect = [self.get_request_data[2:4], self.get_request_data[:1]]
+        self.grafana_client.page_size = 2
+
+        pages = list(self.grafana_client._GrafanaClient__get_pages('api/search/', {'folderIds': 1}))
+        self.grafana_client.page_size = GrafanaClient.page_size
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert mock_get_next_page.call_count == 2
+        mock_get_request.assert_called_once_with('api/search/', {'folderIds': 1, 'limit': 2, 'page': 1})
+        mock_get_next_page.assert_called_with('api/search/', 3, 2, {'folderIds': 1})
+
+    @patch('adapters.grafana.client.GrafanaClient._GrafanaClient__get_request')
+    def test_grafana_client_get_version(self, mock_get_request):
+        assert self.grafana_client._GrafanaClient__get_version({'id': 1, 'version': 3}) == 3
+
+        mock_get_request.return_value = [{'version': 4}]
+        assert self.grafana_client._GrafanaClient__get_version({'id': 1}) == 4
+
+        mock_get_request.return_value = {'versions': [{'version': 5}]}
+        assert self.grafana_client._GrafanaClient__get_version({'id': 1}) == 5
+
+        mock_get_request.side_effect = Mock(side_effect=HttpException())
+        assert self.grafana_client._GrafanaClient__get_version({'id': 1}) is None
+
     @patch('adapters.grafana.client.GrafanaClient._GrafanaClient__get_request')
     def test_grafana_client_get_resources_exception(self, mock_get_request):
         mock_get_request.side_effect = Mock(side_effect=HttpException())
@@ -170,7 +208,7 @@ class GrafanaTests(TestCase):
         self.grafana_client.get_resources('dashboards/', self.grafana_client._GrafanaClient__map_dashboard_to_resource,
                                           ResourceMapping.DASHBOARD)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_grafana_client_get_detailed_data(self, mock_requests_get):
         resp = ResponseMock(json.dumps(
             self.get_detailed_data[0]
@@ -187,7 +225,7 @@ class GrafanaTests(TestCase):
 
         assert self.grafana_client._GrafanaClient__get_next_page('/path', 2, 10) == 'Mocked'
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_grafana_client_get_request(self, mock_requests_get):
         resp = ResponseMock(
             text=json.dumps(self.get_request_data[:1])
@@ -0,0 +1,14 @@
+from django.test import TestCase
+
+from adapters.grafana import mapping
+from core.management.benchmarks import grafana_legacy_mapping, grafana_record
+from core.mapping import compile_mapping
+
+
+class GrafanaMappingTests(TestCase):
+    def test_grafana_mapping_equivalence(self):
+        for service_url in ('https://grafana.test/', 'https://grafana.test'):
+            map_dashboard = compile_mapping(mapping.dashboard_spec(service_url))
+
+            for record in map(grafana_record, range(6)):
+                assert map_dashboard(record) == grafana_legacy_mapping(service_url, record)
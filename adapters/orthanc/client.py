@@ -1,17 +1,23 @@
+import hashlib
 import json
 import logging
 import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List
+from typing import Iterator, List
 
 import pytz
 import requests
 from django.conf import settings
 from pyDataverse.models import Datafile
 
+from adapters.orthanc import mapping
 from core.clients import HarvestingClient
 from core.exceptions import HttpException
+from core.mapping import compile_mapping
 from core.models import Resource, ResourceMapping
+from core.timestamps import parse_compact
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,35 @@ class OrthancClient(HarvestingClient):
     Harvesting Client for harvesting Resources from Orthanc
     """
 
+    default_source = 'orthanc'
+
+    # DICOM tags read by mapping functions, split by level Orthanc stores them on
+    PATIENT_TAGS = ('PatientName', 'PatientID', 'PatientBirthDate')
+    STUDY_TAGS = ('StudyDate', 'ReferringPhysicianName', 'InstitutionName', 'StudyDescription')
+
+    # DICOM JSON attribute tags of QIDO-RS results by keyword
+    DICOM_TAGS = {
+        'PatientName': '00100010',
+        'PatientID': '00100020',
+        'PatientBirthDate': '00100030',
+        'StudyDate': '00080020',
+        'ReferringPhysicianName': '00080090',
+        'InstitutionName': '00080080',
+        'StudyDescription': '00081030',
+        'StudyInstanceUID': '0020000D',
+    }
+
+    transport = settings.ORTHANC_TRANSPORT
+    page_size = settings.ORTHANC_PAGE_SIZE
+    dicomweb_workers = settings.ORTHANC_DICOMWEB_WORKERS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dicomweb_url = settings.ORTHANC_DICOMWEB_URL or self.service_url + 'dicom-web/'
+        if self.dicomweb_url[-1] != '/':
+            self.dicomweb_url += '/'
+        self.__map_study = compile_mapping(mapping.study_spec(self.service_url), 'map_study')
+
     def harvest(self, force_update: bool = False) -> (List[Resource], List[Resource], list):
         """
         Harvests every resource from Orthanc and returns is as a list of Resources
@@ -34,7 +69,17 @@ class OrthancClient(HarvestingClient):
         :return: list of harvested data from Orthanc
         """
 
-        return self.get_resources('studies/', self.__map_study_to_resource, ResourceMapping.STUDY, force_update)
+        return self.merge_stages(self.harvest_stages(force_update))
+
+    def harvest_stages(self, force_update: bool = False) -> Iterator[tuple]:
+        """
+        Harvests studies from Orthanc yielding add/update/remove lists of every fetched page
+
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: iterator of add/update/remove lists with Resources of harvested data from Orthanc
+        """
+        return self.get_resource_stages('studies/', self.__map_study_to_resource, ResourceMapping.STUDY, force_update)
 
     def get_resources(self, resource_path: str, resource_map_function, resource_mapping_category,
                       force_update: bool = False) -> (List[Resource], List[Resource], list):
@@ -49,22 +94,66 @@ class OrthancClient(HarvestingClient):
         :type force_update: bool
         :return: list of fetched data as Resources list
         """
+        return self.merge_stages(self.get_resource_stages(resource_path, resource_map_function,
+                                                          resource_mapping_category, force_update))
+
+    def get_resource_stages(self, resource_path: str, resource_map_function, resource_mapping_category,
+                            force_update: bool = False) -> Iterator[tuple]:
+        """
+        Fetch studies from Orthanc page by page and yield Resources to add and update of every page as soon as it is
+        mapped, Resources to remove are yielded last when every study is known. Nothing is removed after error
+
+        :param resource_path: url relative path to API endpoint
+        :type resource_path: str
+        :param resource_map_function: function mapping data type retrieved from endpoint to Resource object
+        :param resource_mapping_category: category of mapping showed in ResourceMapping category field
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: iterator of add/update/remove fetched data as Resources lists
+        """
+        listed_uids: set = set()
+
         try:
-            results: list = self.__get_request(resource_path, {})
+            if self.transport == 'find':
+                pages: Iterator[list] = self.__find_studies()
+            elif self.transport == 'dicomweb':
+                pages: Iterator[list] = self.__search_studies()
+            else:
+                pages: Iterator[list] = self.__get_detailed_pages(resource_path)
+
+            for page in pages:
+                resources: list = self.filter_shard(page, lambda study: study['ID'])
+                listed_uids.update(resource['ID'] for resource in resources)
+
+                add_resources: list = self.__filter_new_resources(resources)
+                update_resources: list = self.__filter_update_resources(resources, force_update)
+
+                if self.plan_only:
+                    yield add_resources, update_resources, []
+                    continue
+
+                yield (self.map_resources(add_resources, resource_map_function, resource_mapping_category),
+                       self.map_resources(update_resources, resource_map_function, resource_mapping_category,
+                                          create_file=False),
+                       [])
         except HttpException as exception:
             http_exception_handler(exception)
-            return []
+            return
+
+        yield [], [], self.__filter_remove_resources(listed_uids)
 
-        resources: list = results
-        resources: list = self.__get_detailed_data(resources)
+    def __get_detailed_pages(self, resource_path: str) -> Iterator[list]:
+        """
+        Fetch IDs of every study and their details in pages of page size, only studies of harvested shard are fetched
 
-        add_resources: List[Resource] = self.__filter_new_resources(resources, resource_map_function,
-                                                                    resource_mapping_category)
-        update_resources: List[Resource] = self.__filter_update_resources(resources, resource_map_function,
-                                                                          force_update)
-        delete_resources: list = self.__filter_remove_resources(resources)
+        :param resource_path: url relative path to API endpoint
+        :type resource_path: str
+        :return: iterator of study details of every page
+        """
+        uids: list = self.filter_shard(self.__get_request(resource_path, {}), lambda uid: uid)
 
-        return add_resources, update_resources, delete_resources
+        for start in range(0, len(uids), max(self.page_size, 1)):
+            yield self.__get_detailed_data(uids[start:start + max(self.page_size, 1)])
 
     def __get_detailed_data(self, resources: list) -> list:
         """
@@ -77,82 +166,234 @@ class OrthancClient(HarvestingClient):
         detailed_resources: list = []
 
         for resource in resources:
-            response = requests.get(self.service_url + 'studies/' + resource, timeout=10)
-            response_json = json.loads(response.text)
+            response = self.http_get(self.service_url + 'studies/' + resource, timeout=10)
+            response_json = self.json_loads(response.content)
 
             detailed_resources.append(response_json)
 
         return detailed_resources
 
+    def __find_studies(self) -> Iterator[list]:
+        """
+        Fetch expanded studies in pages of /tools/find with only tags read by mapping functions, one request returns
+        whole page instead of request per study. Orthanc may return fewer studies than requested (LimitFindResults),
+        so next page starts after studies actually returned and paging stops only on empty page
+
+        :return: iterator of studies of every page in the same format as study detail
+        """
+        query: dict = {
+            'Level': 'Study',
+            'Query': {},
+            'Expand': True,
+            'RequestedTags': list(self.PATIENT_TAGS + self.STUDY_TAGS),
+            'Limit': self.page_size,
+            'Since': 0,
+        }
+
+        while True:
+            response = self.http_post(self.service_url + 'tools/find', data=query, timeout=30)
+
+            if response.status_code != requests.codes.ok:
+                raise HttpException(f'POST {self.service_url}tools/find with {query} returned: '
+                                    f'{response.status_code} {response.text}')
+
+            page: list = self.json_loads(response.content)
+
+            if not page:
+                return
+
+            yield [self.__merge_requested_tags(study) for study in page]
+            query['Since'] += len(page)
+
+    def __merge_requested_tags(self, study: dict) -> dict:
+        """
+        Move requested tags of found study to main tags of patient and study like in study detail
+
+        :param study: expanded study returned by /tools/find
+        :type study: dict
+        :return: study with requested tags in main tags
+        """
+        requested_tags: dict = study.pop('RequestedTags', {})
+        patient_tags: dict = study.setdefault('PatientMainDicomTags', {})
+        study_tags: dict = study.setdefault('MainDicomTags', {})
+
+        for tag, value in requested_tags.items():
+            (patient_tags if tag in self.PATIENT_TAGS else study_tags).setdefault(tag, value)
+
+        # Missing tags are empty like in study detail, except StudyDescription which has own default in mapping
+        for tag in self.PATIENT_TAGS:
+            patient_tags.setdefault(tag, '')
+        for tag in self.STUDY_TAGS:
+            if tag != 'StudyDescription':
+                study_tags.setdefault(tag, '')
+
+        return study
+
+    def __search_studies(self) -> Iterator[list]:
+        """
+        Fetch studies with QIDO-RS search in pages, pages after the first one are requested concurrently in batches of
+        workers number until a page is empty. Server may return fewer studies than requested limit (its own maximum),
+        so pages step by number of studies in the first page
+
+        :return: iterator of studies of every batch of pages in the same format as study detail
+        """
+        first_page: list = self.__search_studies_page(0)
+
+        if not first_page:
+            return
+
+        yield [self.__convert_dicom_json(study) for study in first_page]
+        step = offset = len(first_page)
+
+        with ThreadPoolExecutor(max_workers=max(self.dicomweb_workers, 1)) as executor:
+            while True:
+                offsets = [offset + index * step for index in range(max(self.dicomweb_workers, 1))]
+                pages: list = list(executor.map(self.__search_studies_page, offsets))
+                studies: list = [self.__convert_dicom_json(study) for page in pages for study in page]
+
+                if studies:
+                    yield studies
+
+                if not all(pages):
+                    return
+
+                offset = offsets[-1] + step
+
+    def __search_studies_page(self, offset: int) -> list:
+        """
+        Fetch one page of QIDO-RS studies search with only tags used by mapping functions
+
+        :param offset: number of skipped studies
+        :type offset: int
+        :return: list of studies in DICOM JSON format
+        """
+        params: dict = {
+            'includefield': list(self.DICOM_TAGS),
+            'limit': self.page_size,
+            'offset': offset,
+        }
+        response = self.http_get(self.dicomweb_url + 'studies', params=params,
+                                 headers={'Accept': 'application/dicom+json'}, timeout=30)
+
+        # No matching studies are returned as 204 without body
+        if response.status_code == requests.codes.no_content:
+            return []
+
+        if response.status_code != requests.codes.ok:
+            raise HttpException(f'GET {self.dicomweb_url}studies with params {params} returned: '
+                                f'{response.status_code} {response.text}')
+
+        return self.json_loads(response.content)
+
+    def __convert_dicom_json(self, study: dict) -> dict:
+        """
+        Convert QIDO-RS study in DICOM JSON format to format of Orthanc study detail. Orthanc ID is computed the way
+        Orthanc does it, so resource mappings are shared with other transports. QIDO-RS has no modification date, so
+        hash of tags is used as source version and study is updated when it changes
+
+        :param study: study in DICOM JSON format
+        :type study: dict
+        :return: study in format of Orthanc study detail
+        """
+        tags: dict = {keyword: self.__dicom_json_value(study.get(tag)) for keyword, tag in self.DICOM_TAGS.items()}
+        if not study.get(self.DICOM_TAGS['StudyDescription']):
+            tags.pop('StudyDescription')
+
+        orthanc_id: str = hashlib.sha1(f'{tags["PatientID"]}|{tags["StudyInstanceUID"]}'.encode('utf-8')).hexdigest()
+
+        return {
+            'ID': '-'.join(orthanc_id[index:index + 8] for index in range(0, 40, 8)),
+            'LastUpdate': datetime.utcnow().strftime('%Y%m%dT%H%M%S'),
+            'SourceVersion': zlib.crc32(json.dumps(tags, sort_keys=True).encode('utf-8')) & 0x7fffffff,
+            'PatientMainDicomTags': {keyword: tags[keyword] for keyword in self.PATIENT_TAGS},
+            'MainDicomTags': {keyword: value for keyword, value in tags.items() if keyword not in self.PATIENT_TAGS},
+        }
+
     @staticmethod
-    def __filter_new_resources(resources: list, resource_map_function, category) -> List[Resource]:
+    def __dicom_json_value(element: dict) -> str:
+        """
+        Return first value of DICOM JSON element as string, person names in alphabetic representation
+
+        :param element: DICOM JSON element
+        :type element: dict
+        :return: element value or empty string
+        """
+        values: list = (element or {}).get('Value') or ['']
+        value = values[0]
+
+        if isinstance(value, dict):
+            value = value.get('Alphabetic', '')
+
+        return str(value).strip()
+
+    def __filter_new_resources(self, resources: list) -> list:
         """
         Filter only new Resources in list of raw data from source
 
         :param resources: fetched data from source with resources raw data
         :type resources: list
-        :param resource_map_function: mapping function for resource
-        :param category: category of resource for mapping
-        :return: list of mapped resources
+        :return: list of new resources raw data
         """
         add_resources: list = []
 
         for resource in resources:
             uid: str = resource['ID']
-            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(uid=uid).first()
+            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(source=self.source, uid=uid).first()
 
             if resource_mapping is None or resource_mapping.pid is None:
-                if resource_mapping is None:
-                    date = datetime.strptime(resource['LastUpdate'], '%Y%m%dT%H%M%S')
-
-                    ResourceMapping(uid=uid, pid=None, last_update=date, category=category).save()
-
                 add_resources.append(resource)
 
-        return [resource_map_function(resource) for resource in add_resources]
+        return add_resources
 
-    @staticmethod
-    def __filter_update_resources(resources: list, resource_map_function, force_update: bool = False) -> List[Resource]:
+    def __filter_update_resources(self, resources: list, force_update: bool = False) -> list:
         """
         Filter only Resources to update in raw data from source
 
         :param resources: fetched data from source with resources raw data
         :type resources: list
-        :param resource_map_function: mapping function for resource
-        :return: list of mapped resources
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: list of resources to update raw data
         """
         update_resources: list = []
 
         for resource in resources:
             uid: list = resource['ID']
-            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(uid=uid).first()
+            resource_mapping: ResourceMapping = ResourceMapping.objects.filter(source=self.source, uid=uid).first()
+
+            if resource_mapping is None or resource_mapping.pid is None:
+                continue
 
-            resource['pid'] = resource_mapping.pid if resource_mapping.pid else None
-            date = datetime.strptime(resource['LastUpdate'], '%Y%m%dT%H%M%S')
+            resource['pid'] = resource_mapping.pid
 
-            if resource_mapping is not None and resource_mapping.pid is not None and (
-                    resource_mapping.last_update.replace(tzinfo=None) < date or force_update):
+            if 'SourceVersion' in resource:
+                changed = resource_mapping.source_version != resource['SourceVersion']
+            else:
+                # Parsed date is kept with record for mapping, cache of parsed timestamps may have evicted it by then
+                resource['last_update'] = parse_compact(resource['LastUpdate'])
+                changed = resource_mapping.last_update.replace(tzinfo=pytz.UTC) < resource['last_update']
+
+            if changed or force_update:
                 update_resources.append(resource)
 
-        return [resource_map_function(resource, create_file=False) for resource in update_resources]
+        return update_resources
 
-    @staticmethod
-    def __filter_remove_resources(resources: list) -> list:
+    def __filter_remove_resources(self, resources_uid: set) -> list:
         """
         Filter Resources deleted in source
 
-        :param resources: fetched data from source with resources raw data
-        :type resources: list
+        :param resources_uid: UIDs of every study listed in source
+        :type resources_uid: set
         :return: list of resources to delete
         """
-        resources_uid: List[str] = [resource['ID'] for resource in resources]
         delete_resources = ResourceMapping.objects.filter(
+            source=self.source,
             category=ResourceMapping.STUDY
         ).exclude(
             uid__in=resources_uid
         )
 
-        return list(delete_resources)
+        return self.filter_shard(delete_resources, lambda resource_mapping: resource_mapping.uid)
 
     def __get_request(self, path: str, params: dict) -> list:
         """
@@ -164,10 +405,10 @@ class OrthancClient(HarvestingClient):
         :type params: dict
         :return: response json as dict
         """
-        response = requests.get(self.service_url + path, params=params, timeout=10)
+        response = self.http_get(self.service_url + path, params=params, timeout=10)
 
         if response.status_code == requests.codes.ok:
-            return json.loads(response.text)
+            return self.json_loads(response.content)
 
         msg = f'GET {self.service_url + path} with params {params} returned: {response.status_code} {response.text}'
         raise HttpException(msg)
@@ -219,94 +460,9 @@ class OrthancClient(HarvestingClient):
 
             res: Resource = Resource(os.environ.get('STUDIES_PARENT_DATAVERSE'), uid=uid, pid=pid)
 
-        mapping: dict = self.__base_mapping(study)
+        vars(res.dataset).update(self.__map_study(study))
 
-        for key, val in mapping.items():
-            setattr(res.dataset, key, val)
-
-        res.last_update = datetime.strptime(study['LastUpdate'], '%Y%m%dT%H%M%S').replace(tzinfo=pytz.UTC)
+        res.last_update = study.get('last_update') or parse_compact(study['LastUpdate'])
+        res.source_version = study.get('SourceVersion')
 
         return res
-
-    @staticmethod
-    def __date_mapping(obj: str) -> str:
-        """
-        Map argument date if exists or return default value
-
-        :param obj: string to map
-        :type obj: str
-        :return: Mapped string with mapped data to specific format or default value
-        """
-        if date_value := obj.strip():
-            try:
-                date_string = datetime.strptime(date_value, '%Y%m%d').strftime('%Y-%m-%d')
-                return date_string
-            except ValueError as err:
-                logger.debug(f'Orthanc __date_mapping method returned error: {err}')
-        return datetime.now().strftime('%Y-%m-%d')
-
-    @staticmethod
-    def __unknown_value_mapping(obj: str, return_value: any = 'Unknown') -> str:
-        """
-        Map argument if exists or return default value
-
-        :param obj: string to map
-        :type obj: str
-        :return: Mapped string with original value or default value
-        """
-        if unknown_value := obj.strip():
-            return unknown_value
-
-        return return_value
-
-    def __create_alternative_url(self, obj: str) -> str:
-        """
-        Create alternative url for Resource and return in full form
-
-        :param obj: detail url data of resource
-        :type obj: str
-        :return: alternative url of resource
-        """
-        service_url: str = self.service_url if self.service_url[-1] == '/' else self.service_url[:-1]
-        detail_url: str = f'osimis-viewer/app/index.html?study={obj}'
-
-        return service_url + detail_url
-
-    def __base_mapping(self, obj: dict) -> dict:
-        """
-        Map raw data to compatible format for dataverse Resource
-
-        :param obj: resource raw data to map
-        :type obj: dict
-        :return: mapped resource
-        """
-        return {
-            'title':
-                self.__unknown_value_mapping(obj['PatientMainDicomTags']['PatientName']
-                                             ) + ' ' + self.__unknown_value_mapping(
-                    self.__unknown_value_mapping(obj['PatientMainDicomTags']['PatientID'])),
-            'publicationDate': self.__date_mapping(obj['MainDicomTags']['StudyDate']),
-            'author': [{
-                'authorName': self.__unknown_value_mapping(obj['MainDicomTags']['ReferringPhysicianName']),
-                'authorAffiliation': obj['MainDicomTags']['InstitutionName']
-            }],
-            'alternativeURL': self.__create_alternative_url(obj['ID']),
-            'datasetContact': [{
-                'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
-                'datasetContactName': self.__unknown_value_mapping(obj['MainDicomTags']['ReferringPhysicianName'])
-            }],
-            'dataSources': ['Orthanc'],
-            'subject': ['Medicine, Health and Life Sciences'],
-            'dsDescription': [{
-                'dsDescriptionValue': obj['MainDicomTags'].get('StudyDescription', 'Unknown')
-            }],
-            'depositor': self.__unknown_value_mapping(obj['MainDicomTags']['ReferringPhysicianName']),
-            'dateOfDeposit': self.__date_mapping(obj['MainDicomTags']['StudyDate']),
-            'timePeriodCovered': [{
-                'timePeriodCoveredStart': self.__date_mapping(
-                    getattr(obj['PatientMainDicomTags'], 'PatientBirthDate', ""),
-                ),
-                'timePeriodCoveredEnd': self.__date_mapping(
-                    getattr(obj['PatientMainDicomTags'], 'PatientBirthDate', "")
-                )}],
-        }
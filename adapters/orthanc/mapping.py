@@ -0,0 +1,52 @@
+from typing import Callable
+
+from core.mapping import Concat, Date, Today, Value
+
+
+def alternative_url(service_url: str) -> Callable[[str], str]:
+    """
+    Return function creating full alternative url of study in viewer from its ID
+
+    :param service_url: Orthanc url
+    :type service_url: str
+    :return: function creating alternative url
+    """
+    service_url = (service_url if service_url[-1] == '/' else service_url[:-1]) + 'osimis-viewer/app/index.html?study='
+
+    return lambda uid: service_url + uid
+
+
+def study_spec(service_url: str) -> dict:
+    """
+    Return mapping spec of study, empty DICOM tags are mapped to 'Unknown' and missing dates to today's date
+
+    :param service_url: Orthanc url
+    :type service_url: str
+    :return: mapping spec
+    """
+    physician = Value('MainDicomTags', 'ReferringPhysicianName', blank='Unknown')
+    study_date = Date('MainDicomTags', 'StudyDate', source_format='%Y%m%d')
+
+    return {
+        'title': Concat(Value('PatientMainDicomTags', 'PatientName', blank='Unknown'), ' ',
+                        Value('PatientMainDicomTags', 'PatientID', blank='Unknown')),
+        'publicationDate': study_date,
+        'author': [{
+            'authorName': physician,
+            'authorAffiliation': Value('MainDicomTags', 'InstitutionName'),
+        }],
+        'alternativeURL': Value('ID', transform=alternative_url(service_url)),
+        'datasetContact': [{
+            'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
+            'datasetContactName': physician,
+        }],
+        'dataSources': ['Orthanc'],
+        'subject': ['Medicine, Health and Life Sciences'],
+        'dsDescription': [{
+            'dsDescriptionValue': Value('MainDicomTags', 'StudyDescription', default='Unknown'),
+        }],
+        'depositor': physician,
+        'dateOfDeposit': study_date,
+        # Birth date of patient is not harvested, period covered is date of harvest
+        'timePeriodCovered': [{'timePeriodCoveredStart': Today(), 'timePeriodCoveredEnd': Today()}],
+    }
@@ -0,0 +1,88 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class DicomWebServer:
+    """
+    Local stand-in of DICOMweb QIDO-RS studies search serving given studies in DICOM JSON format, only included
+    fields are returned like in Orthanc DICOMweb plugin. Limit greater than max_limit is lowered to it like by
+    server maximum of results
+    """
+
+    def __init__(self, studies: list, max_limit: int = None):
+        self.studies = studies
+        self.max_limit = max_limit
+        self.requests: list = []
+        self.url = None
+        self.__server = None
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                server.requests.append(params)
+
+                if url.path != '/dicom-web/studies':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                offset = int(params.get('offset', [0])[0])
+                limit = min(int(params.get('limit', [len(server.studies)])[0]), server.max_limit or len(server.studies))
+                fields = set(params.get('includefield', []))
+                page = server.studies[offset:offset + limit]
+
+                if not page:
+                    self.send_response(204)
+                    self.end_headers()
+                    return
+
+                body = json.dumps([
+                    {tag: element for tag, element in study.items() if element.get('keyword') in fields}
+                    for study in page
+                ]).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/dicom+json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.__server.server_address[1]}/dicom-web/'
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__server.shutdown()
+        self.__server.server_close()
+        return False
+
+
+def dicom_json_study(study_uid: str, patient_id: str, patient_name: str, study_date: str = '20200122',
+                     description: str = None) -> dict:
+    """
+    Build study in DICOM JSON format, keyword is kept in elements so server can filter included fields
+    """
+    study = {
+        '0020000D': {'vr': 'UI', 'keyword': 'StudyInstanceUID', 'Value': [study_uid]},
+        '00100020': {'vr': 'LO', 'keyword': 'PatientID', 'Value': [patient_id]},
+        '00100010': {'vr': 'PN', 'keyword': 'PatientName', 'Value': [{'Alphabetic': patient_name}]},
+        '00100030': {'vr': 'DA', 'keyword': 'PatientBirthDate'},
+        '00080020': {'vr': 'DA', 'keyword': 'StudyDate', 'Value': [study_date]},
+        '00080090': {'vr': 'PN', 'keyword': 'ReferringPhysicianName'},
+        '00080080': {'vr': 'LO', 'keyword': 'InstitutionName', 'Value': ['PB']},
+        '00080060': {'vr': 'CS', 'keyword': 'ModalitiesInStudy', 'Value': ['CT']},
+    }
+
+    if description is not None:
+        study['00081030'] = {'vr': 'LO', 'keyword': 'StudyDescription', 'Value': [description]}
+
+    return study
@@ -0,0 +1,14 @@
+from django.test import TestCase
+
+from adapters.orthanc import mapping
+from core.management.benchmarks import orthanc_legacy_mapping, orthanc_record
+from core.mapping import compile_mapping
+
+
+class OrthancMappingTests(TestCase):
+    def test_orthanc_mapping_equivalence(self):
+        for service_url in ('https://orthanc.test/', 'https://orthanc.test'):
+            map_study = compile_mapping(mapping.study_spec(service_url))
+
+            for record in map(orthanc_record, range(30)):
+                assert map_study(record) == orthanc_legacy_mapping(service_url, record)
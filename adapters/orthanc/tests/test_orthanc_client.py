@@ -1,3 +1,4 @@
+import hashlib
 import json
 from typing import List
 
@@ -7,6 +8,7 @@ from django.utils import timezone
 from mock import patch, Mock
 
 from adapters.orthanc.client import OrthancClient
+from adapters.orthanc.tests.dicomweb_server import DicomWebServer, dicom_json_study
 from core.exceptions import HttpException
 from core.models import ResourceMapping
 
@@ -15,6 +17,7 @@ class ResponseMock:
     def __init__(self, text=None, status_code=200):
         self.status_code = status_code
         self.text = text
+        self.content = text.encode('utf-8') if text is not None else None
 
 
 class OrthancTests(TestCase):
@@ -64,13 +67,13 @@ class OrthancTests(TestCase):
         ]
 
         cls.resource_mapping_remove_uid = '8a272bb7-7e534946-5b7f8836-906abb07-ac644bcb'
-        cls.resource_mapping_add = ResourceMapping(uid=cls.get_request_data[2],
+        cls.resource_mapping_add = ResourceMapping(source='orthanc', uid=cls.get_request_data[2],
                                                    last_update=timezone.now() - timezone.timedelta(weeks=30),
                                                    category=ResourceMapping.STUDY).save()
-        cls.resource_mapping_update = ResourceMapping(uid=cls.get_request_data[1], pid='PID_UPDATE',
+        cls.resource_mapping_update = ResourceMapping(source='orthanc', uid=cls.get_request_data[1], pid='PID_UPDATE',
                                                       last_update=timezone.now() - timezone.timedelta(weeks=30),
                                                       category=ResourceMapping.STUDY).save()
-        cls.resource_mapping_remove = ResourceMapping(uid=cls.resource_mapping_remove_uid,
+        cls.resource_mapping_remove = ResourceMapping(source='orthanc', uid=cls.resource_mapping_remove_uid,
                                                       pid='PID_DELETE', last_update=timezone.now(),
                                                       category=ResourceMapping.STUDY).save()
 
@@ -85,10 +88,7 @@ class OrthancTests(TestCase):
         assert hasattr(self.orthanc_client, "_OrthancClient__filter_remove_resources")
         assert hasattr(self.orthanc_client, "_OrthancClient__get_request")
         assert hasattr(self.orthanc_client, "_OrthancClient__map_study_to_resource")
-        assert hasattr(self.orthanc_client, "_OrthancClient__date_mapping")
-        assert hasattr(self.orthanc_client, "_OrthancClient__unknown_value_mapping")
-        assert hasattr(self.orthanc_client, "_OrthancClient__create_alternative_url")
-        assert hasattr(self.orthanc_client, "_OrthancClient__base_mapping")
+        assert hasattr(self.orthanc_client, "_OrthancClient__map_study")
 
     @patch('adapters.orthanc.client.OrthancClient._OrthancClient__get_detailed_data')
     @patch('adapters.orthanc.client.OrthancClient._OrthancClient__get_request')
@@ -108,7 +108,7 @@ class OrthancTests(TestCase):
         self.orthanc_client.get_resources('studies/', self.orthanc_client._OrthancClient__map_study_to_resource,
                                           ResourceMapping.STUDY)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_orthanc_client_get_detailed_data(self, mock_requests_get):
         resp = ResponseMock(
             json.dumps(self.get_detailed_data[0])
@@ -119,7 +119,7 @@ class OrthancTests(TestCase):
         assert self.orthanc_client._OrthancClient__get_detailed_data(
             self.get_request_data[:1]) == self.get_detailed_data[:1]
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_orthanc_client_get_request(self, mock_requests_get):
         resp = ResponseMock(
             text=json.dumps(self.get_request_data)
@@ -133,3 +133,91 @@ class OrthancTests(TestCase):
 
         with pytest.raises(HttpException):
             self.orthanc_client._OrthancClient__get_request('/studies', {})
+
+    @patch('core.clients.HarvestingClient.http_post')
+    def test_orthanc_client_get_resources_find(self, mock_http_post):
+        found = [{key: value for key, value in study.items() if key != 'PatientMainDicomTags'}
+                 for study in self.get_detailed_data]
+        for study in found:
+            study['RequestedTags'] = {'PatientName': 'Anonymous', 'PatientID': '1', 'PatientBirthDate': ''}
+        # Orthanc returns at most 2 studies of requested 3, the last page is short
+        sinces: list = []
+        mock_http_post.side_effect = lambda url, data, timeout: sinces.append(data['Since']) or ResponseMock(
+            json.dumps(found[data['Since']:data['Since'] + min(data['Limit'], 2)]))
+        client = OrthancClient('https://test.url')
+        client.transport = 'find'
+        client.page_size = 3
+
+        add_data, update_data, remove_data = client.get_resources(
+            'studies/', client._OrthancClient__map_study_to_resource, ResourceMapping.STUDY, force_update=True)
+
+        assert sinces == [0, 2, 3]
+        query = mock_http_post.call_args[1]['data']
+        assert query['Limit'] == 3
+        assert query['Expand'] is True
+        assert 'ReferringPhysicianName' in query['RequestedTags']
+        assert len(add_data) + len(update_data) == 3
+        assert all(resource.dataset.title == 'Anonymous 1' for resource in add_data + update_data)
+
+    @patch('core.clients.HarvestingClient.http_post')
+    def test_orthanc_client_find_exception(self, mock_http_post):
+        mock_http_post.return_value = ResponseMock('Error', status_code=500)
+
+        with pytest.raises(HttpException):
+            list(self.orthanc_client._OrthancClient__find_studies())
+
+    def test_orthanc_client_get_resources_dicomweb(self):
+        studies = [dicom_json_study(f'1.2.3.{index}', f'P{index}', f'Patient^{index}', description='CT')
+                   for index in range(7)]
+
+        with DicomWebServer(studies) as server:
+            client = OrthancClient('https://test.url')
+            client.transport = 'dicomweb'
+            client.dicomweb_url = server.url
+            client.page_size = 2
+            client.dicomweb_workers = 3
+            client.plan_only = True
+
+            add_data, update_data, remove_data = client.get_resources(
+                'studies/', client._OrthancClient__map_study_to_resource, ResourceMapping.STUDY)
+
+        assert sorted(int(params['offset'][0]) for params in server.requests) == [0, 2, 4, 6, 8, 10, 12]
+        assert 'ModalitiesInStudy' not in server.requests[0]['includefield']
+        assert len(add_data) == 7
+
+        study = next(study for study in add_data if study['MainDicomTags']['StudyInstanceUID'] == '1.2.3.0')
+        assert study['ID'] == '-'.join(hashlib.sha1(b'P0|1.2.3.0').hexdigest()[index:index + 8]
+                                       for index in range(0, 40, 8))
+        assert study['PatientMainDicomTags'] == {'PatientName': 'Patient^0', 'PatientID': 'P0', 'PatientBirthDate': ''}
+        assert study['MainDicomTags']['StudyDescription'] == 'CT'
+
+        resource = client._OrthancClient__map_study_to_resource({**study, 'pid': 'PID'}, create_file=False)
+        assert resource.dataset.title == 'Patient^0 P0'
+        assert resource.source_version == study['SourceVersion']
+
+    def test_orthanc_client_search_studies_server_limit(self):
+        studies = [dicom_json_study(f'1.2.3.{index}', f'P{index}', f'Patient^{index}') for index in range(7)]
+
+        # Server returns at most 3 studies of requested 5
+        with DicomWebServer(studies, max_limit=3) as server:
+            client = OrthancClient('https://test.url')
+            client.transport = 'dicomweb'
+            client.dicomweb_url = server.url
+            client.page_size = 5
+            client.dicomweb_workers = 2
+
+            pages = list(client._OrthancClient__search_studies())
+
+        assert sorted(int(params['offset'][0]) for params in server.requests) == [0, 3, 6, 9, 12]
+        assert sorted(study['MainDicomTags']['StudyInstanceUID'] for page in pages for study in page) == \
+            sorted(f'1.2.3.{index}' for index in range(7))
+
+    def test_orthanc_client_dicomweb_update(self):
+        study = OrthancClient('https://test.url')._OrthancClient__convert_dicom_json(
+            dicom_json_study('1.2.3.9', 'P9', 'Patient^9'))
+        ResourceMapping(source='orthanc', uid=study['ID'], pid='PID_QIDO', last_update=timezone.now(),
+                        source_version=study['SourceVersion'], category=ResourceMapping.STUDY).save()
+        filter_update = self.orthanc_client._OrthancClient__filter_update_resources
+
+        assert filter_update([dict(study)]) == []
+        assert len(filter_update([{**study, 'SourceVersion': study['SourceVersion'] + 1}])) == 1
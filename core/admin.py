@@ -1,12 +1,55 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
 
-from core.models import ResourceMapping
+from core.models import HarvestRun, OperationLatency, ResourceMapping
+from core.profiling import format_profile
 
 
 class ResourceMappingAdmin(admin.ModelAdmin):
-    list_display = ('uid', 'pid', 'category', 'last_update')
-    list_filter = ('category',)
-    search_fields = ('uid', 'pid', 'category', 'last_update')
+    list_display = ('uid', 'pid', 'source', 'category', 'last_update')
+    list_filter = ('source', 'category')
+    search_fields = ('uid', 'pid', 'source', 'category', 'last_update')
+    ordering = ('-last_update',)
 
 
 admin.site.register(ResourceMapping, ResourceMappingAdmin)
+
+
+class OperationLatencyAdmin(admin.ModelAdmin):
+    list_display = ('operation', 'average', 'count', 'last_update')
+
+
+admin.site.register(OperationLatency, OperationLatencyAdmin)
+
+
+class HarvestRunAdmin(admin.ModelAdmin):
+    list_display = ('source', 'shard', 'status', 'started_at', 'duration', 'added', 'updated', 'removed', 'published',
+                    'errors', 'throughput')
+    list_filter = ('source', 'status')
+    search_fields = ('source', 'task_id', 'error')
+    readonly_fields = ('duration', 'throughput', 'slowest', 'profile_report')
+    ordering = ('-started_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def throughput(self, obj):
+        return ', '.join(f'{phase}: {rate:.2f}/s' for phase, rate in obj.throughput.items())
+
+    def slowest(self, obj):
+        return format_html_join(mark_safe('<br>'), '{} {}: {:.3f}s', obj.get_slowest_operations())
+
+    def profile_report(self, obj):
+        if not obj.profile:
+            return '-'
+
+        return format_html('<a href="{}">Download</a><pre>{}</pre>', reverse('harvest-run-profile', args=[obj.pk]),
+                           format_profile(bytes(obj.profile)))
+
+
+admin.site.register(HarvestRun, HarvestRunAdmin)
@@ -0,0 +1,204 @@
+import json
+import logging
+import math
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import requests
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from pyDataverse.api import Api
+from pyDataverse.exceptions import DataverseApiError
+
+from core.exceptions import HttpException
+from core.models import ResourceMapping
+
+logger = logging.getLogger(__name__)
+
+# Environment variables with parent dataverse of every resource mapping category
+CATEGORY_DATAVERSES = {
+    ResourceMapping.DASHBOARD: 'DASHBOARDS_PARENT_DATAVERSE',
+    ResourceMapping.LAYER: 'LAYERS_PARENT_DATAVERSE',
+    ResourceMapping.MAP: 'MAPS_PARENT_DATAVERSE',
+    ResourceMapping.DOCUMENT: 'DOCUMENTS_PARENT_DATAVERSE',
+    ResourceMapping.STUDY: 'STUDIES_PARENT_DATAVERSE',
+}
+
+
+def parent_dataverses() -> Dict[str, list]:
+    """
+    Return configured parent dataverses with categories of resources harvested into them
+
+    :return: dict of categories by dataverse alias
+    """
+    dataverses: Dict[str, list] = defaultdict(list)
+
+    for category, variable in CATEGORY_DATAVERSES.items():
+        if os.environ.get(variable):
+            dataverses[os.environ[variable]].append(category)
+
+    return dict(dataverses)
+
+
+def search_page(dataverse_client: Api, alias: str, start: int, page_size: int) -> dict:
+    """
+    Return one page of datasets in dataverse and its sub-dataverses from Search API, datasets are sorted by date
+    ascending, so offsets of listed datasets do not move when new datasets are indexed during listing
+
+    :param dataverse_client: dataverse API client, its API key makes drafts visible
+    :param alias: alias of dataverse
+    :type alias: str
+    :param start: offset of first dataset
+    :type start: int
+    :param page_size: number of datasets per page, at most 1000
+    :type page_size: int
+    :return: search data with total_count and items
+    """
+    params = {'q': '*', 'type': 'dataset', 'subtree': alias, 'sort': 'date', 'order': 'asc', 'start': start,
+              'per_page': page_size}
+    resp = dataverse_client.get_request('/search', params=params, auth=True)
+
+    if resp.status_code != requests.codes.ok:
+        raise HttpException(f'GET /search with params {params} returned: {resp.status_code} {resp.text}')
+
+    return json.loads(resp.text)['data']
+
+
+def dataset_created_at(item: dict) -> Optional[datetime]:
+    """
+    Return creation time of dataset in Search API item, drafts have createdAt and published datasets published_at
+
+    :param item: Search API item of dataset
+    :type item: dict
+    :return: timezone aware creation time, None when item has none
+    """
+    value = item.get('createdAt') or item.get('published_at')
+    return parse_datetime(value) if value else None
+
+
+def search_pids(dataverse_client: Api, aliases: list, page_size: int = 1000,
+                workers: int = 4) -> Tuple[Dict[str, Dict[str, Optional[datetime]]], Dict[str, int]]:
+    """
+    Collect PIDs of every dataset in given dataverses, first pages of all dataverses and then all remaining pages
+    are fetched concurrently
+
+    :param dataverse_client: dataverse API client
+    :param aliases: aliases of dataverses
+    :type aliases: list
+    :param page_size: number of datasets per page
+    :type page_size: int
+    :param workers: number of concurrent requests
+    :type workers: int
+    :return: creation time by PID and largest total count reported by Search API, both by dataverse alias
+    """
+    pids: Dict[str, Dict[str, Optional[datetime]]] = {alias: {} for alias in aliases}
+    total_counts: Dict[str, int] = {alias: 0 for alias in aliases}
+
+    def collect(alias: str, data: dict) -> None:
+        pids[alias].update((item['global_id'], dataset_created_at(item)) for item in data['items'])
+        total_counts[alias] = max(total_counts[alias], data['total_count'])
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        first_pages = executor.map(lambda alias: search_page(dataverse_client, alias, 0, page_size), aliases)
+        pages = []
+
+        for alias, data in zip(aliases, first_pages):
+            collect(alias, data)
+            pages += [(alias, page * page_size) for page in range(1, math.ceil(data['total_count'] / page_size))]
+
+        remaining_pages = executor.map(lambda page: search_page(dataverse_client, page[0], page[1], page_size), pages)
+
+        for (alias, _), data in zip(pages, remaining_pages):
+            collect(alias, data)
+
+    return pids, total_counts
+
+
+def plan_drift(dataverse_client: Api, page_size: int = 1000, workers: int = 4, grace: int = 10) -> dict:
+    """
+    Compare datasets in parent dataverses with resource mappings and return fix-up plan. Mappings whose PID is not in
+    dataverse are 'missing' and should be added again, datasets no mapping points to are 'orphans'. Listing of
+    dataverse is 'complete' when Search API returned as many PIDs as its total count
+
+    :param dataverse_client: dataverse API client
+    :param page_size: number of datasets per Search API page
+    :type page_size: int
+    :param workers: number of concurrent Search API requests
+    :type workers: int
+    :param grace: minutes after creating mapping its dataset may not be indexed by search yet and after creating
+        dataset its mapping may not be committed by running harvest yet
+    :type grace: int
+    :return: plan with counts, missing mappings and orphan PIDs by dataverse alias
+    """
+    dataverses = parent_dataverses()
+    created_before = timezone.now() - timezone.timedelta(minutes=grace)
+    dataverse_pids, total_counts = search_pids(dataverse_client, list(dataverses), page_size, workers)
+    plan: dict = {}
+
+    for alias, categories in dataverses.items():
+        mappings = ResourceMapping.objects.filter(category__in=categories, pid__isnull=False)
+        mapped_pids: Dict[str, tuple] = {pid: (source, uid, created_at) for pid, source, uid, created_at
+                                         in mappings.values_list('pid', 'source', 'uid', 'created_at')}
+
+        missing = [{'source': mapped_pids[pid][0], 'uid': mapped_pids[pid][1], 'pid': pid}
+                   for pid in sorted(mapped_pids.keys() - dataverse_pids[alias].keys())
+                   if mapped_pids[pid][2] < created_before]
+        orphans = [pid for pid in sorted(dataverse_pids[alias].keys() - mapped_pids.keys())
+                   if dataverse_pids[alias][pid] is None or dataverse_pids[alias][pid] < created_before]
+
+        plan[alias] = {
+            'datasets': len(dataverse_pids[alias]),
+            'total_count': total_counts[alias],
+            'complete': len(dataverse_pids[alias]) >= total_counts[alias],
+            'mappings': len(mapped_pids),
+            'missing': missing,
+            'orphans': orphans,
+        }
+        logger.info(f'Dataverse {alias}: {len(dataverse_pids[alias])} of {total_counts[alias]} datasets, '
+                    f'{len(mapped_pids)} mappings, {len(missing)} missing, {len(orphans)} orphans')
+
+    return plan
+
+
+def apply_plan(dataverse_client: Api, plan: dict, delete_orphans: bool = False) -> None:
+    """
+    Clear PID of missing mappings, so next harvest adds their resources again, and optionally delete orphan datasets.
+    Plan with incomplete listing of any dataverse is refused, datasets missed by listing would look missing. Orphans
+    which can not be deleted, e.g. published datasets, are skipped and stored in plan as 'undeleted'
+
+    :param dataverse_client: dataverse API client
+    :param plan: plan returned by plan_drift
+    :type plan: dict
+    :param delete_orphans: delete datasets no mapping points to
+    :type delete_orphans: bool
+    :return: None
+    """
+    for alias, drift in plan.items():
+        if not drift['complete']:
+            raise ValueError(f'Search API listed {drift["datasets"]} of {drift["total_count"]} datasets in dataverse '
+                             f'{alias}, incomplete plan can not be applied.')
+
+    for alias, drift in plan.items():
+        missing_pids = [mapping['pid'] for mapping in drift['missing']]
+        cleared = ResourceMapping.objects.filter(pid__in=missing_pids).update(
+            pid=None, dataset_id=None, dataset_version=None)
+        logger.info(f'Cleared PID of {cleared} mappings missing in dataverse {alias}')
+
+        if delete_orphans:
+            drift['undeleted'] = []
+            for pid in drift['orphans']:
+                try:
+                    resp = dataverse_client.delete_dataset(pid)
+                    error = None if resp.status_code == requests.codes.ok else f'{resp.status_code} {resp.text}'
+                except DataverseApiError as err:
+                    error = str(err)
+
+                if error is not None:
+                    logger.warning(f'Orphan dataset {pid} in dataverse {alias} was not deleted: {error}')
+                    drift['undeleted'].append(pid)
+
+            logger.info(f'Deleted {len(drift["orphans"]) - len(drift["undeleted"])} of {len(drift["orphans"])} '
+                        f'orphan datasets in dataverse {alias}')
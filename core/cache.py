@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from urllib.parse import urlencode
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCache:
+    """
+    On-disk cache of GET responses revalidated with conditional requests (ETag / Last-Modified) and evicted in least
+    recently used order when exceeding maximum size
+    """
+
+    BODY_SUFFIX = '.body'
+    META_SUFFIX = '.json'
+
+    def __init__(self, directory: str, max_size: int, session: requests.Session = None):
+        self.directory = directory
+        self.max_size = max_size
+        self.session = session or requests.Session()
+        self.__lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = sum(os.path.getsize(path) for path in self.__entries_paths())
+
+    def get(self, url: str, params: dict = None, headers: dict = None, timeout: int = 10) -> requests.Response:
+        """
+        Send GET request with validators of cached response, on 304 Not Modified return cached response. Responses
+        are cached per url, params and request headers, so e.g. other API key or Accept header never gets them
+
+        :param url: request url
+        :type url: str
+        :param params: GET request parameters
+        :type params: dict
+        :param headers: request headers
+        :type headers: dict
+        :param timeout: request timeout in seconds
+        :type timeout: int
+        :return: response from source or from cache
+        """
+        key = self.__key(url, params, headers)
+        meta = self.__load_meta(key)
+        request_headers = dict(headers or {})
+
+        if meta is not None:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.session.get(url, params=params, headers=request_headers, timeout=timeout)
+
+        if response.status_code == requests.codes.not_modified and meta is not None:
+            cached_response = self.__load_response(key, url)
+            if cached_response is not None:
+                logger.debug(f'GET {url} with params {params} not modified, using cached response.')
+                return cached_response
+
+            # Body was evicted or removed after validators were read, only unconditional request returns it
+            logger.debug(f'GET {url} with params {params} not modified, but cached body is missing, fetching again.')
+            response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+
+        if response.status_code == requests.codes.ok:
+            self.__store(key, response)
+
+        return response
+
+    def clear(self) -> None:
+        """
+        Remove every cached response
+
+        :return: None
+        """
+        with self.__lock:
+            for path in self.__entries_paths():
+                self.__remove(path)
+            self.size = 0
+
+    @staticmethod
+    def __key(url: str, params: dict = None, headers: dict = None) -> str:
+        """
+        Create cache key from url, sorted request parameters and sorted request headers (e.g. Authorization, Accept),
+        header names are case insensitive
+
+        :param url: request url
+        :param params: GET request parameters
+        :param headers: request headers
+        :return: cache key
+        """
+        query = urlencode(sorted((params or {}).items()), doseq=True)
+        request_headers = urlencode(sorted((name.lower(), value) for name, value in (headers or {}).items()))
+        return hashlib.sha256(f'{url}?{query}\n{request_headers}'.encode('utf-8')).hexdigest()
+
+    def __path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def __entries_paths(self) -> list:
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith((self.BODY_SUFFIX, self.META_SUFFIX))]
+
+    def __load_meta(self, key: str) -> dict:
+        """
+        Load validators of cached response
+
+        :param key: cache key
+        :return: dict with etag and last_modified or None if response is not cached
+        """
+        try:
+            with open(self.__path(key, self.META_SUFFIX), 'r') as file_object:
+                return json.load(file_object)
+        except (OSError, ValueError):
+            return None
+
+    def __load_response(self, key: str, url: str) -> requests.Response:
+        """
+        Load cached response body and mark entry as recently used
+
+        :param key: cache key
+        :param url: request url
+        :return: response with cached body or None if body is missing
+        """
+        body_path = self.__path(key, self.BODY_SUFFIX)
+        try:
+            with open(body_path, 'rb') as file_object:
+                content = file_object.read()
+            os.utime(self.__path(key, self.META_SUFFIX))
+        except OSError:
+            return None
+
+        response = requests.Response()
+        response.status_code = requests.codes.ok
+        response.url = url
+        response.encoding = 'utf-8'
+        response._content = content  # pylint: disable=protected-access
+
+        return response
+
+    def __store(self, key: str, response: requests.Response) -> None:
+        """
+        Store response body with its validators, responses without validators are not cached
+
+        :param key: cache key
+        :param response: response to cache
+        :return: None
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        meta = json.dumps({'etag': etag, 'last_modified': last_modified}).encode('utf-8')
+
+        with self.__lock:
+            for suffix, data in ((self.BODY_SUFFIX, response.content), (self.META_SUFFIX, meta)):
+                path = self.__path(key, suffix)
+                self.size -= self.__remove(path)
+                self.__write(path, data)
+                self.size += len(data)
+
+            self.__evict()
+
+    def __write(self, path: str, data: bytes) -> None:
+        """
+        Atomically write data to file
+
+        :param path: path of file
+        :param data: data to write
+        :return: None
+        """
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(file_descriptor, 'wb') as file_object:
+            file_object.write(data)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def __remove(path: str) -> int:
+        """
+        Remove file if exists
+
+        :param path: path of file
+        :return: size of removed file
+        """
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except OSError:
+            return 0
+
+    def __evict(self) -> None:
+        """
+        Remove least recently used entries until cache size fits maximum size
+
+        :return: None
+        """
+        if self.size <= self.max_size:
+            return
+
+        entries = sorted(
+            (os.path.getmtime(path), path[:-len(self.META_SUFFIX)])
+            for path in self.__entries_paths() if path.endswith(self.META_SUFFIX)
+        )
+
+        for _, entry in entries:
+            if self.size <= self.max_size:
+                break
+            self.size -= self.__remove(entry + self.BODY_SUFFIX)
+            self.size -= self.__remove(entry + self.META_SUFFIX)
@@ -1,7 +1,14 @@
+import copy
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+import requests
+from django.conf import settings
+
+from . import decoders
+from .cache import HttpCache
 from .models import Resource
+from .utils import uid_shard
 
 
 class HarvestingClient(ABC):
@@ -9,11 +16,103 @@ class HarvestingClient(ABC):
     Abstract HavrestingClient inheritance class describing standard client public methods
     """
 
-    def __init__(self, service_url, api_key=None):
+    # Source identifier used when client is created without one, name of client in settings.CLIENTS_DICT
+    default_source = ''
+
+    def __init__(self, service_url, api_key=None, source: str = None):
         if service_url[-1] != '/':
             service_url += '/'
         self.service_url = service_url
         self.api_key = api_key
+        self.source = source or self.default_source
+        self.plan_only = False
+        # Harvest only resources whose UID hashes into shard (index, count), None harvests every resource
+        self.shard: Optional[Tuple[int, int]] = None
+        # Keep-alive connections to source are reused by every request of client and its cache
+        self.session = requests.Session()
+        self.http_cache = HttpCache(settings.HTTP_CACHE_DIR, settings.HTTP_CACHE_MAX_SIZE, self.session) \
+            if settings.HTTP_CACHE_DIR else None
+        # JSON decoder of source responses resolved once from JSON_DECODER setting
+        self.json_loads = decoders.get_json_backend()
+
+    def copy_for_run(self, shard: Optional[Tuple[int, int]] = None) -> 'HarvestingClient':
+        """
+        Return shallow copy of client with its own run options, copy shares session, cache and compiled mapping
+        functions with cached client, so concurrent or later runs never see options of each other
+
+        :param shard: harvest only resources whose UID hashes into shard (index, count), None harvests every resource
+        :type shard: tuple
+        :return: copy of client for one harvest run
+        """
+        client = copy.copy(self)
+        client.plan_only = False
+        client.shard = shard
+
+        return client
+
+    def http_get(self, url: str, params: dict = None, headers: dict = None, timeout: int = 10) -> requests.Response:
+        """
+        Send GET request with client session, through conditional requests cache when HTTP_CACHE_DIR is set
+
+        :param url: request url
+        :type url: str
+        :param params: GET request parameters
+        :type params: dict
+        :param headers: request headers
+        :type headers: dict
+        :param timeout: request timeout in seconds
+        :type timeout: int
+        :return: response
+        """
+        if self.http_cache is not None:
+            return self.http_cache.get(url, params=params, headers=headers, timeout=timeout)
+
+        return self.session.get(url, params=params, headers=headers, timeout=timeout)
+
+    def http_post(self, url: str, data: dict = None, headers: dict = None, timeout: int = 10) -> requests.Response:
+        """
+        Send POST request with JSON body with client session, POST responses are never cached
+
+        :param url: request url
+        :type url: str
+        :param data: JSON request body
+        :type data: dict
+        :param headers: request headers
+        :type headers: dict
+        :param timeout: request timeout in seconds
+        :type timeout: int
+        :return: response
+        """
+        return self.session.post(url, json=data, headers=headers, timeout=timeout)
+
+    def in_shard(self, uid: str) -> bool:
+        """
+        Check if resource with given UID belongs to shard harvested by client
+
+        :param uid: resource UID in source
+        :type uid: str
+        :return: True if resource belongs to shard or sharding is disabled
+        """
+        if self.shard is None:
+            return True
+
+        index, count = self.shard
+        return uid_shard(uid, count) == index
+
+    def filter_shard(self, resources: list, uid_function) -> list:
+        """
+        Keep only resources belonging to shard harvested by client, used for both source data and resource mappings so
+        removal detection is scoped the same way as adding and updating
+
+        :param resources: source raw data or resource mappings
+        :type resources: list
+        :param uid_function: function returning UID of resource
+        :return: list of resources belonging to shard
+        """
+        if self.shard is None:
+            return list(resources)
+
+        return [resource for resource in resources if self.in_shard(uid_function(resource))]
 
     @abstractmethod
     def harvest(self, force_update: bool = False) -> List[Resource]:
@@ -21,12 +120,64 @@ class HarvestingClient(ABC):
         Function loads data from designated system and uploads it to Dataverse
         """
 
+    def harvest_stages(self, force_update: bool = False) -> Iterator[tuple]:
+        """
+        Harvest data from designated system in stages yielding add/update/remove lists of every stage as soon as it is
+        ready. Default implementation yields whole harvest as one stage, clients should override it to yield every
+        fetched page, so resources are written while next pages are fetched
+
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :return: iterator of add/update/remove lists
+        """
+        yield self.harvest(force_update)
+
+    @staticmethod
+    def merge_stages(stages: Iterable[tuple]) -> (list, list, list):
+        """
+        Concatenate add/update/remove lists of harvest stages
+
+        :param stages: add/update/remove lists of every stage
+        :return: add/update/remove lists of all stages
+        """
+        add_data, update_data, remove_data = [], [], []
+
+        for stage in stages:
+            add_data += stage[0]
+            update_data += stage[1]
+            remove_data += stage[2]
+
+        return add_data, update_data, remove_data
+
+    def map_resources(self, resources: list, resource_map_function, resource_mapping_category,
+                      create_file: bool = True) -> List[Resource]:
+        """
+        Map raw data from source to Resources of given category and client source
+
+        :param resources: fetched data from source with resources raw data
+        :type resources: list
+        :param resource_map_function: function mapping data type retrieved from endpoint to Resource object
+        :param resource_mapping_category: category of mapping showed in ResourceMapping category field
+        :param create_file: define create file or not
+        :type create_file: bool
+        :return: list of mapped resources
+        """
+        mapped_resources: List[Resource] = []
+
+        for resource in resources:
+            mapped_resource: Resource = resource_map_function(resource, create_file=create_file)
+            mapped_resource.category = resource_mapping_category
+            mapped_resource.source = self.source
+            mapped_resources.append(mapped_resource)
+
+        return mapped_resources
+
     @abstractmethod
     def get_resources(self, resource_path: str, resource_map_function, resource_mapping_category,
                       force_update: bool = False) -> (List[Resource], List[Resource], list):
         """
         Fetch data from Source API endpoint and map it to Resource and return it as a list of add/update/remove
-        Resources
+        Resources. When plan_only is set, reconciliation results are returned as raw data without mapping
 
         :param resource_path: url relative path to API endpoint
         :type resource_path: str
@@ -1,26 +1,304 @@
+import base64
+import hashlib
+import heapq
 import json
 import logging
-from typing import List
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
 
 import requests
+from django.conf import settings
+from django.db import connections, transaction
 from django.utils import timezone
 from pyDataverse.api import Api
 
 from core.clients import HarvestingClient
 from core.exceptions import HttpException
-from core.models import Resource, ResourceMapping
+from core.models import HarvestRun, OperationLatency, Resource, ResourceMapping
 
 logger = logging.getLogger(__name__)
 
+# PID schemes registered with external provider, dataset import does not register PIDs
+REGISTERED_PID_SCHEMES = ('doi:', 'hdl:')
+
+
+class PublishQueue:
+    """
+    Collects persistentIDs of datasets to publish and publishes them in one batch with own concurrency and rate
+    """
+
+    def __init__(self, publish_function, concurrency: int = None, rate_limit: float = None):
+        self.publish_function = publish_function
+        self.concurrency = max(concurrency or settings.PUBLISH_CONCURRENCY, 1)
+        self.rate_limit = settings.PUBLISH_RATE_LIMIT if rate_limit is None else rate_limit
+        self.datasets: Dict[str, str] = {}
+        # Pipelined writers put datasets from several threads
+        self.__datasets_lock = threading.Lock()
+        self.__lock = threading.Lock()
+        self.__next_publish_time = 0.0
+
+    def __len__(self):
+        return len(self.datasets)
+
+    def put(self, pid: str, type_version: str = 'minor') -> None:
+        """
+        Add dataset to queue, 'major' publishing type takes precedence over 'minor' for the same dataset
+
+        :param pid: persistentID of dataset
+        :param type_version: type of publishing 'major' or 'minor'
+        :return: None
+        """
+        with self.__datasets_lock:
+            if self.datasets.get(pid) != 'major':
+                self.datasets[pid] = type_version
+
+    def items(self) -> List[list]:
+        """
+        Return queued datasets as list of [pid, type_version] pairs
+
+        :return: list of queued datasets
+        """
+        with self.__datasets_lock:
+            return [[pid, type_version] for pid, type_version in self.datasets.items()]
+
+    def flush(self) -> None:
+        """
+        Publish every queued dataset and clear the queue
+
+        :return: None
+        """
+        with self.__datasets_lock:
+            datasets = [[pid, type_version] for pid, type_version in self.datasets.items()]
+            self.datasets = {}
+
+        if not datasets:
+            return
+
+        logger.debug(f'Starting publishing {len(datasets)} queued datasets with concurrency={self.concurrency}.')
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(lambda dataset: self.__publish(*dataset), datasets))
+
+        failed = [pid for (pid, _), published in zip(datasets, results) if not published]
+        if failed:
+            raise HttpException(f'Publishing failed for datasets: {", ".join(failed)}')
+
+        logger.debug(f'Publishing {len(datasets)} queued datasets completed.')
+
+    def __publish(self, pid: str, type_version: str) -> bool:
+        """
+        Publish single dataset respecting rate limit
+
+        :param pid: persistentID of dataset
+        :param type_version: type of publishing 'major' or 'minor'
+        :return: True if dataset was published
+        """
+        self.__wait_for_rate_limit()
+
+        try:
+            self.publish_function(pid, type_version=type_version)
+        except HttpException as exception:
+            logger.exception(exception)
+            return False
+
+        return True
+
+    def __wait_for_rate_limit(self) -> None:
+        """
+        Sleep until next publishing is allowed by rate limit (publishes per second)
+
+        :return: None
+        """
+        if not self.rate_limit:
+            return
+
+        with self.__lock:
+            now = time.monotonic()
+            wait = self.__next_publish_time - now
+            self.__next_publish_time = max(now, self.__next_publish_time) + 1 / self.rate_limit
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class MappingWriter:
+    """
+    Groups resource mapping writes into transactions of chunk size instead of committing every write separately
+    """
+
+    def __init__(self, chunk_size: int = None):
+        self.chunk_size = max(chunk_size or settings.MAPPING_WRITE_CHUNK_SIZE, 1)
+        self.commits = 0
+        self.__writes: list = []
+        self.__depth = 0
+        self.__lock = threading.Lock()
+
+    @contextmanager
+    def batch(self):
+        """
+        Collect writes until the end of outermost batch, writes exceeding chunk size are saved right away
+        """
+        with self.__lock:
+            self.__depth += 1
+        try:
+            yield self
+        finally:
+            with self.__lock:
+                self.__depth -= 1
+                outermost = self.__depth == 0
+            if outermost:
+                self.flush()
+
+    def write(self, write_function) -> None:
+        """
+        Add mapping write, outside of batch it is saved immediately
+
+        :param write_function: function saving or deleting resource mapping
+        :return: None
+        """
+        with self.__lock:
+            self.__writes.append(write_function)
+            flush = self.__depth == 0 or len(self.__writes) >= self.chunk_size
+
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Save every collected write in one transaction
+
+        :return: None
+        """
+        with self.__lock:
+            writes, self.__writes = self.__writes, []
+
+        if not writes:
+            return
+
+        with transaction.atomic():
+            for write_function in writes:
+                write_function()
+
+        with self.__lock:
+            self.commits += 1
+
 
 class HarvestingController:
     """
     Class for harvesting source Resources to dataverse using specified adapters
     """
 
-    def __init__(self, harvesting_client: HarvestingClient, dataverse_client: Api):
+    # Number of slowest operations kept for run statistics
+    SLOWEST_OPERATIONS = 10
+
+    def __init__(self, harvesting_client: HarvestingClient, dataverse_client: Api, defer_publish: bool = False,
+                 backfill: bool = False, pid_prefix: str = None):
+        pid_prefix = settings.BACKFILL_PID_PREFIX if pid_prefix is None else pid_prefix
+        if backfill and not pid_prefix:
+            raise ValueError('Backfill mode requires BACKFILL_PID_PREFIX setting.')
+        if backfill and pid_prefix.lower().startswith(REGISTERED_PID_SCHEMES):
+            raise ValueError('Backfill import does not register PIDs, BACKFILL_PID_PREFIX must use locally resolved '
+                             f'scheme (e.g. perma:FK2/), not {pid_prefix}.')
+
         self.harvesting_client = harvesting_client
         self.dataverse_client = dataverse_client
+        self.defer_publish = defer_publish
+        # Add resources with dataset import API instead of create, used for initial loads of source
+        self.backfill = backfill
+        # PID prefix of imported datasets, BACKFILL_PID_PREFIX setting by default
+        self.pid_prefix = pid_prefix
+        self.publish_queue = PublishQueue(self.publish_resource)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.mapping_writer = MappingWriter()
+        # Dataverse dataset id and published version of datasets by PID, dataset id avoids :persistentId resolution
+        self.datasets: Dict[str, list] = {}
+        # Statistics of the whole run, unlike latencies they are not cleared when saved
+        self.completed: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.slowest: list = []
+        self.__statistics_lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, operation: str, subject: str = None):
+        """
+        Measure duration of operation and store it in latencies, failed operations are counted as errors
+
+        :param operation: name of measured operation
+        :type operation: str
+        :param subject: identifier of resource or dataset the operation works on
+        :type subject: str
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            duration = time.perf_counter() - start
+            with self.__statistics_lock:
+                self.latencies[operation].append(duration)
+                if failed:
+                    self.errors[operation] += 1
+                else:
+                    self.completed[operation] += 1
+
+                entry = (duration, operation, subject or '')
+                if len(self.slowest) < self.SLOWEST_OPERATIONS:
+                    heapq.heappush(self.slowest, entry)
+                elif entry > self.slowest[0]:
+                    heapq.heapreplace(self.slowest, entry)
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Measure wall clock duration of harvest run phase, repeated phases are summed up
+
+        :param name: name of phase from HarvestRun.PHASES
+        :type name: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def update_run(self, harvest_run: HarvestRun) -> None:
+        """
+        Copy statistics of run to harvest run record without saving it
+
+        :param harvest_run: record of harvest run
+        :type harvest_run: HarvestRun
+        :return: None
+        """
+        harvest_run.added = self.completed[OperationLatency.ADD]
+        harvest_run.updated = self.completed[OperationLatency.UPDATE]
+        harvest_run.removed = self.completed[OperationLatency.REMOVE]
+        harvest_run.published = self.completed[OperationLatency.PUBLISH]
+        harvest_run.errors = sum(self.errors.values())
+        for name, duration in self.phases.items():
+            setattr(harvest_run, f'{name}_duration', duration)
+        harvest_run.slowest_operations = json.dumps([
+            [operation, subject, duration] for duration, operation, subject in sorted(self.slowest, reverse=True)
+        ])
+
+    def save_latencies(self) -> None:
+        """
+        Save measured latencies of operations to OperationLatency and clear them
+
+        :return: None
+        """
+        for operation, measurements in self.latencies.items():
+            operation_latency, _ = OperationLatency.objects.get_or_create(operation=operation)
+            operation_latency.add_measurements(measurements)
+            operation_latency.save()
+
+        self.latencies = defaultdict(list)
 
     def run_harvest(self, force_update: bool = False) -> (List[Resource], List[Resource], List[Resource]):
         """
@@ -35,6 +313,125 @@ class HarvestingController:
         logger.debug(f'Harvest from {self.harvesting_client.service_url} completed.')
         return result
 
+    def plan_harvest(self, force_update: bool = False, publish_added: bool = False,
+                     update_publish_type: str = None) -> dict:
+        """
+        Run harvesting client reconciliation without writing anything and return counts of resources to add/update/remove
+        with duration estimated from measured operation latencies
+
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :param publish_added: specifies publishing dataset after adding to dataverse or not
+        :param update_publish_type: specifies publishing method (None, 'major', 'minor')
+        :return: dict with counts of operations and estimated duration in seconds
+        """
+        logger.debug(f'Starting harvest plan from {self.harvesting_client.service_url}.')
+
+        self.harvesting_client.plan_only = True
+        start = time.perf_counter()
+        try:
+            add_data, update_data, remove_data = self.harvesting_client.harvest(force_update)
+        finally:
+            self.harvesting_client.plan_only = False
+        harvest_duration = time.perf_counter() - start
+
+        counts: dict = {
+            OperationLatency.ADD: len(add_data),
+            OperationLatency.UPDATE: len(update_data),
+            OperationLatency.REMOVE: len(remove_data),
+            OperationLatency.PUBLISH: ((len(add_data) if publish_added else 0)
+                                       + (len(update_data) if update_publish_type else 0)),
+        }
+        latencies: dict = dict(OperationLatency.objects.filter(operation__in=counts).values_list('operation', 'average'))
+        estimated_duration = harvest_duration + sum(
+            count * latencies.get(operation, 0) for operation, count in counts.items())
+
+        plan: dict = {**counts, 'harvest_duration': harvest_duration, 'estimated_duration': estimated_duration}
+
+        logger.debug(f'Harvest plan from {self.harvesting_client.service_url} completed: {plan}.')
+        return plan
+
+    def run_pipelined_harvest(self, force_update: bool = False, publish_added: bool = False,
+                              update_publish_type: str = None, queue_size: int = None,
+                              writers: int = None) -> (int, int, int):
+        """
+        Run harvesting client and upload resources to dataverse concurrently. Harvesting client stages are produced
+        into bounded queue and consumed by dataverse writers, full queue blocks the producer until writers catch up
+
+        :param force_update: force updating every resource with resource mapping
+        :type force_update: bool
+        :param publish_added: specifies publishing dataset after adding to dataverse or not
+        :param update_publish_type: specifies publishing method (None, 'major', 'minor')
+        :param queue_size: maximum number of resources waiting for upload
+        :param writers: number of concurrent dataverse writers
+        :return: number of added/updated/removed resources
+        """
+        if update_publish_type not in (None, 'major', 'minor'):
+            raise ValueError(
+                f"Update_publish_type can only take values from (None, 'major', 'minor'), given {update_publish_type}")
+
+        writers = max(writers or settings.PIPELINE_WRITERS, 1)
+        resources_queue = queue.Queue(maxsize=max(queue_size or settings.PIPELINE_QUEUE_SIZE, 1))
+        operations = {
+            'add': lambda resource: self.add_resources([resource], publish_added),
+            'update': lambda resource: self.update_resources([resource], update_publish_type),
+            'remove': lambda resource: self.delete_resources([resource]),
+        }
+        counts = {operation: 0 for operation in operations}
+        errors: list = []
+        lock = threading.Lock()
+
+        def consume():
+            try:
+                while (item := resources_queue.get()) is not None:
+                    operation, resource = item
+                    if errors:
+                        continue
+                    try:
+                        operations[operation](resource)
+                    except Exception as exception:  # pylint: disable=broad-except
+                        errors.append(exception)
+                        logger.exception(exception)
+                    else:
+                        with lock:
+                            counts[operation] += 1
+            finally:
+                connections.close_all()
+
+        logger.debug(f'Starting pipelined harvest from {self.harvesting_client.service_url} '
+                     f'to {self.dataverse_client.base_url} with {writers} writers.')
+
+        consumers = [threading.Thread(target=consume, daemon=True) for _ in range(writers)]
+        for consumer in consumers:
+            consumer.start()
+
+        stages = iter(self.harvesting_client.harvest_stages(force_update))
+
+        with self.mapping_writer.batch():
+            try:
+                for stage in stages:
+                    # Failed writer stops harvesting source, remaining stages would be discarded anyway
+                    if errors:
+                        break
+                    for operation, resources in zip(operations, stage):
+                        for resource in resources:
+                            if errors:
+                                break
+                            resources_queue.put((operation, resource))
+            finally:
+                if hasattr(stages, 'close'):
+                    stages.close()
+                for _ in consumers:
+                    resources_queue.put(None)
+                for consumer in consumers:
+                    consumer.join()
+
+        if errors:
+            raise errors[0]
+
+        logger.debug(f'Pipelined harvest from {self.harvesting_client.service_url} completed.')
+        return counts['add'], counts['update'], counts['remove']
+
     def add_resources(self, resources: List[Resource], publish_added: bool = False) -> None:
         """
         Add every resource from list to dataverse and publish if specified
@@ -45,27 +442,72 @@ class HarvestingController:
         """
         logger.debug(f'Starting upload to {self.dataverse_client.base_url}.')
 
-        for resource in resources:
-            resp = self.dataverse_client.create_dataset(resource.parent_dataverse, resource.dataset.json())
-            if resp.status_code != requests.codes.created:
-                raise HttpException(resp.text)
+        with self.mapping_writer.batch():
+            for resource in resources:
+                # Imported dataset without datafile is released by import request itself
+                release = self.backfill and publish_added and not resource.datafile
+
+                with self.measure(OperationLatency.ADD, resource.uid):
+                    if self.backfill:
+                        resp = self.__import_dataset(resource, release)
+                    else:
+                        resp = self.dataverse_client.create_dataset(resource.parent_dataverse, resource.dataset.json())
+                    if resp.status_code != requests.codes.created:
+                        raise HttpException(resp.text)
+
+                resp_dict = json.loads(resp.text)
+                pid = resp_dict['data']['persistentId']
+                self.datasets[pid] = [resp_dict['data'].get('id'), '1.0' if release else None]
+
+                # Upload datafile if exists
+                if resource.datafile:
+                    self.dataverse_client.upload_file(pid, resource.datafile.filename)
+
+                if publish_added and not release:
+                    self.schedule_publish(pid, type_version='major')
+
+                # Create or update mapping with created PID identify
+                resource_mapping = ResourceMapping.objects.filter(source=resource.source, uid=resource.uid).first()
+                if resource_mapping is None:
+                    resource_mapping = ResourceMapping(source=resource.source, uid=resource.uid,
+                                                       category=resource.category,
+                                                       last_update=resource.last_update or timezone.now())
+                resource_mapping.pid = pid
+                resource_mapping.dataset_id, resource_mapping.dataset_version = self.datasets[pid]
+                resource_mapping.source_version = resource.source_version
+                self.mapping_writer.write(resource_mapping.save)
 
-            resp_dict = json.loads(resp.text)
-            pid = resp_dict['data']['persistentId']
+        logger.debug(f'Upload to {self.dataverse_client.base_url} completed.')
 
-            # Upload datafile if exists
-            if resource.datafile:
-                self.dataverse_client.upload_file(pid, resource.datafile.filename)
+    def __import_dataset(self, resource: Resource, release: bool):
+        """
+        Import dataset of resource with PID derived from resource UID, unlike create it does not register PID, so
+        prefix has to use locally resolved scheme, and publishes dataset in the same request when release is set.
+        Import of the same resource always uses the same PID
+
+        :param resource: resource to import
+        :param release: publish imported dataset
+        :type release: bool
+        :return: response of import request
+        """
+        digest = hashlib.sha1(f'{resource.source}:{resource.uid}'.encode('utf-8')).digest()
+        pid = self.pid_prefix + base64.b32encode(digest).decode('ascii')[:10]
 
-            if publish_added:
-                self.publish_resource(pid, type_version='major')
+        resp = self.dataverse_client.post_request(
+            f'/dataverses/{resource.parent_dataverse}/datasets/:import?pid={pid}&release={"yes" if release else "no"}',
+            metadata=resource.dataset.json(),
+            auth=True
+        )
 
-            # Update mapping with created PID identify
-            resource_mapping = ResourceMapping.objects.get(uid=resource.uid)
-            resource_mapping.pid = pid
-            resource_mapping.save()
+        if resp.status_code != requests.codes.created:
+            existing = self.dataverse_client.get_request('/datasets/:persistentId/', params={'persistentId': pid},
+                                                         auth=True)
+            if existing.status_code == requests.codes.ok:
+                raise HttpException(f'Import of resource {resource.source}:{resource.uid} failed, dataset with PID '
+                                    f'{pid} already exists in dataverse. Resource was imported before without '
+                                    f'its mapping or PID collides with another dataset: {resp.text}')
 
-        logger.debug(f'Upload to {self.dataverse_client.base_url} completed.')
+        return resp
 
     def delete_resources(self, resources: List[ResourceMapping]) -> None:
         """
@@ -76,13 +518,18 @@ class HarvestingController:
         """
         logger.debug(f'Starting removing datasets from {self.dataverse_client.base_url}.')
 
-        for resource in resources:
-            resp = self.dataverse_client.delete_dataset(resource.pid)
-            if resp.status_code != requests.codes.ok:
-                raise HttpException(resp.text)
+        with self.mapping_writer.batch():
+            for resource in resources:
+                with self.measure(OperationLatency.REMOVE, resource.pid):
+                    if resource.dataset_id is not None:
+                        resp = self.dataverse_client.delete_dataset(resource.dataset_id, is_pid=False)
+                    else:
+                        resp = self.dataverse_client.delete_dataset(resource.pid)
+                    if resp.status_code != requests.codes.ok:
+                        raise HttpException(resp.text)
 
-            resource_mapping = ResourceMapping.objects.get(uid=resource.uid)
-            resource_mapping.delete()
+                resource_mapping = ResourceMapping.objects.get(source=resource.source, uid=resource.uid)
+                self.mapping_writer.write(resource_mapping.delete)
 
         logger.debug(f'Removing datasets from {self.dataverse_client.base_url} completed.')
 
@@ -100,24 +547,60 @@ class HarvestingController:
             raise ValueError(
                 f"Update_publish_type can only take values from (None, 'major', 'minor'), given {update_publish_type}")
 
-        for resource in resources:
-            resp = self.dataverse_client.edit_dataset_metadata(
-                resource.pid,
-                resource.dataset.json('dv_ed'),
-                is_replace=True
-            )
+        with self.mapping_writer.batch():
+            for resource in resources:
+                resource_mapping = ResourceMapping.objects.get(source=resource.source, uid=resource.uid)
+                self.datasets[resource.pid] = [resource_mapping.dataset_id, resource_mapping.dataset_version]
+
+                with self.measure(OperationLatency.UPDATE, resource.pid):
+                    if resource_mapping.dataset_id is not None:
+                        # pyDataverse 0.2.1 builds wrong url of id-based edit, so request is sent directly
+                        resp = self.dataverse_client.put_request(
+                            f'/datasets/{resource_mapping.dataset_id}/editMetadata',
+                            resource.dataset.json('dv_ed'),
+                            auth=True,
+                            params={'replace': True}
+                        )
+                    else:
+                        resp = self.dataverse_client.edit_dataset_metadata(
+                            resource.pid,
+                            resource.dataset.json('dv_ed'),
+                            is_replace=True
+                        )
+
+                    if resp.status_code != requests.codes.ok:
+                        raise HttpException(resp.text)
+
+                if update_publish_type in ('major', 'minor'):
+                    self.schedule_publish(resource.pid, type_version=update_publish_type)
+
+                resource_mapping.dataset_version = self.datasets[resource.pid][1]
+                resource_mapping.last_update = resource.last_update or timezone.now()
+                resource_mapping.source_version = resource.source_version
+                self.mapping_writer.write(resource_mapping.save)
 
-            if resp.status_code != requests.codes.ok:
-                raise HttpException(resp.text)
+        logger.debug(f'Updating datasets from {self.dataverse_client.base_url} completed.')
+
+    def schedule_publish(self, pid: str, type_version: str = 'minor') -> None:
+        """
+        Publish dataset immediately or put it in publish queue when publishing is deferred
 
-            if update_publish_type in ('major', 'minor'):
-                self.publish_resource(resource.pid, type_version=update_publish_type)
+        :param pid: persistentID of dataset
+        :param type_version: type of publishing 'major' or 'minor'
+        :return: None
+        """
+        if self.defer_publish:
+            self.publish_queue.put(pid, type_version)
+        else:
+            self.publish_resource(pid, type_version=type_version)
 
-            resource_mapping = ResourceMapping.objects.get(uid=resource.uid)
-            resource_mapping.last_update = resource.last_update or timezone.now()
-            resource_mapping.save()
+    def publish_queued_resources(self) -> None:
+        """
+        Publish every dataset collected in publish queue
 
-        logger.debug(f'Updating datasets from {self.dataverse_client.base_url} completed.')
+        :return: None
+        """
+        self.publish_queue.flush()
 
     def publish_resource(self, pid: str, type_version: str = 'minor') -> None:
         """
@@ -128,9 +611,72 @@ class HarvestingController:
         :return: None
         """
         logger.debug(f'Starting publishing resource with persistentId {pid} with type={type_version}')
-        resp = self.dataverse_client.publish_dataset(pid, type=type_version)
+        if pid not in self.datasets:
+            self.load_datasets([pid])
+        dataset_id, dataset_version = self.datasets[pid]
 
-        if resp.status_code != requests.codes.ok:
-            raise HttpException(resp.text)
+        with self.measure(OperationLatency.PUBLISH, pid):
+            if dataset_id is not None:
+                resp = self.dataverse_client.post_request(
+                    f'/datasets/{dataset_id}/actions/:publish?type={type_version}', auth=True)
+            else:
+                resp = self.dataverse_client.publish_dataset(pid, type=type_version)
+
+            if resp.status_code != requests.codes.ok:
+                raise HttpException(resp.text)
+
+        self.__store_published_version(pid, type_version)
 
         logger.debug(f'Successfully published dataset with persistenceId {pid}.')
+
+    def load_datasets(self, pids: List[str]) -> None:
+        """
+        Load dataverse dataset ids and published versions of given PIDs from resource mappings in one query
+
+        :param pids: list of persistentIDs
+        :return: None
+        """
+        for pid in pids:
+            self.datasets.setdefault(pid, [None, None])
+
+        for pid, dataset_id, dataset_version in ResourceMapping.objects.filter(pid__in=pids).values_list(
+                'pid', 'dataset_id', 'dataset_version'):
+            self.datasets[pid] = [dataset_id, dataset_version]
+
+    def __store_published_version(self, pid: str, type_version: str) -> None:
+        """
+        Store version of published dataset computed from its stored version, publish response has no version.
+        Version of datasets added before dataset ids were stored is unknown and stays empty
+
+        :param pid: persistentID of dataset
+        :param type_version: type of publishing 'major' or 'minor'
+        :return: None
+        """
+        dataset_id, dataset_version = self.datasets[pid]
+
+        if dataset_id is None and dataset_version is None:
+            return
+
+        published_version = next_dataset_version(dataset_version, type_version)
+        self.datasets[pid][1] = published_version
+        self.mapping_writer.write(
+            lambda: ResourceMapping.objects.filter(pid=pid).update(dataset_version=published_version))
+
+
+def next_dataset_version(version: str, type_version: str) -> str:
+    """
+    Return dataverse version after publishing dataset in given version with given type
+
+    :param version: current published version 'major.minor', None if dataset was never published
+    :param type_version: type of publishing 'major' or 'minor'
+    :return: next version 'major.minor'
+    """
+    if not version:
+        return '1.0'
+
+    major, minor = (int(number) for number in version.split('.'))
+
+    if type_version == 'major':
+        return f'{major + 1}.0'
+
+    return f'{major}.{minor + 1}'
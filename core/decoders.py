@@ -0,0 +1,60 @@
+import json
+import logging
+from typing import Iterable
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def get_json_backend(name: str = None):
+    """
+    Return function decoding JSON document from bytes for given backend name ('auto', 'json', 'orjson'), 'auto' uses
+    orjson when installed and falls back to standard json module
+
+    :param name: name of JSON backend, JSON_DECODER setting by default
+    :type name: str
+    :return: function decoding JSON from bytes
+    """
+    name = name or settings.JSON_DECODER
+
+    if name not in ('auto', 'json', 'orjson'):
+        raise ValueError(f"JSON decoder can only take values from ('auto', 'json', 'orjson'), given {name}")
+
+    if name == 'orjson' and orjson is None:
+        raise ImportError('JSON decoder orjson is not installed.')
+
+    if name in ('auto', 'orjson') and orjson is not None:
+        return orjson.loads
+
+    return json.loads
+
+
+def loads(content: bytes, backend=None):
+    """
+    Decode JSON document directly from response bytes without creating decoded string copy
+
+    :param content: raw response content
+    :type content: bytes
+    :param backend: function decoding JSON from bytes, configured backend by default
+    :return: decoded JSON document
+    """
+    return (backend or get_json_backend())(content)
+
+
+def project(objects: list, fields: Iterable[str]) -> list:
+    """
+    Keep only given fields of every object, so large unused parts of listing pages can be released right after
+    decoding. It only lowers memory held by pages, whole documents are still decoded and kept fields are copied
+
+    :param objects: list of decoded objects
+    :type objects: list
+    :param fields: names of fields to keep
+    :return: list of objects with given fields only
+    """
+    return [{field: obj[field] for field in fields if field in obj} for obj in objects]
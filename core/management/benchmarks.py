@@ -0,0 +1,143 @@
+from datetime import datetime
+
+
+def geonode_legacy_mapping(service_url: str, obj: dict) -> dict:
+    """
+    Hand-written mapping replaced by mapping spec, compiled mapping has to return the same output
+    """
+    service_url = service_url if service_url[-1] == '/' else service_url[:-1]
+    detail_url = obj['detail_url'][1:] if obj['detail_url'][0] == '/' else obj['detail_url']
+
+    return {
+        'title': obj['title'],
+        'author': [{'authorName': obj['owner_name'],
+                    'authorAffiliation': ' '}],
+        'alternativeURL': service_url + detail_url,
+        'dsDescription': [{'dsDescriptionValue': obj['abstract']}],
+        'datasetContact': [{'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
+                            'datasetContactName': obj['owner_name']}],
+        'dataSources': ['Geonode'],
+        'subject': ['Earth and Environmental Sciences'],
+        'keywords': [{'keywordValue': value, 'keywordVocabulary': '', 'keywordVocabularyURI': ''}
+                     for value in obj['keywords']],
+        'timePeriodCovered': [
+            {'timePeriodCoveredStart': getattr(obj, 'temporal_extent_start', datetime.now().strftime('%Y-%m-%d')),
+             'timePeriodCoveredEnd': getattr(obj, 'temporal_extent_end', datetime.now()).strftime('%Y-%m-%d')}],
+        'kindOfData': [str(obj['spatial_representation_type'])],
+    }
+
+
+def geonode_legacy_bounding_box_mapping(obj: dict) -> dict:
+    return {
+        'geographicBoundingBox': [{'westLongitude': obj['bbox_x0'], 'eastLongitude': obj['bbox_x1'],
+                                   'northLongitude': obj['bbox_y0'], 'southLongitude': obj['bbox_y1']}]
+    }
+
+
+def geonode_record(i: int) -> dict:
+    return {
+        'uuid': f'uuid-{i}', 'title': f'Layer {i}', 'owner_name': f'owner{i % 3}', 'abstract': 'Abstract' * (i % 2),
+        'detail_url': ['/layers/geonode:layer', 'documents/10'][i % 2], 'keywords': [f'k{j}' for j in range(i % 4)],
+        'spatial_representation_type': [None, 'vector', 'grid'][i % 3], 'date': '2020-06-19T09:30:06.188641',
+        'temporal_extent_start': None, 'temporal_extent_end': None,
+        'bbox_x0': '-180.0', 'bbox_x1': '180.0', 'bbox_y0': '-90.0', 'bbox_y1': '90.0',
+    }
+
+
+def grafana_legacy_mapping(service_url: str, obj: dict) -> dict:
+    """
+    Hand-written mapping replaced by mapping spec, compiled mapping has to return the same output
+    """
+    service_url = service_url if service_url[-1] == '/' else service_url[:-1]
+    uid = obj['search']['uid'][1:] if obj['search']['uid'][0] == '/' else obj['search']['uid']
+
+    return {
+        'title': obj['search']['title'],
+        'publicationDate': obj['meta']['created'],
+        'author': [{'authorName': obj['meta']['createdBy'],
+                    'authorAffiliation': ' '}],
+        'alternativeURL': service_url + 'd/' + uid,
+        'datasetContact': [{'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
+                            'datasetContactName': obj['meta']['createdBy']}],
+        'dataSources': ['Grafana'],
+        'subject': ['Earth and Environmental Sciences'],
+        'dsDescription': [{'dsDescriptionValue': obj['search'].get('title', 'Unknown')}],
+        'depositor': obj['meta']['createdBy'],
+        'dateOfDeposit': obj['meta']['created'],
+    }
+
+
+def grafana_record(i: int) -> dict:
+    return {
+        'search': {'uid': [f'uid{i}', f'/uid{i}'][i % 2], 'title': f'Dashboard {i}'},
+        'meta': {'created': '2020-05-01T10:00:00Z', 'createdBy': f'user{i % 3}'},
+        'dashboard': {'version': i},
+    }
+
+
+def orthanc_legacy_date(obj: str) -> str:
+    if date_value := obj.strip():
+        try:
+            return datetime.strptime(date_value, '%Y%m%d').strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def orthanc_legacy_unknown_value(obj: str, return_value: any = 'Unknown') -> str:
+    if unknown_value := obj.strip():
+        return unknown_value
+
+    return return_value
+
+
+def orthanc_legacy_mapping(service_url: str, obj: dict) -> dict:
+    """
+    Hand-written mapping replaced by mapping spec, compiled mapping has to return the same output
+    """
+    service_url = service_url if service_url[-1] == '/' else service_url[:-1]
+
+    return {
+        'title':
+            orthanc_legacy_unknown_value(obj['PatientMainDicomTags']['PatientName']
+                                         ) + ' ' + orthanc_legacy_unknown_value(
+                orthanc_legacy_unknown_value(obj['PatientMainDicomTags']['PatientID'])),
+        'publicationDate': orthanc_legacy_date(obj['MainDicomTags']['StudyDate']),
+        'author': [{
+            'authorName': orthanc_legacy_unknown_value(obj['MainDicomTags']['ReferringPhysicianName']),
+            'authorAffiliation': obj['MainDicomTags']['InstitutionName']
+        }],
+        'alternativeURL': service_url + f'osimis-viewer/app/index.html?study={obj["ID"]}',
+        'datasetContact': [{
+            'datasetContactEmail': 'ofd@ibs.bialowieza.pl',
+            'datasetContactName': orthanc_legacy_unknown_value(obj['MainDicomTags']['ReferringPhysicianName'])
+        }],
+        'dataSources': ['Orthanc'],
+        'subject': ['Medicine, Health and Life Sciences'],
+        'dsDescription': [{
+            'dsDescriptionValue': obj['MainDicomTags'].get('StudyDescription', 'Unknown')
+        }],
+        'depositor': orthanc_legacy_unknown_value(obj['MainDicomTags']['ReferringPhysicianName']),
+        'dateOfDeposit': orthanc_legacy_date(obj['MainDicomTags']['StudyDate']),
+        'timePeriodCovered': [{
+            'timePeriodCoveredStart': orthanc_legacy_date(getattr(obj['PatientMainDicomTags'], 'PatientBirthDate', "")),
+            'timePeriodCoveredEnd': orthanc_legacy_date(getattr(obj['PatientMainDicomTags'], 'PatientBirthDate', ""))
+        }],
+    }
+
+
+def orthanc_record(i: int) -> dict:
+    main_dicom_tags = {
+        'StudyDate': ['20200102', '', ' 20200103 ', '2020x', '202012'][i % 5],
+        'ReferringPhysicianName': ['', 'Dr X', ' '][i % 3],
+        'InstitutionName': ['Institution', ''][i % 2],
+    }
+    if i % 2:
+        main_dicom_tags['StudyDescription'] = 'Description'
+
+    return {
+        'ID': f'id{i}',
+        'PatientMainDicomTags': {'PatientName': ['', 'John', ' Jane '][i % 3], 'PatientID': ['P1', ' '][i % 2],
+                                 'PatientBirthDate': '19800101'},
+        'MainDicomTags': main_dicom_tags,
+    }
@@ -0,0 +1,144 @@
+import itertools
+import json
+import time
+import uuid
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from pyDataverse.api import Api
+
+from core.controllers import HarvestingController
+from core.exceptions import HttpException
+from core.models import Resource, ResourceMapping
+
+
+class DataverseStandIn:
+    """
+    Dataverse API stand-in answering every request after fixed latency, publishing takes longer like in dataverse. It
+    only models number of requests of both paths, its durations follow from given latencies
+    """
+    base_url = 'http://dataverse.stand-in'
+
+    def __init__(self, latency: float, publish_latency: float):
+        self.latency = latency
+        self.publish_latency = publish_latency
+        self.ids = itertools.count(1)
+        self.requests = 0
+
+    def __response(self, latency: float, status_code: int, data: dict):
+        self.requests += 1
+        time.sleep(latency)
+        response = type('Response', (), {})()
+        response.status_code = status_code
+        response.text = json.dumps({'status': 'OK', 'data': data})
+        return response
+
+    def create_dataset(self, dataverse, metadata):
+        dataset_id = next(self.ids)
+        return self.__response(self.latency, 201, {'id': dataset_id, 'persistentId': f'perma:FK2/{dataset_id}'})
+
+    def post_request(self, query_str, metadata=None, auth=False, params=None):
+        if ':import' in query_str:
+            pid = query_str.split('pid=')[1].split('&')[0]
+            return self.__response(self.latency, 201, {'id': next(self.ids), 'persistentId': pid})
+
+        return self.__response(self.publish_latency, 200, {})
+
+    def publish_dataset(self, pid, type='minor'):
+        return self.post_request(f'/datasets/:persistentId/actions/:publish?persistentId={pid}&type={type}')
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput of adding and publishing resources with create and backfill import path against ' \
+           'test dataverse, created datasets are destroyed and generated mappings are rolled back. Without --url ' \
+           'requests are counted against dataverse stand-in with fixed latencies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=200, help='number of added resources')
+        parser.add_argument('--url', default='', help='base url of test dataverse')
+        parser.add_argument('--api-key', default='', help='API key of dataverse superuser, needed to destroy datasets')
+        parser.add_argument('--dataverse', default='root', help='alias of dataverse datasets are added to')
+        parser.add_argument('--pid-prefix', default='perma:FK2/', help='locally resolved PID prefix of imports')
+        parser.add_argument('--latency', type=float, default=20, help='latency of stand-in request in ms')
+        parser.add_argument('--publish-latency', type=float, default=100, help='latency of stand-in publish in ms')
+
+    def handle(self, *args, **options):
+        for backfill in (False, True):
+            if options['url']:
+                dataverse_client = Api(options['url'], options['api_key'])
+            else:
+                dataverse_client = DataverseStandIn(options['latency'] / 1000, options['publish_latency'] / 1000)
+
+            harvesting_controller = HarvestingController(None, dataverse_client, backfill=backfill,
+                                                         pid_prefix=options['pid_prefix'])
+            try:
+                with transaction.atomic():
+                    self.__benchmark(harvesting_controller, options['resources'], options['dataverse'])
+                    transaction.set_rollback(True)
+            finally:
+                if options['url']:
+                    self.__destroy_datasets(dataverse_client, harvesting_controller.datasets.values())
+
+    def __benchmark(self, harvesting_controller: HarvestingController, resources_count: int, dataverse: str) -> None:
+        """
+        Add and publish generated resources and print throughput, UIDs are unique per run, so imported PIDs never
+        collide with datasets of previous runs
+
+        :param harvesting_controller: controller adding resources with create or import path
+        :param resources_count: number of added resources
+        :param dataverse: alias of dataverse datasets are added to
+        :return: None
+        """
+        dataverse_client = harvesting_controller.dataverse_client
+        run = uuid.uuid4().hex[:8]
+        resources = []
+
+        for i in range(resources_count):
+            resource = Resource(dataverse, uid=f'benchmark-{run}-{i}')
+            resource.source = 'benchmark'
+            resource.category = ResourceMapping.DASHBOARD
+            resource.dataset.set({
+                'title': f'Dashboard {i}',
+                'author': [{'authorName': 'Benchmark'}],
+                'datasetContact': [{'datasetContactEmail': 'benchmark@example.com', 'datasetContactName': 'Benchmark'}],
+                'subject': ['Other'],
+                'dsDescription': [{'dsDescriptionValue': 'Benchmark dataset'}],
+            })
+            resources.append(resource)
+
+        start = time.perf_counter()
+        harvesting_controller.add_resources(resources, publish_added=True)
+        duration = time.perf_counter() - start
+
+        path = 'import' if harvesting_controller.backfill else 'create'
+        if isinstance(dataverse_client, DataverseStandIn):
+            self.stdout.write(f'{path} (stand-in model): {resources_count} resources in {dataverse_client.requests} '
+                              f'requests, {duration:.2f} s at given latencies')
+        else:
+            self.stdout.write(f'{path}: {resources_count} resources in {duration:.2f} s, '
+                              f'{resources_count / duration:.1f} resources/s against {dataverse_client.base_url}')
+
+    def __destroy_datasets(self, dataverse_client: Api, datasets) -> None:
+        """
+        Destroy datasets added by benchmark, published datasets can be destroyed only by superuser. Every dataset is
+        tried and failures are reported together, so one failure does not leave the other datasets behind
+
+        :param dataverse_client: dataverse API client
+        :param datasets: dataset ids and versions of added datasets
+        :return: None
+        """
+        failures: list = []
+
+        for dataset_id, _ in datasets:
+            try:
+                resp = dataverse_client.delete_request(f'/datasets/{dataset_id}/destroy', auth=True)
+            except OSError as exception:
+                failures.append(f'{dataset_id}: {exception}')
+                continue
+            if resp.status_code != requests.codes.ok:
+                failures.append(f'{dataset_id}: {resp.status_code} {resp.text}')
+
+        if failures:
+            raise HttpException(f'Destroying {len(failures)} benchmark datasets failed, remove them manually: '
+                                + '; '.join(failures))
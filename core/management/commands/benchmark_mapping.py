@@ -0,0 +1,68 @@
+import time
+from typing import Callable
+
+from django.core.management.base import BaseCommand
+
+from adapters.geonode import mapping as geonode_mapping
+from adapters.grafana import mapping as grafana_mapping
+from adapters.orthanc import mapping as orthanc_mapping
+from core.management import benchmarks
+from core.mapping import compile_mapping
+
+SERVICE_URL = 'https://benchmark.test/'
+
+
+class Command(BaseCommand):
+    help = 'Measure field mapping of generated catalog with hand-written reference mappings and compiled mapping specs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=40000, help='number of generated records per adapter')
+        parser.add_argument('--repeat', type=int, default=5, help='number of measured passes over catalog')
+
+    def handle(self, *args, **options):
+        base_spec = geonode_mapping.base_spec(SERVICE_URL)
+        map_layer = compile_mapping({**base_spec, **geonode_mapping.BOUNDING_BOX_SPEC}, 'map_layer')
+        adapters = (
+            ('Geonode layers', benchmarks.geonode_record,
+             lambda obj: {**benchmarks.geonode_legacy_mapping(SERVICE_URL, obj),
+                          **benchmarks.geonode_legacy_bounding_box_mapping(obj)},
+             map_layer),
+            ('Grafana dashboards', benchmarks.grafana_record,
+             lambda obj: benchmarks.grafana_legacy_mapping(SERVICE_URL, obj),
+             compile_mapping(grafana_mapping.dashboard_spec(SERVICE_URL), 'map_dashboard')),
+            ('Orthanc studies', benchmarks.orthanc_record,
+             lambda obj: benchmarks.orthanc_legacy_mapping(SERVICE_URL, obj),
+             compile_mapping(orthanc_mapping.study_spec(SERVICE_URL), 'map_study')),
+        )
+
+        for name, record, reference_mapper, compiled_mapper in adapters:
+            records = [record(i) for i in range(options['records'])]
+            reference = self.__measure(reference_mapper, records, options['repeat'])
+            compiled = self.__measure(compiled_mapper, records, options['repeat'])
+
+            self.stdout.write(f'{name}: {len(records)} records, reference {reference[0]:.0f} ms '
+                              f'(spread {reference[1]:.0f} ms), compiled {compiled[0]:.0f} ms '
+                              f'(spread {compiled[1]:.0f} ms)')
+
+    @staticmethod
+    def __measure(mapper: Callable[[dict], dict], records: list, repeat: int) -> tuple:
+        """
+        Map every record repeatedly and return best duration and spread of durations, differences within spread
+        are noise
+
+        :param mapper: function mapping record
+        :param records: generated records
+        :type records: list
+        :param repeat: number of passes over records
+        :type repeat: int
+        :return: best duration and difference of worst and best duration in ms
+        """
+        durations = []
+
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            for obj in records:
+                mapper(obj)
+            durations.append((time.perf_counter() - start) * 1000)
+
+        return min(durations), max(durations) - min(durations)
@@ -0,0 +1,57 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ResourceMapping
+
+
+class Command(BaseCommand):
+    help = 'Measure reconciliation queries on generated resource mappings, generated rows are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mappings', type=int, default=100000, help='number of generated resource mappings')
+        parser.add_argument('--lookups', type=int, default=2000, help='number of single resource mapping lookups')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.__benchmark(options['mappings'], options['lookups'])
+            transaction.set_rollback(True)
+
+    def __benchmark(self, mappings_count: int, lookups_count: int) -> None:
+        """
+        Generate resource mappings and print duration of reconciliation queries
+
+        :param mappings_count: number of generated resource mappings
+        :param lookups_count: number of single resource mapping lookups
+        :return: None
+        """
+        categories = [category for category, _ in ResourceMapping.category_choices]
+        sources = ['geonode', 'geonode-north']
+        now = timezone.now()
+
+        ResourceMapping.objects.bulk_create((
+            ResourceMapping(source=sources[i % len(sources)], uid=str(uuid.uuid4()),
+                            pid=None if i % 10 == 0 else f'doi:10.5072/FK2/{i}',
+                            last_update=now - timezone.timedelta(minutes=i), category=categories[i % len(categories)])
+            for i in range(mappings_count)
+        ), batch_size=500)
+
+        layers = ResourceMapping.objects.filter(source='geonode', category=ResourceMapping.LAYER)
+        uids = list(layers.values_list('uid', flat=True))
+        sample = random.sample(uids, min(lookups_count, len(uids)))
+
+        self.__measure(f'{len(sample)} single mapping lookups',
+                       lambda: [ResourceMapping.objects.filter(source='geonode', uid=uid).first() for uid in sample])
+        self.__measure('remove filter of one category', lambda: list(layers.exclude(uid__in=uids[:-100])))
+        self.__measure('mappings without pid of one category', lambda: list(layers.filter(pid__isnull=True)))
+        self.__measure('latest updated mappings of one category',
+                       lambda: list(layers.order_by('-last_update')[:100]))
+
+    def __measure(self, name: str, function) -> None:
+        start = time.perf_counter()
+        function()
+        self.stdout.write(f'{name}: {(time.perf_counter() - start) * 1000:.1f} ms')
@@ -0,0 +1,263 @@
+import functools
+import logging
+import time
+from datetime import datetime
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Marks value which has to exist in source record
+REQUIRED = object()
+
+# Formatted current date by format with second it was computed in
+_today_cache: dict = {}
+
+
+class Value:
+    """
+    Value of source record under given path of keys, empty path means record itself
+    """
+
+    def __init__(self, *path: str, default=REQUIRED, blank: str = None, transform: Callable = None):
+        """
+        :param path: keys leading to value in source record
+        :param default: value used when last key of path is missing, key is required by default
+        :param blank: strip value and use this one when stripped value is empty
+        :type blank: str
+        :param transform: function applied to value
+        """
+        self.path = path
+        self.default = default
+        self.blank = blank
+        self.transform = transform
+
+
+class Date(Value):
+    """
+    Date of source record reformatted from source format, today's date is used when value is empty or invalid
+    """
+
+    def __init__(self, *path: str, source_format: str, date_format: str = '%Y-%m-%d'):
+        """
+        :param path: keys leading to value in source record
+        :param source_format: strptime format of source date
+        :type source_format: str
+        :param date_format: strftime format of mapped date
+        :type date_format: str
+        """
+        super().__init__(*path)
+        self.source_format = source_format
+        self.date_format = date_format
+
+
+class Today:
+    """
+    Date of mapping, evaluated at most once per record
+    """
+
+    def __init__(self, date_format: str = '%Y-%m-%d'):
+        """
+        :param date_format: strftime format of mapped date
+        :type date_format: str
+        """
+        self.date_format = date_format
+
+
+class Each:
+    """
+    List with item mapped from every element of list in source record, Value() in item refers to element
+    """
+
+    def __init__(self, *path: str, item):
+        """
+        :param path: keys leading to list in source record
+        :param item: spec of mapped item
+        """
+        self.path = path
+        self.item = item
+
+
+class Concat:
+    """
+    Concatenation of strings and values
+    """
+
+    def __init__(self, *parts):
+        """
+        :param parts: strings or specs of string values
+        """
+        self.parts = parts
+
+
+def today(date_format: str = '%Y-%m-%d') -> str:
+    """
+    Return current date in given format, formatted date is reused within the same second
+
+    :param date_format: strftime format
+    :type date_format: str
+    :return: formatted current date
+    """
+    second = int(time.time())
+    cached = _today_cache.get(date_format)
+
+    if cached is None or cached[0] != second:
+        cached = _today_cache[date_format] = (second, datetime.now().strftime(date_format))
+
+    return cached[1]
+
+
+def date_converter(source_format: str, date_format: str) -> Callable[[str], str]:
+    """
+    Return cached function reformatting date from source format, it returns empty string for empty or invalid date
+
+    :param source_format: strptime format of source date
+    :type source_format: str
+    :param date_format: strftime format of mapped date
+    :type date_format: str
+    :return: function converting date
+    """
+    @functools.lru_cache(maxsize=4096)
+    def convert(value: str) -> str:
+        if value := value.strip():
+            try:
+                return datetime.strptime(value, source_format).strftime(date_format)
+            except ValueError as err:
+                logger.debug(f'Date {value} does not match format {source_format}: {err}')
+        return ''
+
+    return convert
+
+
+class _Compiler:
+    """
+    Translates mapping spec into source of single Python function building mapped dict
+    """
+
+    def __init__(self):
+        self.namespace: dict = {}
+        self.today_formats: dict = {}
+        self.items = 0
+
+    def bind(self, value) -> str:
+        """
+        Bind object to name in namespace of compiled function
+
+        :param value: object used by compiled function
+        :return: name of bound object
+        """
+        name = f'_v{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def expression(self, spec, variable: str) -> str:
+        """
+        Return Python expression evaluating spec for record in given variable
+
+        :param spec: mapping spec, dicts, lists and constants are mapped as they are
+        :param variable: name of variable with source record
+        :type variable: str
+        :return: Python expression
+        """
+        if isinstance(spec, dict):
+            return '{' + ', '.join(f'{key!r}: {self.expression(value, variable)}' for key, value in spec.items()) + '}'
+        if isinstance(spec, list):
+            return '[' + ', '.join(self.expression(value, variable) for value in spec) + ']'
+        if isinstance(spec, Today):
+            return self.today_formats.setdefault(spec.date_format, f'_today{len(self.today_formats)}')
+        if isinstance(spec, Concat):
+            return '(' + ' + '.join(self.expression(part, variable) for part in spec.parts) + ')'
+        if isinstance(spec, Each):
+            item_variable = f'_item{self.items}'
+            self.items += 1
+            return f'[{self.expression(spec.item, item_variable)} ' \
+                   f'for {item_variable} in {self.path(spec.path, variable)}]'
+        if isinstance(spec, Date):
+            converter = self.bind(date_converter(spec.source_format, spec.date_format))
+            today_variable = self.expression(Today(spec.date_format), variable)
+            return f'({converter}({self.path(spec.path, variable)}) or {today_variable})'
+        if isinstance(spec, Value):
+            return self.value(spec, variable)
+        if spec is None or isinstance(spec, (str, int, float, bool)):
+            return repr(spec)
+
+        raise TypeError(f'Unsupported mapping spec {spec!r}')
+
+    def path(self, path: tuple, variable: str, default=REQUIRED) -> str:
+        """
+        Return Python expression reading value under path of keys
+
+        :param path: keys leading to value
+        :type path: tuple
+        :param variable: name of variable with source record
+        :type variable: str
+        :param default: value used when last key is missing
+        :return: Python expression
+        """
+        if not path:
+            return variable
+
+        expression = variable + ''.join(f'[{key!r}]' for key in path[:-1])
+
+        if default is REQUIRED:
+            return f'{expression}[{path[-1]!r}]'
+
+        return f'{expression}.get({path[-1]!r}, {self.expression(default, variable)})'
+
+    def value(self, spec: Value, variable: str) -> str:
+        """
+        Return Python expression of Value spec
+
+        :param spec: Value spec
+        :param variable: name of variable with source record
+        :type variable: str
+        :return: Python expression
+        """
+        expression = self.path(spec.path, variable, spec.default)
+
+        if spec.blank is not None:
+            expression = f'({expression}.strip() or {spec.blank!r})'
+
+        if spec.transform is not None:
+            expression = f'{self.bind(spec.transform)}({expression})'
+
+        return expression
+
+    def compile(self, spec: dict, name: str) -> Callable[[dict], dict]:
+        """
+        Compile mapping spec into function
+
+        :param spec: mapping spec
+        :type spec: dict
+        :param name: name of compiled function
+        :type name: str
+        :return: function mapping source record to dict
+        """
+        body = self.expression(spec, 'obj')
+        lines = [f'def {name}(obj):']
+        for date_format, today_variable in self.today_formats.items():
+            lines.append(f'    {today_variable} = _today({date_format!r})')
+        lines.append(f'    return {body}')
+        source = '\n'.join(lines)
+
+        namespace = dict(self.namespace, _today=today)
+        exec(compile(source, f'<mapping {name}>', 'exec'), namespace)  # pylint: disable=exec-used
+        function = namespace[name]
+        function.source = source
+
+        return function
+
+
+def compile_mapping(spec: dict, name: str = 'map_record') -> Callable[[dict], dict]:
+    """
+    Compile declarative mapping spec once into function mapping source record to dict of dataset fields. Spec is
+    a dict of dataset fields with Value, Date, Today, Each and Concat specs, nested dicts and lists are built as they
+    are in compound dataverse fields and other values are constants. Compiled function reads every value directly
+    from record, evaluates today's date once and converts repeated dates from cache
+
+    :param spec: mapping spec
+    :type spec: dict
+    :param name: name of compiled function
+    :type name: str
+    :return: function mapping source record to dict
+    """
+    return _Compiler().compile(spec, name)
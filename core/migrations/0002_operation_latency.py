@@ -0,0 +1,23 @@
+# Generated by Django 2.2.13 on 2026-10-19 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationLatency',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(max_length=20, unique=True)),
+                ('average', models.FloatField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_update', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
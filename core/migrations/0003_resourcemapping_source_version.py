@@ -0,0 +1,18 @@
+# Generated by Django 2.2.13 on 2026-10-19 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_operation_latency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcemapping',
+            name='source_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.13 on 2026-10-19 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_resourcemapping_source_version'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='resourcemapping',
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name='resourcemapping',
+            index=models.Index(fields=['category', 'uid'], name='mapping_category_uid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcemapping',
+            index=models.Index(fields=['category', 'last_update'], name='mapping_category_update_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcemapping',
+            index=models.Index(condition=models.Q(pid__isnull=True), fields=['category'], name='mapping_pid_null_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 2.2.13 on 2026-10-19 18:54
+
+from django.db import migrations, models
+
+# Resource mappings created before sources were introduced belong to default clients
+CATEGORY_SOURCES = {
+    1: 'grafana',
+    2: 'geonode',
+    3: 'geonode',
+    4: 'geonode',
+    5: 'orthanc',
+}
+
+
+def set_default_sources(apps, schema_editor):
+    ResourceMapping = apps.get_model('core', 'ResourceMapping')
+
+    for category, source in CATEGORY_SOURCES.items():
+        ResourceMapping.objects.filter(category=category).update(source=source)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_resourcemapping_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='resourcemapping',
+            name='mapping_category_uid_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='resourcemapping',
+            name='mapping_category_update_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='resourcemapping',
+            name='mapping_pid_null_idx',
+        ),
+        migrations.AddField(
+            model_name='resourcemapping',
+            name='source',
+            field=models.CharField(default='', max_length=50),
+        ),
+        migrations.RunPython(set_default_sources, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='resourcemapping',
+            name='uid',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resourcemapping',
+            unique_together={('source', 'uid')},
+        ),
+        migrations.AddIndex(
+            model_name='resourcemapping',
+            index=models.Index(fields=['source', 'category', 'uid'], name='mapping_source_uid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcemapping',
+            index=models.Index(fields=['source', 'category', 'last_update'], name='mapping_source_update_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcemapping',
+            index=models.Index(condition=models.Q(pid__isnull=True), fields=['source', 'category'], name='mapping_source_pid_null_idx'),
+        ),
+    ]
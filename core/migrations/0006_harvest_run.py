@@ -0,0 +1,44 @@
+# Generated by Django 2.2.13 on 2026-10-19 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_resourcemapping_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HarvestRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50)),
+                ('shard', models.CharField(blank=True, default='', max_length=20)),
+                ('task_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(choices=[('running', 'running'), ('success', 'success'), ('failure', 'failure')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('added', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('removed', models.PositiveIntegerField(default=0)),
+                ('published', models.PositiveIntegerField(default=0)),
+                ('harvest_duration', models.FloatField(blank=True, null=True)),
+                ('add_duration', models.FloatField(blank=True, null=True)),
+                ('update_duration', models.FloatField(blank=True, null=True)),
+                ('remove_duration', models.FloatField(blank=True, null=True)),
+                ('publish_duration', models.FloatField(blank=True, null=True)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('slowest_operations', models.TextField(blank=True, default='[]')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='harvestrun',
+            index=models.Index(fields=['source', 'started_at'], name='harvest_run_source_idx'),
+        ),
+    ]
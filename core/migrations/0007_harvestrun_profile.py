@@ -0,0 +1,18 @@
+# Generated by Django 2.2.13 on 2026-10-19 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_harvest_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='harvestrun',
+            name='profile',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
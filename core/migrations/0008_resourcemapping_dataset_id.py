@@ -0,0 +1,23 @@
+# Generated by Django 2.2.13 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_harvestrun_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcemapping',
+            name='dataset_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='resourcemapping',
+            name='dataset_version',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
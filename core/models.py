@@ -1,3 +1,5 @@
+import json
+
 from django.db import models
 from pyDataverse.models import Dataset, Datafile
 
@@ -7,6 +9,9 @@ class Resource:
     Represents resource imported form harvested systems
     """
     last_update = None
+    category = None
+    source = ''
+    source_version = None
 
     def __init__(
             self,
@@ -64,11 +69,144 @@ class ResourceMapping(models.Model):
         (STUDY, 'study'),
     )
 
-    uid = models.fields.CharField(unique=True, max_length=50)
+    source = models.fields.CharField(max_length=50, default='')
+    uid = models.fields.CharField(max_length=50)
     pid = models.fields.CharField(max_length=24, blank=True, null=True)
     created_at = models.fields.DateTimeField(auto_now_add=True)
     last_update = models.fields.DateTimeField()
     category = models.fields.SmallIntegerField(choices=category_choices)
+    source_version = models.fields.PositiveIntegerField(blank=True, null=True)
+    # Numeric dataverse dataset id used by id-based endpoints and last published version 'major.minor'
+    dataset_id = models.fields.PositiveIntegerField(blank=True, null=True)
+    dataset_version = models.fields.CharField(max_length=20, blank=True, null=True)
+
+    class Meta:
+        # No default ordering, reconciliation queries should not pay for ORDER BY
+        unique_together = [['source', 'uid']]
+        indexes = [
+            models.Index(fields=['source', 'category', 'uid'], name='mapping_source_uid_idx'),
+            models.Index(fields=['source', 'category', 'last_update'], name='mapping_source_update_idx'),
+            models.Index(fields=['source', 'category'], name='mapping_source_pid_null_idx',
+                         condition=models.Q(pid__isnull=True)),
+        ]
+
+
+class OperationLatency(models.Model):
+    """
+    Model used for storing measured average latency of harvest operations used for estimating harvest duration
+    """
+    ADD = 'add'
+    UPDATE = 'update'
+    REMOVE = 'remove'
+    PUBLISH = 'publish'
+
+    # Number of measurements after which average starts following recent measurements
+    MAX_WEIGHT = 1000
+
+    operation = models.fields.CharField(unique=True, max_length=20)
+    average = models.fields.FloatField(default=0)
+    count = models.fields.PositiveIntegerField(default=0)
+    last_update = models.fields.DateTimeField(auto_now=True)
+
+    def add_measurements(self, measurements: list) -> None:
+        """
+        Include new measurements in average latency
+
+        :param measurements: list of operation durations in seconds
+        :type measurements: list
+        :return: None
+        """
+        if not measurements:
+            return
+
+        weight = min(self.count, self.MAX_WEIGHT)
+        self.average = (self.average * weight + sum(measurements)) / (weight + len(measurements))
+        self.count += len(measurements)
+
+
+class HarvestRun(models.Model):
+    """
+    Model used for storing history of harvest runs with number of operations and duration of every phase
+    """
+    RUNNING = 'running'
+    SUCCESS = 'success'
+    FAILURE = 'failure'
+
+    status_choices = (
+        (RUNNING, 'running'),
+        (SUCCESS, 'success'),
+        (FAILURE, 'failure'),
+    )
+
+    # Phases of harvest run, in pipelined mode writes overlap with harvesting source and are part of harvest phase
+    PHASES = ('harvest', 'add', 'update', 'remove', 'publish')
+
+    source = models.fields.CharField(max_length=50)
+    shard = models.fields.CharField(max_length=20, blank=True, default='')
+    task_id = models.fields.CharField(max_length=255, blank=True, null=True)
+    status = models.fields.CharField(max_length=10, choices=status_choices, default=RUNNING)
+    started_at = models.fields.DateTimeField(auto_now_add=True)
+    finished_at = models.fields.DateTimeField(blank=True, null=True)
+    added = models.fields.PositiveIntegerField(default=0)
+    updated = models.fields.PositiveIntegerField(default=0)
+    removed = models.fields.PositiveIntegerField(default=0)
+    published = models.fields.PositiveIntegerField(default=0)
+    harvest_duration = models.fields.FloatField(blank=True, null=True)
+    add_duration = models.fields.FloatField(blank=True, null=True)
+    update_duration = models.fields.FloatField(blank=True, null=True)
+    remove_duration = models.fields.FloatField(blank=True, null=True)
+    publish_duration = models.fields.FloatField(blank=True, null=True)
+    errors = models.fields.PositiveIntegerField(default=0)
+    error = models.fields.TextField(blank=True, default='')
+    # JSON list of slowest operations [operation, subject, duration in seconds]
+    slowest_operations = models.fields.TextField(blank=True, default='[]')
+    # cProfile stats in pstats format of profiled runs
+    profile = models.fields.BinaryField(blank=True, null=True)
 
     class Meta:
-        ordering = ["-last_update"]
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['source', 'started_at'], name='harvest_run_source_idx'),
+        ]
+
+    @property
+    def duration(self):
+        """
+        Duration of finished run in seconds, None while running
+        """
+        if self.finished_at is None:
+            return None
+
+        return (self.finished_at - self.started_at).total_seconds()
+
+    @property
+    def throughput(self) -> dict:
+        """
+        Items processed per second in every phase with measured duration
+        """
+        counts: dict = {
+            'harvest': self.added + self.updated + self.removed,
+            'add': self.added,
+            'update': self.updated,
+            'remove': self.removed,
+            'publish': self.published,
+        }
+        throughput: dict = {}
+
+        for phase in self.PHASES:
+            duration = getattr(self, f'{phase}_duration')
+            if duration:
+                throughput[phase] = counts[phase] / duration
+
+        return throughput
+
+    def get_slowest_operations(self) -> list:
+        """
+        Return decoded list of slowest operations
+
+        :return: list of [operation, subject, duration] lists
+        """
+        return json.loads(self.slowest_operations or '[]')
+
+    def __str__(self):
+        return f'{self.source} #{self.pk}'
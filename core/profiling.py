@@ -0,0 +1,60 @@
+import cProfile
+import io
+import marshal
+import pstats
+
+
+class HarvestProfiler:
+    """
+    Context manager profiling code of harvest run with cProfile, disabled profiler only checks one flag. Only calling
+    thread is profiled, so dataverse writers of pipelined harvest are not included
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.data: bytes = None
+        self.__profiler = None
+
+    def __enter__(self):
+        if self.enabled:
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.__profiler is not None:
+            self.__profiler.disable()
+            self.__profiler.create_stats()
+            # Same format as pstats dump_stats, so downloaded file can be loaded by pstats or snakeviz
+            self.data = marshal.dumps(self.__profiler.stats)
+            self.__profiler = None
+        return False
+
+
+class _LoadedStats:
+    """
+    Stats source accepted by pstats.Stats created from stored profile data
+    """
+
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+def format_profile(data: bytes, sort: str = 'cumulative', limit: int = 30) -> str:
+    """
+    Format stored profile data as pstats report of most expensive functions
+
+    :param data: profile data in pstats format
+    :type data: bytes
+    :param sort: pstats sort key
+    :type sort: str
+    :param limit: number of reported functions
+    :type limit: int
+    :return: text report
+    """
+    stream = io.StringIO()
+    pstats.Stats(_LoadedStats(data), stream=stream).sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+
+from core.models import HarvestRun
+
+
+class HarvestRunSerializer(serializers.ModelSerializer):
+    duration = serializers.FloatField(read_only=True)
+    throughput = serializers.DictField(child=serializers.FloatField(), read_only=True)
+    slowest_operations = serializers.ListField(source='get_slowest_operations', read_only=True)
+
+    class Meta:
+        model = HarvestRun
+        fields = ('id', 'source', 'shard', 'task_id', 'status', 'started_at', 'finished_at', 'duration', 'added',
+                  'updated', 'removed', 'published', 'harvest_duration', 'add_duration', 'update_duration',
+                  'remove_duration', 'publish_duration', 'throughput', 'errors', 'error', 'slowest_operations')
+        read_only_fields = fields
@@ -1,10 +1,15 @@
 import logging
+from typing import Optional
 
-from celery import shared_task
+from celery import group, shared_task
+from django.utils import timezone
 from pyDataverse.api import Api
 
-from core.controllers import HarvestingController
-from core.utils import get_client
+from core.audit import apply_plan, plan_drift
+from core.controllers import HarvestingController, PublishQueue
+from core.models import HarvestRun
+from core.profiling import HarvestProfiler
+from core.utils import get_client, parse_shard
 from harvester import settings
 
 logger = logging.getLogger(__name__)
@@ -12,7 +17,9 @@ logger = logging.getLogger(__name__)
 
 @shared_task()
 def run_harvester(name: str, publish_added: bool = False, update_publish_type: str = None,
-                  force_update: bool = False) -> None:
+                  force_update: bool = False, defer_publish: str = None, pipelined: bool = False,
+                  plan_only: bool = False, shard: str = None, profile: bool = None,
+                  backfill: bool = False) -> Optional[dict]:
     """
     Using designated client harvests data form specified system
 
@@ -21,23 +28,183 @@ def run_harvester(name: str, publish_added: bool = False, update_publish_type: s
     :param update_publish_type: (None, 'minor', 'major') Type of publishing data after updating dataset
     :param force_update: force updating every resource with resource mapping
     :type force_update: bool
-    :return: None
+    :param defer_publish: (None, 'end', 'task') Publish datasets right after adding/updating (None), in one batch
+        at the end of harvest ('end') or in separate publish_datasets task ('task')
+    :param pipelined: upload resources to dataverse concurrently with harvesting source
+    :type pipelined: bool
+    :param plan_only: only count resources to add/update/remove and estimate harvest duration without writing anything
+    :type plan_only: bool
+    :param shard: harvest only resources whose UID hashes into shard 'k/N' (shard k of N), including removal detection
+    :type shard: str
+    :param profile: profile run with cProfile and store stats with harvest run, HARVEST_PROFILE setting by default
+    :type profile: bool
+    :param backfill: add resources with dataset import API, intended for initial load of source
+    :type backfill: bool
+    :return: harvest plan if plan_only is set, None otherwise
     """
-    logger.debug(f"Starting run harvest function for {name}")
+    if defer_publish not in (None, 'end', 'task'):
+        raise ValueError(f"Defer_publish can only take values from (None, 'end', 'task'), given {defer_publish}")
+
+    logger.debug(f"Starting run harvest function for {name}" + (f" shard {shard}" if shard is not None else ''))
     dataverse_client = Api(settings.DATAVERSE_URL, settings.DATAVERSE_API_KEY)
-    app_client = get_client(name)
+    # Client instance is cached per process, run options are set only on its copy
+    app_client = get_client(name).copy_for_run(parse_shard(shard))
+
+    harvester = HarvestingController(app_client, dataverse_client, defer_publish=defer_publish is not None,
+                                     backfill=backfill)
+
+    if plan_only:
+        plan = harvester.plan_harvest(force_update, publish_added, update_publish_type)
+        logger.info(f"Harvest plan for {name}: {plan}")
+        return plan
+
+    harvest_run = HarvestRun.objects.create(source=name, shard=shard or '', task_id=run_harvester.request.id)
+    profiler = HarvestProfiler(settings.HARVEST_PROFILE if profile is None else profile)
+    try:
+        with profiler:
+            _harvest(harvester, name, publish_added, update_publish_type, force_update, defer_publish, pipelined)
+    except Exception as exception:
+        harvest_run.status = HarvestRun.FAILURE
+        harvest_run.error = f'{type(exception).__name__}: {exception}'
+        raise
+    else:
+        harvest_run.status = HarvestRun.SUCCESS
+    finally:
+        harvester.update_run(harvest_run)
+        harvest_run.profile = profiler.data
+        harvest_run.finished_at = timezone.now()
+        harvest_run.save()
+        harvester.save_latencies()
+
+    logger.info(f"Saved resource mappings of {name} in {harvester.mapping_writer.commits} commits")
+    return None
+
+
+def _harvest(harvester: HarvestingController, name: str, publish_added: bool, update_publish_type: str,
+             force_update: bool, defer_publish: str, pipelined: bool) -> None:
+    """
+    Run phases of harvest with given controller, see run_harvester for description of arguments
+
+    :param harvester: controller of harvest run
+    :type harvester: HarvestingController
+    :return: None
+    """
+    try:
+        _harvest_phases(harvester, name, publish_added, update_publish_type, force_update, pipelined)
+    except Exception:
+        # Datasets added or updated before failure are still published, in separate task so the run fails promptly
+        if defer_publish is not None and len(harvester.publish_queue):
+            logger.warning(f"Harvest of {name} failed, dispatching publishing of {len(harvester.publish_queue)} "
+                           f"datasets queued before failure")
+            publish_datasets.apply_async(args=(harvester.publish_queue.items(),), queue=settings.PUBLISH_TASK_QUEUE)
+        raise
 
-    harvester = HarvestingController(app_client, dataverse_client)
+    if defer_publish == 'end':
+        logger.debug(f"Starting publishing queued resources from {name}")
+        with harvester.phase('publish'):
+            harvester.publish_queued_resources()
+    elif defer_publish == 'task' and len(harvester.publish_queue):
+        logger.debug(f"Dispatching publishing of queued resources from {name}")
+        publish_datasets.apply_async(args=(harvester.publish_queue.items(),), queue=settings.PUBLISH_TASK_QUEUE)
 
-    add_data, modify_data, remove_data = harvester.run_harvest(force_update)
+
+def _harvest_phases(harvester: HarvestingController, name: str, publish_added: bool, update_publish_type: str,
+                    force_update: bool, pipelined: bool) -> None:
+    """
+    Harvest source and add/update/remove its resources, see run_harvester for description of arguments
+
+    :param harvester: controller of harvest run
+    :type harvester: HarvestingController
+    :return: None
+    """
+    if pipelined:
+        # Writes overlap with harvesting source, so they are measured as part of harvest phase
+        with harvester.phase('harvest'):
+            added, updated, removed = harvester.run_pipelined_harvest(force_update, publish_added, update_publish_type)
+        logger.debug(f"Harvested data from source of {name}: added {added}, updated {updated}, removed {removed}")
+        return
+
+    with harvester.phase('harvest'):
+        add_data, modify_data, remove_data = harvester.run_harvest(force_update)
     logger.debug(f"Harvested data from source of {name}")
 
     if add_data:
         logger.debug(f"Starting adding new resources from {name}")
-        harvester.add_resources(add_data, publish_added)
+        with harvester.phase('add'):
+            harvester.add_resources(add_data, publish_added)
     if modify_data:
         logger.debug(f"Starting updating resources from {name}")
-        harvester.update_resources(modify_data, update_publish_type)
+        with harvester.phase('update'):
+            harvester.update_resources(modify_data, update_publish_type)
     if remove_data:
         logger.debug(f"Starting removing resources from {name}")
-        harvester.delete_resources(remove_data)
+        with harvester.phase('remove'):
+            harvester.delete_resources(remove_data)
+
+
+@shared_task()
+def run_sharded_harvester(name: str, shards: int, **kwargs) -> list:
+    """
+    Dispatch harvest of one source as parallel run_harvester tasks, each harvesting one of shards by resource UID hash
+
+    :param name: client name
+    :param shards: number of shards
+    :type shards: int
+    :param kwargs: keyword arguments of run_harvester
+    :return: list of ids of dispatched tasks
+    """
+    if shards < 1:
+        raise ValueError(f'Number of shards must be positive, given {shards}')
+
+    result = group(run_harvester.s(name, shard=f'{index}/{shards}', **kwargs) for index in range(shards)).apply_async()
+    logger.info(f"Dispatched harvest of {name} in {shards} shards")
+
+    return [child.id for child in result.children]
+
+
+@shared_task()
+def publish_datasets(datasets: list) -> None:
+    """
+    Publish given datasets using publish queue concurrency and rate settings
+
+    :param datasets: list of [pid, type_version] pairs
+    :type datasets: list
+    :return: None
+    """
+    logger.debug(f"Starting publishing {len(datasets)} datasets")
+    dataverse_client = Api(settings.DATAVERSE_URL, settings.DATAVERSE_API_KEY)
+    harvester = HarvestingController(None, dataverse_client)
+
+    harvester.load_datasets([pid for pid, _ in datasets])
+
+    publish_queue = PublishQueue(harvester.publish_resource)
+    for pid, type_version in datasets:
+        publish_queue.put(pid, type_version)
+
+    try:
+        publish_queue.flush()
+    finally:
+        harvester.save_latencies()
+
+
+@shared_task()
+def audit_dataverse(apply: bool = False, delete_orphans: bool = False, grace: int = 10) -> dict:
+    """
+    Find resource mappings whose dataset no longer exists in dataverse and datasets in parent dataverses no mapping
+    points to, using paged Search API instead of request per PID
+
+    :param apply: clear PID of missing mappings, so next harvest adds them again
+    :type apply: bool
+    :param delete_orphans: delete orphan datasets when applying plan
+    :type delete_orphans: bool
+    :param grace: minutes after creating mapping its dataset may not be indexed by search yet
+    :type grace: int
+    :return: fix-up plan by dataverse alias
+    """
+    dataverse_client = Api(settings.DATAVERSE_URL, settings.DATAVERSE_API_KEY)
+    plan = plan_drift(dataverse_client, settings.AUDIT_SEARCH_PAGE_SIZE, settings.AUDIT_WORKERS, grace)
+
+    if apply:
+        apply_plan(dataverse_client, plan, delete_orphans)
+
+    return plan
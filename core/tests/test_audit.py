@@ -0,0 +1,136 @@
+import json
+import os
+
+import pytest
+from django.test import TestCase
+from django.utils import timezone
+from mock import Mock, patch
+from pyDataverse.exceptions import OperationFailedError
+
+from core.audit import apply_plan, plan_drift, search_pids
+from core.exceptions import HttpException
+from core.models import ResourceMapping
+
+
+class ResponseMock:
+    def __init__(self, text=None, status_code=200):
+        self.status_code = status_code
+        self.text = text
+
+
+def search_api(datasets: dict, created_at: dict = None, lost: int = 0):
+    """
+    Return Search API stand-in serving given PIDs by dataverse alias, lost datasets are counted but never listed
+    """
+    def get_request(query_str, params=None, auth=False):
+        assert (params['sort'], params['order']) == ('date', 'asc')
+        pids = datasets[params['subtree']]
+        items = [{'global_id': pid, 'createdAt': (created_at or {}).get(pid, '2020-06-19T09:30:06Z')}
+                 for pid in pids[params['start']:params['start'] + params['per_page']]]
+        return ResponseMock(json.dumps({'data': {'total_count': len(pids) + lost, 'items': items}}))
+
+    return Mock(side_effect=get_request)
+
+
+@patch.dict(os.environ, {'DASHBOARDS_PARENT_DATAVERSE': 'dashboards', 'LAYERS_PARENT_DATAVERSE': 'geo',
+                         'MAPS_PARENT_DATAVERSE': 'geo', 'DOCUMENTS_PARENT_DATAVERSE': '',
+                         'STUDIES_PARENT_DATAVERSE': ''})
+class DriftAuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(DriftAuditTests, cls).setUpTestData()
+
+        created_at = timezone.now() - timezone.timedelta(hours=1)
+        for uid, pid, category in (('dashboard1', 'PID1', ResourceMapping.DASHBOARD),
+                                   ('dashboard2', 'PID2', ResourceMapping.DASHBOARD),
+                                   ('dashboard3', None, ResourceMapping.DASHBOARD),
+                                   ('layer1', 'PID3', ResourceMapping.LAYER),
+                                   ('map1', 'PID4', ResourceMapping.MAP)):
+            ResourceMapping(source='test', uid=uid, pid=pid, dataset_id=1, last_update=created_at,
+                            category=category).save()
+        ResourceMapping.objects.update(created_at=created_at)
+
+        cls.datasets = {
+            'dashboards': ['PID1'] + [f'ORPHAN{i}' for i in range(4)],
+            'geo': ['PID3', 'PID4'],
+        }
+
+    def test_search_pids(self):
+        dataverse_client = Mock()
+        dataverse_client.get_request = search_api(self.datasets)
+
+        pids, total_counts = search_pids(dataverse_client, ['dashboards', 'geo'], page_size=2)
+
+        assert {alias: set(created) for alias, created in pids.items()} == \
+            {alias: set(datasets) for alias, datasets in self.datasets.items()}
+        assert pids['geo']['PID3'] == timezone.datetime(2020, 6, 19, 9, 30, 6, tzinfo=timezone.utc)
+        assert total_counts == {'dashboards': 5, 'geo': 2}
+        assert dataverse_client.get_request.call_count == 4
+
+    def test_search_pids_error(self):
+        dataverse_client = Mock()
+        dataverse_client.get_request = Mock(return_value=ResponseMock('Error', status_code=500))
+
+        with pytest.raises(HttpException):
+            search_pids(dataverse_client, ['dashboards'])
+
+    def test_plan_drift(self):
+        dataverse_client = Mock()
+        # Dataset of running harvest whose mapping is not committed yet
+        datasets = dict(self.datasets, dashboards=self.datasets['dashboards'] + ['IN_FLIGHT'])
+        dataverse_client.get_request = search_api(datasets, {'IN_FLIGHT': timezone.now().isoformat()})
+        ResourceMapping(source='test', uid='dashboard_new', pid='PID_NEW', last_update=timezone.now(),
+                        category=ResourceMapping.DASHBOARD).save()
+
+        plan = plan_drift(dataverse_client, page_size=2)
+
+        assert plan['dashboards']['missing'] == [{'source': 'test', 'uid': 'dashboard2', 'pid': 'PID2'}]
+        assert plan['dashboards']['orphans'] == [f'ORPHAN{i}' for i in range(4)]
+        assert plan['dashboards']['mappings'] == 3
+        assert plan['geo'] == {'datasets': 2, 'total_count': 2, 'complete': True, 'mappings': 2, 'missing': [],
+                               'orphans': []}
+
+    def test_apply_plan(self):
+        dataverse_client = Mock()
+        dataverse_client.get_request = search_api(self.datasets)
+        dataverse_client.delete_dataset = Mock(return_value=ResponseMock('Text'))
+        plan = plan_drift(dataverse_client)
+
+        apply_plan(dataverse_client, plan)
+
+        resource_mapping = ResourceMapping.objects.get(uid='dashboard2')
+        assert (resource_mapping.pid, resource_mapping.dataset_id) == (None, None)
+        dataverse_client.delete_dataset.assert_not_called()
+
+        apply_plan(dataverse_client, plan, delete_orphans=True)
+
+        assert dataverse_client.delete_dataset.call_count == 4
+        assert plan['dashboards']['undeleted'] == []
+
+    def test_apply_plan_undeleted_orphans(self):
+        dataverse_client = Mock()
+        dataverse_client.get_request = search_api(self.datasets)
+        # Published dataset can not be deleted, pyDataverse raises on its 405 response
+        dataverse_client.delete_dataset = Mock(side_effect=[OperationFailedError('ERROR: HTTP 405'),
+                                                            ResponseMock('Error', status_code=500),
+                                                            ResponseMock('Text'), ResponseMock('Text')])
+        plan = plan_drift(dataverse_client)
+
+        apply_plan(dataverse_client, plan, delete_orphans=True)
+
+        assert dataverse_client.delete_dataset.call_count == 4
+        assert plan['dashboards']['undeleted'] == ['ORPHAN0', 'ORPHAN1']
+
+    def test_apply_plan_incomplete(self):
+        dataverse_client = Mock()
+        dataverse_client.get_request = search_api(self.datasets, lost=1)
+        dataverse_client.delete_dataset = Mock(return_value=ResponseMock('Text'))
+        plan = plan_drift(dataverse_client)
+
+        assert plan['geo']['complete'] is False
+
+        with pytest.raises(ValueError):
+            apply_plan(dataverse_client, plan, delete_orphans=True)
+
+        dataverse_client.delete_dataset.assert_not_called()
+        assert ResourceMapping.objects.get(uid='dashboard2').pid == 'PID2'
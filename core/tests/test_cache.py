@@ -0,0 +1,110 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from mock import patch
+
+from adapters.geonode.client import GeonodeClient
+from core.cache import HttpCache
+
+
+class ResponseMock:
+    def __init__(self, content=b'', status_code=200, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class HttpCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.http_cache = HttpCache(self.directory.name, 1024)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @patch('requests.Session.get')
+    def test_http_cache_not_modified(self, mock_requests_get):
+        mock_requests_get.return_value = ResponseMock(b'{"a": 1}', headers={'ETag': '"v1"'})
+        assert self.http_cache.get('https://test.url/api', {'page': 1}).content == b'{"a": 1}'
+
+        mock_requests_get.return_value = ResponseMock(status_code=304)
+        response = self.http_cache.get('https://test.url/api', {'page': 1})
+
+        assert response.status_code == 200
+        assert response.content == b'{"a": 1}'
+        assert response.text == '{"a": 1}'
+        assert mock_requests_get.call_args[1]['headers'] == {'If-None-Match': '"v1"'}
+
+        self.http_cache.get('https://test.url/api', {'page': 2})
+        assert mock_requests_get.call_args[1]['headers'] == {}
+
+    @patch('requests.Session.get')
+    def test_http_cache_headers(self, mock_requests_get):
+        mock_requests_get.return_value = ResponseMock(b'{"a": 1}', headers={'ETag': '"v1"'})
+        self.http_cache.get('https://test.url/api', headers={'Authorization': 'Bearer key1'})
+
+        self.http_cache.get('https://test.url/api', headers={'Authorization': 'Bearer key2'})
+        assert mock_requests_get.call_args[1]['headers'] == {'Authorization': 'Bearer key2'}
+
+        self.http_cache.get('https://test.url/api', headers={'authorization': 'Bearer key1'})
+        assert mock_requests_get.call_args[1]['headers'] == {'authorization': 'Bearer key1', 'If-None-Match': '"v1"'}
+
+        self.http_cache.get('https://test.url/api', headers={'Authorization': 'Bearer key1', 'Accept': 'text/xml'})
+        assert 'If-None-Match' not in mock_requests_get.call_args[1]['headers']
+
+    @patch('requests.Session.get')
+    def test_http_cache_not_modified_missing_body(self, mock_requests_get):
+        mock_requests_get.return_value = ResponseMock(b'{"a": 1}', headers={'ETag': '"v1"'})
+        self.http_cache.get('https://test.url/api')
+        for name in os.listdir(self.directory.name):
+            if name.endswith(HttpCache.BODY_SUFFIX):
+                os.remove(os.path.join(self.directory.name, name))
+
+        mock_requests_get.side_effect = [ResponseMock(status_code=304),
+                                         ResponseMock(b'{"a": 2}', headers={'ETag': '"v2"'})]
+        response = self.http_cache.get('https://test.url/api')
+
+        assert response.content == b'{"a": 2}'
+        assert mock_requests_get.call_args_list[-2][1]['headers'] == {'If-None-Match': '"v1"'}
+        assert mock_requests_get.call_args_list[-1][1]['headers'] is None
+
+    @patch('requests.Session.post')
+    @patch('requests.Session.get')
+    def test_http_cache_client_session(self, mock_session_get, mock_session_post):
+        mock_session_get.return_value = ResponseMock(b'{"a": 1}', headers={'ETag': '"v1"'})
+
+        with override_settings(HTTP_CACHE_DIR=self.directory.name):
+            client = GeonodeClient('https://test.url')
+
+        assert client.http_cache.session is client.session
+
+        client.http_get('https://test.url/api')
+        client.http_post('https://test.url/api', {'a': 1})
+        client.http_cache = None
+        client.http_get('https://test.url/api')
+
+        assert mock_session_get.call_count == 2
+        mock_session_post.assert_called_once_with('https://test.url/api', json={'a': 1}, headers=None, timeout=10)
+
+    @patch('requests.Session.get')
+    def test_http_cache_without_validators(self, mock_requests_get):
+        mock_requests_get.return_value = ResponseMock(b'[]')
+        self.http_cache.get('https://test.url/api')
+
+        assert self.http_cache.size == 0
+        assert os.listdir(self.directory.name) == []
+
+    @patch('requests.Session.get')
+    def test_http_cache_eviction(self, mock_requests_get):
+        mock_requests_get.return_value = ResponseMock(b'x' * 400, headers={'Last-Modified': 'Mon, 19 Oct 2020'})
+
+        for page in range(3):
+            self.http_cache.get('https://test.url/api', {'page': page})
+
+        assert self.http_cache.size <= self.http_cache.max_size
+        assert len(os.listdir(self.directory.name)) == 4
+
+        self.http_cache.clear()
+        assert self.http_cache.size == 0
+        assert os.listdir(self.directory.name) == []
@@ -0,0 +1,49 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import TestCase
+from mock import Mock, patch
+
+from core.exceptions import HttpException
+from core.management.commands.benchmark_backfill import DataverseStandIn
+from core.models import ResourceMapping
+
+
+class CommandsTests(TestCase):
+    def test_benchmark_reconciliation(self):
+        out = StringIO()
+        call_command('benchmark_reconciliation', mappings=50, lookups=5, stdout=out)
+
+        assert '5 single mapping lookups' in out.getvalue()
+        assert ResourceMapping.objects.count() == 0
+
+    def test_benchmark_backfill(self):
+        out = StringIO()
+        call_command('benchmark_backfill', resources=3, latency=0, publish_latency=0, stdout=out)
+
+        assert 'create (stand-in model): 3 resources in 6 requests' in out.getvalue()
+        assert 'import (stand-in model): 3 resources in 3 requests' in out.getvalue()
+        assert ResourceMapping.objects.count() == 0
+
+    @patch('core.management.commands.benchmark_backfill.Api')
+    def test_benchmark_backfill_destroy_failure(self, mock_api):
+        dataverse_client = DataverseStandIn(0, 0)
+        dataverse_client.delete_request = Mock(side_effect=[OSError('Connection refused'),
+                                                            Mock(status_code=200), Mock(status_code=200)])
+        mock_api.return_value = dataverse_client
+
+        with pytest.raises(HttpException, match='Destroying 1 benchmark datasets failed'):
+            call_command('benchmark_backfill', resources=3, url='https://dataverse.test', api_key='KEY',
+                         stdout=StringIO())
+
+        # Failure of first dataset does not stop destroying the others
+        assert [call[0][0] for call in dataverse_client.delete_request.call_args_list] == \
+            [f'/datasets/{dataset_id}/destroy' for dataset_id in (1, 2, 3)]
+
+    def test_benchmark_mapping(self):
+        out = StringIO()
+        call_command('benchmark_mapping', records=20, repeat=1, stdout=out)
+
+        for name in ('Geonode layers', 'Grafana dashboards', 'Orthanc studies'):
+            assert f'{name}: 20 records, reference' in out.getvalue()
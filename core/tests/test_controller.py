@@ -1,14 +1,18 @@
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from mock import Mock, patch
+from pyDataverse.api import Api
 from pyDataverse.models import Datafile
 
-from core.controllers import HarvestingController
+from core.controllers import HarvestingController, MappingWriter, PublishQueue, next_dataset_version
 from core.exceptions import HttpException
-from core.models import Resource, ResourceMapping
+from core.models import HarvestRun, OperationLatency, Resource, ResourceMapping
 
 
 class ResponseMock:
@@ -16,6 +20,9 @@ class ResponseMock:
         self.status_code = status_code
         self.text = text
 
+    def json(self):
+        return json.loads(self.text)
+
 
 class HarvestingControllerTests(TestCase):
     @classmethod
@@ -148,3 +155,305 @@ class HarvestingControllerTests(TestCase):
 
         with pytest.raises(HttpException):
             self.harvesting_controller.publish_resource(resource_mapping_uid)
+
+    @patch('core.controllers.HarvestingController.publish_resource')
+    def test_harvesting_controller_defer_publish(self, mock_publish_resource):
+        harvesting_controller = HarvestingController(self.harvesting_client, self.dataverse_client, defer_publish=True)
+        harvesting_controller.schedule_publish('PID', 'minor')
+        harvesting_controller.schedule_publish('PID', 'major')
+        harvesting_controller.schedule_publish('PID', 'minor')
+        harvesting_controller.schedule_publish('PID2', 'minor')
+
+        mock_publish_resource.assert_not_called()
+        assert harvesting_controller.publish_queue.items() == [['PID', 'major'], ['PID2', 'minor']]
+
+        harvesting_controller.publish_queued_resources()
+
+        assert mock_publish_resource.call_count == 2
+        assert len(harvesting_controller.publish_queue) == 0
+
+    def test_publish_queue_flush(self):
+        publish_function = Mock(side_effect=[None, HttpException()])
+        publish_queue = PublishQueue(publish_function, concurrency=1, rate_limit=1000)
+        publish_queue.put('PID', 'major')
+        publish_queue.put('PID2', 'minor')
+
+        with pytest.raises(HttpException, match='PID2'):
+            publish_queue.flush()
+
+        assert publish_function.call_count == 2
+        assert len(publish_queue) == 0
+
+    @patch('core.controllers.HarvestingController.delete_resources')
+    @patch('core.controllers.HarvestingController.update_resources')
+    @patch('core.controllers.HarvestingController.add_resources')
+    def test_harvesting_controller_run_pipelined_harvest(self, mock_add_resources, mock_update_resources,
+                                                         mock_delete_resources):
+        harvesting_client = Mock()
+        harvesting_client.harvest_stages = Mock(return_value=iter([
+            (['add1', 'add2'], ['update1'], []),
+            (['add3'], [], ['remove1']),
+        ]))
+        harvesting_controller = HarvestingController(harvesting_client, self.dataverse_client)
+
+        assert harvesting_controller.run_pipelined_harvest(queue_size=1, writers=2) == (3, 1, 1)
+        assert mock_add_resources.call_count == 3
+        mock_update_resources.assert_called_once_with(['update1'], None)
+        mock_delete_resources.assert_called_once_with(['remove1'])
+
+        harvesting_client.harvest_stages = Mock(return_value=iter([(['add1'], [], [])]))
+        mock_add_resources.side_effect = HttpException()
+
+        with pytest.raises(HttpException):
+            harvesting_controller.run_pipelined_harvest(writers=1)
+
+        with pytest.raises(ValueError):
+            harvesting_controller.run_pipelined_harvest(update_publish_type=True)
+
+    @patch('core.controllers.HarvestingController.add_resources')
+    def test_harvesting_controller_run_pipelined_harvest_writer_error(self, mock_add_resources):
+        failed = threading.Event()
+        consumed: list = []
+        closed: list = []
+
+        def add_resources(resources, publish_added):
+            failed.set()
+            raise HttpException()
+
+        def harvest_stages(force_update):
+            try:
+                for i in range(50):
+                    # Later stages are produced only after writer failed
+                    if i:
+                        failed.wait(5)
+                    consumed.append(i)
+                    yield [f'add{i}'], [], []
+            finally:
+                closed.append(True)
+
+        mock_add_resources.side_effect = add_resources
+        harvesting_client = Mock()
+        harvesting_client.harvest_stages = harvest_stages
+        harvesting_controller = HarvestingController(harvesting_client, self.dataverse_client)
+
+        with pytest.raises(HttpException):
+            harvesting_controller.run_pipelined_harvest(queue_size=1, writers=1)
+
+        # Producer blocked by full queue while writer fails pulls at most one more stage before stopping
+        assert len(consumed) <= 4
+        assert closed == [True]
+        mock_add_resources.assert_called_once()
+
+    @patch('core.controllers.HarvestingController.publish_resource')
+    def test_harvesting_controller_add_resources_create_mapping(self, mock_publish_resource):
+        self.dataverse_client.create_dataset = Mock(return_value=ResponseMock(
+            '{"data": {"persistentId": "PID_NEW"}}',
+            status_code=201
+        ))
+        resource = Resource(os.environ.get('DASHBOARDS_PARENT_DATAVERSE'), uid='uuid_new')
+        resource.category = ResourceMapping.DASHBOARD
+
+        self.harvesting_controller.add_resources([resource])
+
+        resource_mapping = ResourceMapping.objects.get(uid='uuid_new')
+        assert resource_mapping.pid == 'PID_NEW'
+        assert resource_mapping.category == ResourceMapping.DASHBOARD
+
+    def test_harvesting_controller_plan_harvest(self):
+        OperationLatency(operation=OperationLatency.ADD, average=2, count=1).save()
+        OperationLatency(operation=OperationLatency.PUBLISH, average=10, count=1).save()
+        harvesting_client = Mock()
+        harvesting_client.harvest = Mock(return_value=(['add1', 'add2'], ['update1'], ['remove1']))
+        harvesting_controller = HarvestingController(harvesting_client, self.dataverse_client)
+
+        plan = harvesting_controller.plan_harvest(publish_added=True)
+
+        assert plan['add'] == 2
+        assert plan['update'] == 1
+        assert plan['remove'] == 1
+        assert plan['publish'] == 2
+        assert plan['estimated_duration'] >= 24
+        assert harvesting_client.plan_only is False
+        assert not ResourceMapping.objects.filter(uid='add1').exists()
+
+    def test_harvesting_controller_save_latencies(self):
+        harvesting_controller = HarvestingController(self.harvesting_client, self.dataverse_client)
+        harvesting_controller.latencies[OperationLatency.UPDATE] += [1, 3]
+        harvesting_controller.save_latencies()
+        harvesting_controller.latencies[OperationLatency.UPDATE] += [5]
+        harvesting_controller.save_latencies()
+
+        operation_latency = OperationLatency.objects.get(operation=OperationLatency.UPDATE)
+        assert operation_latency.count == 3
+        assert operation_latency.average == 3
+
+    def test_mapping_writer_batch(self):
+        mapping_writer = MappingWriter(chunk_size=2)
+        writes = Mock()
+
+        with mapping_writer.batch():
+            with mapping_writer.batch():
+                for _ in range(3):
+                    mapping_writer.write(writes)
+            assert writes.call_count == 2
+            assert mapping_writer.commits == 1
+
+        assert writes.call_count == 3
+        assert mapping_writer.commits == 2
+
+        mapping_writer.write(writes)
+        assert writes.call_count == 4
+        assert mapping_writer.commits == 3
+
+    @patch('core.controllers.HarvestingController.publish_resource')
+    def test_harvesting_controller_add_resources_save_mappings_on_error(self, mock_publish_resource):
+        resources = [Resource(os.environ.get('DASHBOARDS_PARENT_DATAVERSE'), uid=f'uuid_batch{i}') for i in range(3)]
+        for resource in resources:
+            resource.category = ResourceMapping.DASHBOARD
+        self.dataverse_client.create_dataset = Mock(side_effect=[
+            ResponseMock('{"data": {"persistentId": "PID1"}}', status_code=201),
+            ResponseMock('{"data": {"persistentId": "PID2"}}', status_code=201),
+            ResponseMock('Error', status_code=500),
+        ])
+        harvesting_controller = HarvestingController(self.harvesting_client, self.dataverse_client)
+
+        with pytest.raises(HttpException):
+            harvesting_controller.add_resources(resources)
+
+        assert ResourceMapping.objects.filter(uid__startswith='uuid_batch').count() == 2
+        assert harvesting_controller.mapping_writer.commits == 1
+
+    def test_harvesting_controller_update_run(self):
+        harvesting_controller = HarvestingController(self.harvesting_client, self.dataverse_client)
+        harvesting_controller.SLOWEST_OPERATIONS = 2
+
+        with harvesting_controller.phase('add'):
+            for uid in ('uid1', 'uid2', 'uid3'):
+                with harvesting_controller.measure(OperationLatency.ADD, uid):
+                    pass
+        with pytest.raises(HttpException):
+            with harvesting_controller.measure(OperationLatency.PUBLISH, 'PID'):
+                raise HttpException('Error')
+
+        harvest_run = HarvestRun(source='grafana')
+        harvesting_controller.update_run(harvest_run)
+
+        assert harvest_run.added == 3
+        assert harvest_run.published == 0
+        assert harvest_run.errors == 1
+        assert harvest_run.add_duration > 0
+        assert harvest_run.update_duration is None
+        assert len(harvest_run.get_slowest_operations()) == 2
+
+    def test_next_dataset_version(self):
+        assert next_dataset_version(None, 'minor') == '1.0'
+        assert next_dataset_version('1.0', 'minor') == '1.1'
+        assert next_dataset_version('1.3', 'major') == '2.0'
+
+    @patch('pyDataverse.api.delete')
+    @patch('pyDataverse.api.put')
+    @patch('pyDataverse.api.post')
+    @patch('pyDataverse.api.get')
+    def test_harvesting_controller_dataset_id_endpoints(self, mock_get, mock_post, mock_put, mock_delete):
+        mock_get.return_value = ResponseMock('{"status": "OK"}')
+        mock_post.side_effect = [ResponseMock('{"data": {"id": 42, "persistentId": "PID_ID"}}', status_code=201),
+                                 ResponseMock('{"status": "OK"}'), ResponseMock('{"status": "OK"}')]
+        mock_put.return_value = ResponseMock('{"status": "OK"}')
+        mock_delete.return_value = ResponseMock('{"status": "OK"}')
+        harvesting_controller = HarvestingController(self.harvesting_client, Api('https://dataverse.test', 'KEY'))
+        resource = Resource(os.environ.get('DASHBOARDS_PARENT_DATAVERSE'), uid='uuid_dataset_id')
+        resource.dataset = self.resource1.dataset
+        resource.category = ResourceMapping.DASHBOARD
+
+        harvesting_controller.add_resources([resource], 'major')
+
+        assert mock_post.call_args[0][0] == 'https://dataverse.test/api/v1/datasets/42/actions/:publish?type=major'
+        resource_mapping = ResourceMapping.objects.get(uid='uuid_dataset_id')
+        assert (resource_mapping.dataset_id, resource_mapping.dataset_version) == (42, '1.0')
+
+        resource.pid = 'PID_ID'
+        harvesting_controller.update_resources([resource], 'minor')
+
+        assert mock_put.call_args[0][0] == 'https://dataverse.test/api/v1/datasets/42/editMetadata'
+        assert mock_put.call_args[1]['params'] == {'replace': True, 'key': 'KEY'}
+        assert mock_post.call_args[0][0] == 'https://dataverse.test/api/v1/datasets/42/actions/:publish?type=minor'
+        assert ResourceMapping.objects.get(uid='uuid_dataset_id').dataset_version == '1.1'
+
+        harvesting_controller.delete_resources([ResourceMapping.objects.get(uid='uuid_dataset_id')])
+
+        assert mock_delete.call_args[0][0] == 'https://dataverse.test/api/v1/datasets/42'
+
+    def test_harvesting_controller_publish_resource_unknown_version(self):
+        ResourceMapping(uid='uuid_unknown_version', pid='PID_UNKNOWN', last_update=timezone.now(),
+                        category=ResourceMapping.DASHBOARD).save()
+        dataverse_client = Mock()
+        dataverse_client.publish_dataset = Mock(return_value=ResponseMock('{"status": "OK"}'))
+        harvesting_controller = HarvestingController(self.harvesting_client, dataverse_client)
+
+        harvesting_controller.publish_resource('PID_UNKNOWN', 'minor')
+
+        # Dataset added before dataset ids were stored may be published already, its version stays unknown
+        dataverse_client.publish_dataset.assert_called_once_with('PID_UNKNOWN', type='minor')
+        assert ResourceMapping.objects.get(uid='uuid_unknown_version').dataset_version is None
+
+    @override_settings(BACKFILL_PID_PREFIX='perma:FK2/')
+    def test_harvesting_controller_add_resources_backfill(self):
+        dataverse_client = Mock()
+        dataverse_client.post_request = Mock(side_effect=lambda query_str, **kwargs: ResponseMock(
+            json.dumps({'data': {'id': 5, 'persistentId': query_str.split('pid=')[1].split('&')[0]}}),
+            status_code=201
+        ))
+        harvesting_controller = HarvestingController(self.harvesting_client, dataverse_client, backfill=True)
+        resource = Resource(os.environ.get('DASHBOARDS_PARENT_DATAVERSE'), uid='uuid_backfill')
+        resource.dataset = self.resource1.dataset
+        resource.category = ResourceMapping.DASHBOARD
+
+        harvesting_controller.add_resources([resource], True)
+        harvesting_controller.add_resources([resource], True)
+
+        dataverse_client.create_dataset.assert_not_called()
+        dataverse_client.publish_dataset.assert_not_called()
+        assert dataverse_client.post_request.call_count == 2
+        query_str = dataverse_client.post_request.call_args[0][0]
+        assert query_str.endswith('&release=yes')
+        assert query_str == dataverse_client.post_request.call_args_list[0][0][0]
+        resource_mapping = ResourceMapping.objects.get(uid='uuid_backfill')
+        assert resource_mapping.pid.startswith('perma:FK2/')
+        assert resource_mapping.dataset_version == '1.0'
+
+    def test_harvesting_controller_backfill_without_pid_prefix(self):
+        with pytest.raises(ValueError):
+            HarvestingController(self.harvesting_client, self.dataverse_client, backfill=True)
+
+    @override_settings(BACKFILL_PID_PREFIX='doi:10.5072/FK2/')
+    def test_harvesting_controller_backfill_registered_pid_prefix(self):
+        with pytest.raises(ValueError):
+            HarvestingController(self.harvesting_client, self.dataverse_client, backfill=True)
+
+    @override_settings(BACKFILL_PID_PREFIX='perma:FK2/')
+    def test_harvesting_controller_add_resources_backfill_existing_pid(self):
+        dataverse_client = Mock()
+        dataverse_client.post_request = Mock(return_value=ResponseMock('{"status": "ERROR"}', status_code=400))
+        dataverse_client.get_request = Mock(return_value=ResponseMock('{"status": "OK"}'))
+        harvesting_controller = HarvestingController(self.harvesting_client, dataverse_client, backfill=True)
+        resource = Resource(os.environ.get('DASHBOARDS_PARENT_DATAVERSE'), uid='uuid_backfill_existing')
+        resource.dataset = self.resource1.dataset
+        resource.category = ResourceMapping.DASHBOARD
+
+        with pytest.raises(HttpException, match='already exists'):
+            harvesting_controller.add_resources([resource], True)
+
+        pid = dataverse_client.get_request.call_args[1]['params']['persistentId']
+        assert pid.startswith('perma:FK2/')
+        assert not ResourceMapping.objects.filter(uid='uuid_backfill_existing').exists()
+
+    def test_publish_queue_put_concurrent(self):
+        publish_queue = PublishQueue(Mock())
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: publish_queue.put(f'PID{i % 50}', 'major' if i % 7 == 0 else 'minor'),
+                              range(1000)))
+
+        assert len(publish_queue) == 50
+        assert {pid for pid, type_version in publish_queue.items() if type_version == 'major'} == \
+            {f'PID{i % 50}' for i in range(1000) if i % 7 == 0}
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+from django.test import TestCase, override_settings
+from mock import patch
+
+from adapters.grafana.client import GrafanaClient
+from core import decoders
+
+
+class DecodersTests(TestCase):
+    def test_decoders_get_json_backend(self):
+        assert decoders.get_json_backend('json') is json.loads
+        assert decoders.get_json_backend('auto') in (json.loads, getattr(decoders.orjson, 'loads', None))
+
+        with pytest.raises(ValueError):
+            decoders.get_json_backend('yaml')
+
+    def test_decoders_loads(self):
+        content = json.dumps({'title': 'Mapa Białowieży', 'keywords': ['las']}).encode('utf-8')
+
+        assert decoders.loads(content) == {'title': 'Mapa Białowieży', 'keywords': ['las']}
+        assert decoders.loads(content, json.loads) == {'title': 'Mapa Białowieży', 'keywords': ['las']}
+
+    def test_decoders_project(self):
+        objects = [{'uuid': '1', 'date': 'date', 'links': [1, 2]}, {'uuid': '2', 'thumbnail_url': 'url'}]
+
+        assert decoders.project(objects, ('uuid', 'date')) == [{'uuid': '1', 'date': 'date'}, {'uuid': '2'}]
+
+    @override_settings(JSON_DECODER='json')
+    def test_decoders_client_backend(self):
+        client = GrafanaClient('https://grafana.test')
+
+        # Backend is resolved when client is created, not for every response
+        with patch('core.decoders.get_json_backend') as mock_get_json_backend:
+            assert client.copy_for_run().json_loads is json.loads
+            mock_get_json_backend.assert_not_called()
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+from django.test import TestCase
+
+from core.mapping import Concat, Date, Each, Today, Value, compile_mapping, date_converter, today
+
+
+class MappingTests(TestCase):
+    def test_compile_mapping(self):
+        mapper = compile_mapping({
+            'title': Value('meta', 'title'),
+            'description': Value('meta', 'description', default='Unknown'),
+            'author': [{'authorName': Value('owner', blank='Unknown'), 'authorAffiliation': ' '}],
+            'keywords': Each('keywords', item={'keywordValue': Value(transform=str.upper)}),
+            'name': Concat(Value('owner', blank='Unknown'), ' ', Value('meta', 'title')),
+            'dataSources': ['Source'],
+            'version': 1,
+        })
+
+        assert mapper({'meta': {'title': 'Title'}, 'owner': ' ', 'keywords': ['a', 'b']}) == {
+            'title': 'Title',
+            'description': 'Unknown',
+            'author': [{'authorName': 'Unknown', 'authorAffiliation': ' '}],
+            'keywords': [{'keywordValue': 'A'}, {'keywordValue': 'B'}],
+            'name': 'Unknown Title',
+            'dataSources': ['Source'],
+            'version': 1,
+        }
+
+        with pytest.raises(KeyError):
+            mapper({'meta': {}, 'owner': 'owner', 'keywords': []})
+
+    def test_compile_mapping_constants_not_shared(self):
+        mapper = compile_mapping({'dataSources': ['Source']})
+
+        first = mapper({})
+        first['dataSources'].append('Other')
+
+        assert mapper({}) == {'dataSources': ['Source']}
+
+    def test_compile_mapping_dates(self):
+        mapper = compile_mapping({
+            'date': Date('date', source_format='%Y%m%d'),
+            'period': [{'start': Today(), 'end': Today('%Y')}],
+        })
+        now = datetime.now()
+
+        assert mapper({'date': '20200102'}) == {
+            'date': '2020-01-02',
+            'period': [{'start': now.strftime('%Y-%m-%d'), 'end': now.strftime('%Y')}],
+        }
+        assert mapper({'date': ' '})['date'] == now.strftime('%Y-%m-%d')
+        assert mapper({'date': '2020x'})['date'] == now.strftime('%Y-%m-%d')
+
+    def test_compile_mapping_unsupported_spec(self):
+        with pytest.raises(TypeError):
+            compile_mapping({'value': object()})
+
+    def test_date_converter(self):
+        convert = date_converter('%Y%m%d', '%d.%m.%Y')
+
+        assert convert('20200102') == '02.01.2020'
+        assert convert('20200102') == '02.01.2020'
+        assert convert(' ') == ''
+        assert convert('invalid') == ''
+        assert convert.cache_info().hits == 1
+
+    def test_today(self):
+        assert today() == datetime.now().strftime('%Y-%m-%d')
+        assert today('%Y') == datetime.now().strftime('%Y')
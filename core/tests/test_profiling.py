@@ -0,0 +1,22 @@
+from django.test import TestCase
+
+from core.profiling import HarvestProfiler, format_profile
+
+
+def profiled_function():
+    return sum(range(1000))
+
+
+class HarvestProfilerTests(TestCase):
+    def test_harvest_profiler(self):
+        with HarvestProfiler(enabled=True) as profiler:
+            profiled_function()
+
+        assert profiler.data
+        assert 'profiled_function' in format_profile(profiler.data)
+
+    def test_harvest_profiler_disabled(self):
+        with HarvestProfiler() as profiler:
+            profiled_function()
+
+        assert profiler.data is None
@@ -1,7 +1,11 @@
+import pytest
 from django.test import TestCase
 from mock import patch
 
-from core.tasks import run_harvester
+from core.exceptions import HttpException
+from core.models import HarvestRun
+from core.tasks import audit_dataverse, run_harvester, run_sharded_harvester, publish_datasets
+from core.utils import get_client
 
 
 class TasksTests(TestCase):
@@ -20,3 +24,122 @@ class TasksTests(TestCase):
                            mock_update_resources,
                            mock_delete_resources):
         run_harvester("geonode")
+
+    @patch('core.controllers.HarvestingController.run_harvest',
+           return_value=(['add_data'], [], []))
+    @patch('core.controllers.HarvestingController.add_resources')
+    @patch('core.controllers.HarvestingController.publish_queued_resources')
+    @patch('core.tasks.publish_datasets.apply_async')
+    def test_run_harvester_defer_publish(self,
+                                         mock_apply_async,
+                                         mock_publish_queued_resources,
+                                         mock_add_resources,
+                                         mock_run_harvest):
+        run_harvester("geonode", True, defer_publish='end')
+        mock_publish_queued_resources.assert_called_once()
+
+        run_harvester("geonode", True, defer_publish='task')
+        mock_apply_async.assert_not_called()
+
+        with pytest.raises(ValueError):
+            run_harvester("geonode", True, defer_publish='later')
+
+    @patch('core.controllers.HarvestingController.run_harvest',
+           return_value=(['add_data'], ['update_data'], []))
+    @patch('core.controllers.HarvestingController.add_resources', autospec=True,
+           side_effect=lambda harvester, resources, publish_added: harvester.publish_queue.put('PID', 'major'))
+    @patch('core.controllers.HarvestingController.update_resources', side_effect=HttpException('Error'))
+    @patch('core.controllers.HarvestingController.publish_queued_resources')
+    @patch('core.tasks.publish_datasets.apply_async')
+    def test_run_harvester_defer_publish_failure(self, mock_apply_async, mock_publish_queued_resources,
+                                                 mock_update_resources, mock_add_resources, mock_run_harvest):
+        with pytest.raises(HttpException):
+            run_harvester("geonode", True, defer_publish='end')
+
+        mock_publish_queued_resources.assert_not_called()
+        assert mock_apply_async.call_args[1]['args'] == ([['PID', 'major']],)
+
+    @patch('core.controllers.HarvestingController.publish_resource')
+    def test_publish_datasets(self, mock_publish_resource):
+        publish_datasets([['PID', 'major'], ['PID2', 'minor']])
+
+        assert mock_publish_resource.call_count == 2
+
+    @patch('core.controllers.HarvestingController.run_pipelined_harvest', return_value=(1, 0, 0))
+    def test_run_harvester_pipelined(self, mock_run_pipelined_harvest):
+        run_harvester("geonode", pipelined=True)
+
+        mock_run_pipelined_harvest.assert_called_once_with(False, False, None)
+
+    @patch('core.controllers.HarvestingController.plan_harvest', return_value={'add': 1})
+    @patch('core.controllers.HarvestingController.add_resources')
+    def test_run_harvester_plan_only(self, mock_add_resources, mock_plan_harvest):
+        assert run_harvester("geonode", plan_only=True) == {'add': 1}
+
+        mock_add_resources.assert_not_called()
+
+    @patch('core.controllers.HarvestingController.plan_harvest', autospec=True, return_value={'add': 1})
+    def test_run_harvester_shard(self, mock_plan_harvest):
+        run_harvester("geonode", plan_only=True, shard='1/2')
+        harvesting_client = mock_plan_harvest.call_args[0][0].harvesting_client
+
+        assert harvesting_client.shard == (1, 2)
+        assert harvesting_client is not get_client("geonode")
+        assert harvesting_client.session is get_client("geonode").session
+        assert get_client("geonode").shard is None
+
+        run_harvester("geonode", plan_only=True)
+        assert mock_plan_harvest.call_args[0][0].harvesting_client.shard is None
+
+        with pytest.raises(ValueError):
+            run_harvester("geonode", shard='2/2')
+
+    @patch('core.tasks.group')
+    def test_run_sharded_harvester(self, mock_group):
+        run_sharded_harvester("geonode", 3, pipelined=True)
+
+        signatures = list(mock_group.call_args[0][0])
+        assert [signature.kwargs for signature in signatures] == [
+            {'shard': f'{index}/3', 'pipelined': True} for index in range(3)
+        ]
+        mock_group.return_value.apply_async.assert_called_once()
+
+        with pytest.raises(ValueError):
+            run_sharded_harvester("geonode", 0)
+
+    @patch('core.controllers.HarvestingController.run_harvest', return_value=(['add_data'], [], ['remove_data']))
+    @patch('core.controllers.HarvestingController.add_resources')
+    @patch('core.controllers.HarvestingController.delete_resources', side_effect=HttpException('Error'))
+    def test_run_harvester_harvest_run(self, mock_delete_resources, mock_add_resources, mock_run_harvest):
+        with pytest.raises(HttpException):
+            run_harvester("geonode", shard='0/2')
+
+        harvest_run = HarvestRun.objects.get(source='geonode')
+        assert harvest_run.status == HarvestRun.FAILURE
+        assert harvest_run.shard == '0/2'
+        assert harvest_run.error == 'HttpException: Error'
+        assert harvest_run.finished_at is not None
+        assert harvest_run.harvest_duration is not None
+        assert harvest_run.add_duration is not None
+
+        with patch('core.controllers.HarvestingController.plan_harvest', return_value={'add': 1}):
+            run_harvester("grafana", plan_only=True)
+        assert not HarvestRun.objects.filter(source='grafana').exists()
+
+    @patch('core.controllers.HarvestingController.run_harvest', return_value=([], [], []))
+    def test_run_harvester_profile(self, mock_run_harvest):
+        run_harvester("geonode", profile=True)
+        run_harvester("grafana")
+
+        assert HarvestRun.objects.get(source='geonode').profile
+        assert HarvestRun.objects.get(source='grafana').profile is None
+
+    @patch('core.tasks.apply_plan')
+    @patch('core.tasks.plan_drift', return_value={'dashboards': {'missing': [], 'orphans': []}})
+    def test_audit_dataverse(self, mock_plan_drift, mock_apply_plan):
+        assert audit_dataverse() == {'dashboards': {'missing': [], 'orphans': []}}
+        mock_apply_plan.assert_not_called()
+
+        audit_dataverse(apply=True, delete_orphans=True)
+
+        assert mock_apply_plan.call_args[0][2] is True
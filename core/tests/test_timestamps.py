@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+import pytz
+from django.test import TestCase
+from django.utils.dateparse import parse_datetime
+
+from core.timestamps import parse_compact, parse_iso
+
+
+class TimestampsTests(TestCase):
+    def test_parse_compact(self):
+        for value in ('20200619T093006', '19991231T235959', '2020619T93006'):
+            assert parse_compact(value) == datetime.strptime(value, '%Y%m%dT%H%M%S').replace(tzinfo=pytz.UTC)
+
+        assert parse_compact('20200619T093006').tzinfo is pytz.UTC
+
+        for value in ('20201319T093006', '2020-06-19', ''):
+            with pytest.raises(ValueError):
+                parse_compact(value)
+
+    def test_parse_iso(self):
+        for value in ('2020-06-19T09:30:06.188641', '2020-06-19T09:30:06', '2020-06-19 09:30',
+                      '2020-06-19T09:30:06.1', '2020-06-19T09:30:06Z', '2020-06-19T09:30:06+02:00'):
+            assert parse_iso(value) == parse_datetime(value).replace(tzinfo=pytz.UTC)
+
+        for value in ('2020-06-19', 'invalid'):
+            with pytest.raises(ValueError):
+                parse_iso(value)
+
+    def test_parse_cache(self):
+        parse_compact.cache_clear()
+
+        assert parse_compact('20200619T093006') is parse_compact('20200619T093006')
+        assert parse_compact.cache_info().hits == 1
@@ -1,8 +1,10 @@
 import pytest
 from django.test import TestCase
+from mock import patch
 
 from adapters.geonode.client import GeonodeClient
-from core.utils import get_client
+from core.utils import clear_clients, get_client, get_client_class, parse_shard, uid_shard, warm_up_clients
+from harvester import settings
 
 
 class CoreUtilsTests(TestCase):
@@ -10,8 +12,61 @@ class CoreUtilsTests(TestCase):
     def setUpTestData(cls):
         super(CoreUtilsTests, cls).setUpTestData()
 
+        cls.geonode_settings = dict(settings.CLIENTS_DICT['geonode'])
+
     def test_core_get_client(self):
         assert isinstance(get_client('geonode'), GeonodeClient)
+        assert get_client('geonode').source == 'geonode'
 
         with pytest.raises(KeyError, match=r"There is no client under name: .* in settings.CLIENTS_DICT\."):
             get_client('test')
+
+    @patch.dict('harvester.settings.CLIENTS_DICT', {'geonode-north': {
+        'module': 'adapters.geonode.client', 'class': 'GeonodeClient', 'url': 'https://north.url', 'api_key': None
+    }})
+    def test_core_get_client_instance(self):
+        client = get_client('geonode-north')
+
+        assert isinstance(client, GeonodeClient)
+        assert client.source == 'geonode-north'
+        assert client.service_url == 'https://north.url/'
+
+    def test_core_get_client_cache(self):
+        client = get_client('geonode')
+
+        assert get_client('geonode') is client
+        assert get_client('geonode', cached=False) is not client
+        assert get_client_class('adapters.geonode.client', 'GeonodeClient') is GeonodeClient
+
+        with patch.dict('harvester.settings.CLIENTS_DICT', {'geonode': {
+            **self.geonode_settings, 'url': 'https://changed.url'
+        }}):
+            changed_client = get_client('geonode')
+
+        assert changed_client.service_url == 'https://changed.url/'
+
+        clear_clients()
+        assert get_client('geonode') is not changed_client
+
+    @patch.dict('harvester.settings.CLIENTS_DICT', {'broken': {
+        'module': 'adapters.geonode.client', 'class': 'GeonodeClient', 'url': None, 'api_key': None
+    }})
+    def test_core_warm_up_clients(self):
+        names = warm_up_clients()
+
+        assert 'geonode' in names
+        assert 'broken' not in names
+
+    def test_core_parse_shard(self):
+        assert parse_shard(None) is None
+        assert parse_shard('1/4') == (1, 4)
+
+        with pytest.raises(ValueError):
+            parse_shard('4/4')
+
+        with pytest.raises(ValueError):
+            parse_shard('first')
+
+    def test_core_uid_shard(self):
+        assert uid_shard('uid', 4) == uid_shard('uid', 4)
+        assert {uid_shard(f'uid-{i}', 4) for i in range(100)} == {0, 1, 2, 3}
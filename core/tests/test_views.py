@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import HarvestRun
+from core.profiling import HarvestProfiler
+
+
+class HarvestRunViewSetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super(HarvestRunViewSetTests, cls).setUpTestData()
+
+        cls.admin = User.objects.create_superuser('admin', 'admin@test.url', 'password')
+        cls.harvest_run = HarvestRun.objects.create(source='geonode', status=HarvestRun.SUCCESS, added=10,
+                                                    add_duration=2, errors=1,
+                                                    slowest_operations='[["add", "uuid", 1.5]]')
+        cls.harvest_run.finished_at = cls.harvest_run.started_at + timezone.timedelta(seconds=30)
+        cls.harvest_run.save()
+        HarvestRun.objects.create(source='grafana', status=HarvestRun.FAILURE, error='HttpException: Error')
+
+    def test_harvest_run_list(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/api/harvest-runs/', {'source': 'geonode'})
+
+        assert response.status_code == 200
+        assert response.json()['count'] == 1
+
+        harvest_run = response.json()['results'][0]
+        assert harvest_run['duration'] == 30
+        assert harvest_run['throughput'] == {'add': 5}
+        assert harvest_run['slowest_operations'] == [['add', 'uuid', 1.5]]
+        assert harvest_run['errors'] == 1
+
+    def test_harvest_run_read_only(self):
+        self.client.force_login(self.admin)
+
+        assert self.client.get(f'/api/harvest-runs/{self.harvest_run.pk}/').status_code == 200
+        assert self.client.delete(f'/api/harvest-runs/{self.harvest_run.pk}/').status_code == 405
+        assert self.client.post('/api/harvest-runs/', {'source': 'orthanc'}).status_code == 405
+
+    def test_harvest_run_requires_admin(self):
+        assert self.client.get('/api/harvest-runs/').status_code == 403
+
+    def test_harvest_run_profile(self):
+        self.client.force_login(self.admin)
+        assert self.client.get(f'/api/harvest-runs/{self.harvest_run.pk}/profile/').status_code == 404
+
+        with HarvestProfiler(enabled=True) as profiler:
+            sum(range(1000))
+        self.harvest_run.profile = profiler.data
+        self.harvest_run.save()
+
+        response = self.client.get(f'/api/harvest-runs/{self.harvest_run.pk}/profile/')
+        assert response.status_code == 200
+        assert response.content == profiler.data
+        assert 'harvest-run' in response['Content-Disposition']
+
+        response = self.client.get(f'/api/harvest-runs/{self.harvest_run.pk}/profile/', {'report': 1})
+        assert b'function calls' in response.content
+
+        response = self.client.get(f'/admin/core/harvestrun/{self.harvest_run.pk}/change/')
+        assert f'href="/api/harvest-runs/{self.harvest_run.pk}/profile/"' in response.content.decode()
@@ -0,0 +1,48 @@
+from django.test import TestCase
+from mock import patch
+
+from core import warmup
+
+
+class WarmUpTests(TestCase):
+    def test_warm_up_process(self):
+        durations = warmup.warm_up_process()
+
+        assert set(durations) == {'imports', 'clients', 'total'}
+        assert durations['total'] >= durations['imports']
+
+    @patch('requests.Session.head')
+    @patch('socket.getaddrinfo')
+    def test_warm_up_network(self, mock_getaddrinfo, mock_head):
+        durations = warmup.warm_up_network()
+
+        assert set(durations) == {'database', 'hosts', 'sessions', 'total'}
+        assert mock_head.call_count == len(warmup.settings.CLIENTS_DICT)
+        assert mock_head.call_args[1]['timeout'] == warmup.settings.WORKER_WARM_UP_TIMEOUT
+
+    @patch('core.warmup.check_databases', side_effect=Exception('Database unavailable'))
+    @patch('core.warmup.resolve_hosts')
+    @patch('core.warmup.prime_sessions')
+    def test_warm_up_network_stage_failure(self, mock_prime_sessions, mock_resolve_hosts, mock_check_databases):
+        warmup.warm_up_network()
+
+        mock_resolve_hosts.assert_called_once()
+        mock_prime_sessions.assert_called_once()
+
+    @patch('core.warmup.warm_up_network')
+    @patch('core.warmup.warm_up_process')
+    def test_warm_up_worker(self, mock_warm_up_process, mock_warm_up_network):
+        thread = warmup.warm_up_worker()
+        thread.join(5)
+
+        mock_warm_up_process.assert_called_once()
+        mock_warm_up_network.assert_called_once()
+        assert thread.daemon
+
+    @patch('requests.Session.head', side_effect=[OSError(), None, None])
+    def test_prime_sessions(self, mock_head):
+        assert len(warmup.prime_sessions()) == mock_head.call_count - 1
+
+    @patch('socket.getaddrinfo', side_effect=[OSError(), [], [], []])
+    def test_resolve_hosts(self, mock_getaddrinfo):
+        assert len(warmup.resolve_hosts()) == mock_getaddrinfo.call_count - 1
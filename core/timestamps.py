@@ -0,0 +1,54 @@
+import functools
+from datetime import datetime
+
+import pytz
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+# Compact DICOM timestamp format used by Orthanc
+COMPACT_FORMAT = '%Y%m%dT%H%M%S'
+
+
+@functools.lru_cache(maxsize=settings.TIMESTAMP_CACHE_SIZE)
+def parse_compact(value: str) -> datetime:
+    """
+    Parse compact timestamp (e.g. 20200619T093006) as UTC datetime, fixed-width timestamps are sliced directly and
+    parsed timestamps are cached, so repeated timestamps are parsed once
+
+    :param value: timestamp in COMPACT_FORMAT
+    :type value: str
+    :return: timezone aware datetime in UTC
+    """
+    if len(value) == 15 and value[8] == 'T' and value[:8].isdigit() and value[9:].isdigit():
+        return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                        int(value[9:11]), int(value[11:13]), int(value[13:15]), tzinfo=pytz.UTC)
+
+    return datetime.strptime(value, COMPACT_FORMAT).replace(tzinfo=pytz.UTC)
+
+
+@functools.lru_cache(maxsize=settings.TIMESTAMP_CACHE_SIZE)
+def parse_iso(value: str) -> datetime:
+    """
+    Parse ISO 8601 datetime (e.g. 2020-06-19T09:30:06.188641) as UTC datetime, time zone of value is ignored like
+    in dates returned by Geonode API. Common forms are parsed by datetime.fromisoformat, other forms accepted by
+    Django parse_datetime. Parsed timestamps are cached
+
+    :param value: ISO 8601 datetime
+    :type value: str
+    :return: timezone aware datetime in UTC
+    """
+    date = None
+
+    if value[10:11] in ('T', ' '):
+        try:
+            date = datetime.fromisoformat(value)
+        except ValueError:
+            pass
+
+    if date is None:
+        date = parse_datetime(value)
+
+    if date is None:
+        raise ValueError(f'Invalid ISO 8601 datetime {value}')
+
+    return date.replace(tzinfo=pytz.UTC)
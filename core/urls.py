@@ -0,0 +1,8 @@
+from rest_framework import routers
+
+from core.views import HarvestRunViewSet
+
+router = routers.DefaultRouter()
+router.register('harvest-runs', HarvestRunViewSet, basename='harvest-run')
+
+urlpatterns = router.urls
@@ -1,13 +1,46 @@
 import importlib
+import json
+import logging
+import threading
+import zlib
+from typing import Optional, Tuple
 
 from harvester import settings
 
+logger = logging.getLogger(__name__)
 
-def get_client(name):
+# Per-process registry of client classes by (module, class) and client instances by name with settings they were
+# created from
+_client_classes: dict = {}
+_clients: dict = {}
+_clients_lock = threading.Lock()
+
+
+def get_client_class(module: str, class_name: str):
+    """
+    Return client class imported from module, imported classes are cached
+
+    :param module: dotted path of module with client class
+    :type module: str
+    :param class_name: name of client class
+    :type class_name: str
+    :return: client class
+    """
+    key = (module, class_name)
+
+    if key not in _client_classes:
+        _client_classes[key] = getattr(importlib.import_module(module), class_name)
+
+    return _client_classes[key]
+
+
+def get_client(name, cached: bool = True):
     """
-    Return client based on given app name
+    Return client based on given app name, client instance is reused until its settings change
 
     :param name: name of application client should serve
+    :param cached: return cached client instance if settings did not change
+    :type cached: bool
     :return: Client object
     """
     client_dict = settings.CLIENTS_DICT
@@ -15,6 +48,78 @@ def get_client(name):
         raise KeyError(f'There is no client under name: {name} in settings.CLIENTS_DICT.')
 
     client_data = client_dict[name]
-    client_class = getattr(importlib.import_module(client_data['module']), client_data['class'])
+    client_settings = json.dumps(client_data, sort_keys=True)
+
+    with _clients_lock:
+        if cached and name in _clients and _clients[name][0] == client_settings:
+            return _clients[name][1]
+
+        client_class = get_client_class(client_data['module'], client_data['class'])
+        client = client_class(client_data['url'], client_data['api_key'], source=name)
+        _clients[name] = (client_settings, client)
+
+    return client
+
+
+def clear_clients() -> None:
+    """
+    Remove every cached client instance
+
+    :return: None
+    """
+    with _clients_lock:
+        _clients.clear()
+
 
-    return client_class(client_data['url'], client_data['api_key'])
+def warm_up_clients() -> list:
+    """
+    Create and cache clients of every configured name, clients which can not be created are skipped
+
+    :return: list of names of created clients
+    """
+    names: list = []
+
+    for name in settings.CLIENTS_DICT:
+        try:
+            get_client(name)
+        except Exception as exception:  # pylint: disable=broad-except
+            logger.warning(f'Client {name} could not be created: {exception}')
+        else:
+            names.append(name)
+
+    return names
+
+
+def parse_shard(spec: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Parse shard spec in form 'k/N' meaning shard k (counted from 0) of N shards
+
+    :param spec: shard spec, None means no sharding
+    :type spec: str
+    :return: tuple of shard index and shards count or None
+    """
+    if spec is None:
+        return None
+
+    try:
+        index, count = (int(part) for part in str(spec).split('/'))
+    except ValueError:
+        raise ValueError(f"Shard spec must be in form 'k/N', given {spec}")
+
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f'Shard index must be in range 0-{count - 1}, given {spec}')
+
+    return index, count
+
+
+def uid_shard(uid: str, count: int) -> int:
+    """
+    Return shard of resource UID, stable across processes and nodes unlike built-in hash
+
+    :param uid: resource UID in source
+    :type uid: str
+    :param count: number of shards
+    :type count: int
+    :return: shard index
+    """
+    return zlib.crc32(str(uid).encode('utf-8')) % count
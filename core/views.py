@@ -0,0 +1,40 @@
+from django.http import Http404, HttpResponse
+from rest_framework import viewsets
+from rest_framework.decorators import action
+
+from core.models import HarvestRun
+from core.profiling import format_profile
+from core.serializers import HarvestRunSerializer
+
+
+class HarvestRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only history of harvest runs, filtered by ?source= and ?status= query parameters
+    """
+    serializer_class = HarvestRunSerializer
+
+    def get_queryset(self):
+        queryset = HarvestRun.objects.defer('profile')
+
+        for field in ('source', 'status'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+
+        return queryset
+
+    @action(detail=True)
+    def profile(self, request, pk=None):
+        """
+        Download profile of harvest run in pstats format, ?report=1 returns text report of most expensive functions
+        """
+        harvest_run = self.get_object()
+        if not harvest_run.profile:
+            raise Http404('Harvest run was not profiled.')
+
+        if request.query_params.get('report'):
+            return HttpResponse(format_profile(bytes(harvest_run.profile)), content_type='text/plain')
+
+        response = HttpResponse(bytes(harvest_run.profile), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="harvest-run-{harvest_run.pk}.prof"'
+        return response
@@ -0,0 +1,168 @@
+import importlib
+import logging
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.db import connections
+
+from core.utils import get_client, get_client_class, warm_up_clients
+from harvester import settings
+
+logger = logging.getLogger(__name__)
+
+# Modules imported lazily by first harvest task
+WARM_UP_MODULES = ('pyDataverse.api', 'pyDataverse.models', 'pytz', 'core.controllers', 'core.tasks')
+
+
+def import_modules() -> None:
+    """
+    Import modules used by harvest tasks and classes of every configured client
+
+    :return: None
+    """
+    for module in WARM_UP_MODULES:
+        importlib.import_module(module)
+
+    for client_data in settings.CLIENTS_DICT.values():
+        try:
+            get_client_class(client_data['module'], client_data['class'])
+        except (ImportError, AttributeError) as exception:
+            logger.warning(f'Client class {client_data["module"]}.{client_data["class"]} not imported: {exception}')
+
+
+def check_databases() -> None:
+    """
+    Open connection to every database and validate it with simple query
+
+    :return: None
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def resolve_hosts() -> list:
+    """
+    Resolve hosts of dataverse and every configured client, unresolvable hosts are skipped
+
+    :return: list of resolved hosts
+    """
+    urls = [settings.DATAVERSE_URL] + [client_data['url'] for client_data in settings.CLIENTS_DICT.values()]
+    hosts: set = {urlparse(url).hostname for url in urls if url}
+    resolved: list = []
+
+    for host in sorted(host for host in hosts if host):
+        try:
+            socket.getaddrinfo(host, None)
+        except OSError as exception:
+            logger.warning(f'Host {host} could not be resolved: {exception}')
+        else:
+            resolved.append(host)
+
+    return resolved
+
+
+def prime_sessions() -> list:
+    """
+    Open keep-alive connection in session of every cached client with HEAD request to its service url, so first
+    harvest reuses connection from session pool. Any response opens connection, unreachable sources are skipped
+
+    :return: list of names of clients with primed session
+    """
+    primed: list = []
+
+    for name in settings.CLIENTS_DICT:
+        try:
+            client = get_client(name)
+            client.session.head(client.service_url, timeout=settings.WORKER_WARM_UP_TIMEOUT, allow_redirects=False)
+        except Exception as exception:  # pylint: disable=broad-except
+            logger.warning(f'Session of client {name} not primed: {exception}')
+        else:
+            primed.append(name)
+
+    return primed
+
+
+def run_stages(name: str, stages: tuple) -> dict:
+    """
+    Run warm-up stages and log their durations, failure of one stage does not stop the others
+
+    :param name: name of warm-up in log
+    :type name: str
+    :param stages: pairs of stage name and function
+    :type stages: tuple
+    :return: dict with duration of every stage and total duration in seconds
+    """
+    durations: dict = {}
+    start = time.perf_counter()
+
+    for stage_name, stage in stages:
+        stage_start = time.perf_counter()
+        try:
+            stage()
+        except Exception as exception:  # pylint: disable=broad-except
+            logger.warning(f'Worker warm-up stage {stage_name} failed: {exception}')
+        durations[stage_name] = time.perf_counter() - stage_start
+
+    durations['total'] = time.perf_counter() - start
+    logger.info('Worker {} warm-up completed in {:.3f}s ({})'.format(
+        name, durations['total'], ', '.join(f'{stage_name}: {duration:.3f}s'
+                                            for stage_name, duration in durations.items() if stage_name != 'total')))
+
+    return durations
+
+
+def warm_up_process() -> dict:
+    """
+    Run warm-up stages without network access, they are fast enough for start of worker process
+
+    :return: dict with duration of every stage and total duration in seconds
+    """
+    return run_stages('process', (
+        ('imports', import_modules),
+        ('clients', warm_up_clients),
+    ))
+
+
+def warm_up_network() -> dict:
+    """
+    Run warm-up stages waiting for database and sources. Database connection of this thread only validates
+    database, connection of task is opened by first task
+
+    :return: dict with duration of every stage and total duration in seconds
+    """
+    return run_stages('network', (
+        ('database', check_databases),
+        ('hosts', resolve_hosts),
+        ('sessions', prime_sessions),
+    ))
+
+
+def _warm_up_network_thread() -> None:
+    """
+    Run network warm-up stages and close database connections of thread
+
+    :return: None
+    """
+    try:
+        warm_up_network()
+    finally:
+        connections.close_all()
+
+
+def warm_up_worker() -> threading.Thread:
+    """
+    Warm up worker process, stages without network access run immediately and network stages in background thread,
+    so slow DNS or database never delays worker process reporting it is up to celery
+
+    :return: started thread of network stages
+    """
+    warm_up_process()
+
+    thread = threading.Thread(target=_warm_up_network_thread, name='worker-warm-up', daemon=True)
+    thread.start()
+
+    return thread
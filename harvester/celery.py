@@ -3,6 +3,7 @@ from __future__ import absolute_import, unicode_literals
 import os
 
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_process_init
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'harvester.settings')
@@ -17,3 +18,29 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def warm_up_worker_process(**kwargs):
+    """
+    Warm up worker process when it starts, so first task does not pay for imports, client setup, hosts resolution and
+    connecting to sources. Network stages run in background thread, process reports it is up to celery right away
+    """
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+    if settings.WORKER_WARM_UP:
+        from core.warmup import warm_up_worker  # pylint: disable=import-outside-toplevel
+
+        warm_up_worker()
+
+
+@task_prerun.connect
+@task_postrun.connect
+def close_old_database_connections(**kwargs):
+    """
+    Close database connections exceeding CONN_MAX_AGE or unusable, tasks do not emit request signals on which Django
+    does it, so persistent connections are reused across tasks
+    """
+    from django.db import close_old_connections  # pylint: disable=import-outside-toplevel
+
+    close_old_connections()
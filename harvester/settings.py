@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/2.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
+import json
 import os
 from ast import literal_eval
 
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django_celery_beat',
     'django_celery_results',
+    'rest_framework',
 
     'core.apps.CoreConfig',
     'adapters.geonode.apps.GeonodeConfig',
@@ -86,9 +88,19 @@ DATABASES = {
         'PASSWORD': os.environ.get("DB_PASSWORD", "harvester_password"),
         'HOST': os.environ.get("DB_HOST", "localhost"),
         'PORT': '5432',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
     },
 }
 
+REST_FRAMEWORK = {
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAdminUser'],
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Number of resource mapping writes saved in one transaction
+MAPPING_WRITE_CHUNK_SIZE = int(os.environ.get('MAPPING_WRITE_CHUNK_SIZE', 100))
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -132,12 +144,66 @@ CELERY_RESULT_BACKEND = 'django-db'
 CELERY_TASK_EAGER_PROPAGATES = True
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'localhost')
 
+# Warm up worker processes on start
+WORKER_WARM_UP = literal_eval(os.environ.get('WORKER_WARM_UP', 'True'))
+# Timeout of every warm-up request to source in seconds
+WORKER_WARM_UP_TIMEOUT = float(os.environ.get('WORKER_WARM_UP_TIMEOUT', 2))
+
 # Dataverse
 DATAVERSE_URL = os.environ.get('DATAVERSE_URL', 'localhost')
 DATAVERSE_API_KEY = os.environ.get('DATAVERSE_API_KEY', 'dataverse_api_key')
 
+# JSON decoder of source responses ('auto', 'json', 'orjson')
+JSON_DECODER = os.environ.get('JSON_DECODER', 'auto')
+
+# Conditional requests cache, disabled when HTTP_CACHE_DIR is empty
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', '')
+HTTP_CACHE_MAX_SIZE = int(os.environ.get('HTTP_CACHE_MAX_SIZE', 512 * 1024 * 1024))
+
+# Publishing
+PUBLISH_CONCURRENCY = int(os.environ.get('PUBLISH_CONCURRENCY', 1))
+PUBLISH_RATE_LIMIT = float(os.environ.get('PUBLISH_RATE_LIMIT', 0))
+PUBLISH_TASK_QUEUE = os.environ.get('PUBLISH_TASK_QUEUE', 'celery')
+
+# Pipelined harvest
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', 100))
+PIPELINE_WRITERS = int(os.environ.get('PIPELINE_WRITERS', 4))
+
+# Profile every harvest run with cProfile and store stats with HarvestRun, also enabled per run with profile=True
+HARVEST_PROFILE = literal_eval(os.environ.get('HARVEST_PROFILE', 'False'))
+
+# PID prefix of datasets imported in backfill mode, identifier is derived from resource UID. Import does not register
+# PIDs, so prefix must use locally resolved scheme (e.g. perma:FK2/), doi: and hdl: prefixes are refused
+BACKFILL_PID_PREFIX = os.environ.get('BACKFILL_PID_PREFIX', '')
+
+# Maximum number of parsed source timestamps kept in memory, repeated timestamps are parsed once
+TIMESTAMP_CACHE_SIZE = int(os.environ.get('TIMESTAMP_CACHE_SIZE', 65536))
+
+# Drift audit of parent dataverses against resource mappings
+AUDIT_SEARCH_PAGE_SIZE = int(os.environ.get('AUDIT_SEARCH_PAGE_SIZE', 1000))
+AUDIT_WORKERS = int(os.environ.get('AUDIT_WORKERS', 4))
+
 # Geonode
 GEONODE_OFFSET = os.environ.get('GEONODE_OFFSET', 1000)
+# Paging of Geonode listings ('offset', 'keyset')
+GEONODE_PAGINATION = os.environ.get('GEONODE_PAGINATION', 'offset')
+# Fetching of Geonode listings ('full', 'projected', 'two_phase')
+GEONODE_FETCH_MODE = os.environ.get('GEONODE_FETCH_MODE', 'full')
+# Geonode metadata endpoint ('rest' - Geonode API, 'csw' - pycsw catalogue), CSW url is GEONODE_URL/catalogue/csw by default
+GEONODE_TRANSPORT = os.environ.get('GEONODE_TRANSPORT', 'rest')
+GEONODE_CSW_URL = os.environ.get('GEONODE_CSW_URL', '')
+GEONODE_CSW_PAGE_SIZE = int(os.environ.get('GEONODE_CSW_PAGE_SIZE', 100))
+
+# Grafana
+GRAFANA_PAGE_SIZE = int(os.environ.get('GRAFANA_PAGE_SIZE', 1000))
+
+# Orthanc studies query ('rest' - list of studies and detail of every study, 'find' - pages of /tools/find,
+# 'dicomweb' - pages of QIDO-RS studies search)
+ORTHANC_TRANSPORT = os.environ.get('ORTHANC_TRANSPORT', 'rest')
+ORTHANC_PAGE_SIZE = int(os.environ.get('ORTHANC_PAGE_SIZE', 1000))
+# DICOMweb root of Orthanc or its gateway, ORTHANC_URL/dicom-web/ by default
+ORTHANC_DICOMWEB_URL = os.environ.get('ORTHANC_DICOMWEB_URL', '')
+ORTHANC_DICOMWEB_WORKERS = int(os.environ.get('ORTHANC_DICOMWEB_WORKERS', 4))
 
 CLIENTS_DICT = {
     'geonode': {
@@ -159,3 +225,7 @@ CLIENTS_DICT = {
         'api_key': os.getenv('ORTHANC_API_KEY', None)
     }
 }
+
+# Additional clients e.g. more instances of the same adapter, every client is separate source of resource mappings
+# {"geonode-north": {"module": "adapters.geonode.client", "class": "GeonodeClient", "url": "...", "api_key": null}}
+CLIENTS_DICT.update(json.loads(os.environ.get('HARVESTER_CLIENTS', '{}')))